@@ -0,0 +1,426 @@
+import itertools
+import numpy as np
+
+from dataclasses import dataclass
+from datetime import datetime, tzinfo
+from typing import Any, Iterable, Optional
+
+from utils.history import HistoryStore
+from utils.types import Category, Fixture, League
+
+# Parameters of the `website` config section a backtest can vary
+GRID_PARAMETERS = (
+    "maximum_bet_odd",
+    "minimum_hours_between_matches",
+    "max_number_of_bets_per_day",
+    "bet_type",
+)
+
+
+@dataclass
+class RecordedFixture:
+    """
+    Fixture of a recorded offer, with its markets in the format of the markets
+    endpoint and the ids of its outcomes which won, None if it is not settled.
+    """
+
+    __slots__ = ("fixture", "markets", "winning_outcome_ids")
+
+    fixture: Fixture
+    markets: list[dict[str, Any]]
+    winning_outcome_ids: Optional[frozenset]
+
+
+class BacktestResult:
+    """
+    Outcome of every config of a backtest. `bankroll` holds the bankroll of each
+    config before the first day and after each day, as a (configs, days + 1) array.
+    Bets on unsettled fixtures count as placed but leave the bankroll as it is.
+    """
+
+    __slots__ = ("configs", "bets", "settled", "wins", "bankroll")
+
+    def __init__(
+        self,
+        configs: list[dict[str, Any]],
+        bets: np.ndarray,
+        settled: np.ndarray,
+        wins: np.ndarray,
+        bankroll: np.ndarray,
+    ):
+        self.configs = configs
+        self.bets = bets
+        self.settled = settled
+        self.wins = wins
+        self.bankroll = bankroll
+
+    @property
+    def hit_rate(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.settled > 0, self.wins / self.settled, np.nan)
+
+    @property
+    def days_solvent(self) -> np.ndarray:
+        """Days each config ended with money left."""
+        return (self.bankroll[:, 1:] > 0).sum(axis=1)
+
+    def get_rows(self, indexes: Optional[Iterable[int]] = None) -> list[dict[str, Any]]:
+        """
+        Report rows of the given configs, by default sorted by final bankroll, then
+        by the days they stayed solvent, since staking the whole bankroll leaves
+        nothing after the first lost bet.
+        """
+        days_solvent = self.days_solvent
+        if indexes is None:
+            indexes = np.lexsort((-days_solvent, -self.bankroll[:, -1]))
+        hit_rate = self.hit_rate
+        return [
+            {
+                **self.configs[index],
+                "bets": int(self.bets[index]),
+                "hit_rate": float(hit_rate[index]),
+                "final_bankroll": float(self.bankroll[index, -1]),
+                "lowest_bankroll": float(self.bankroll[index].min()),
+                "days_solvent": int(days_solvent[index]),
+            }
+            for index in indexes
+        ]
+
+
+def get_grid(**values: list[Any]) -> list[dict[str, Any]]:
+    """Every combination of the given values of `GRID_PARAMETERS`."""
+    return [
+        dict(zip(GRID_PARAMETERS, combination))
+        for combination in itertools.product(
+            *(values[parameter] for parameter in GRID_PARAMETERS)
+        )
+    ]
+
+
+def get_bet_type_arrays(
+    days: list[list[RecordedFixture]], bet_type: str, maximum_bet_odd: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lay out, in start time order, the fixtures of every day whose `bet_type` market
+    has an outcome within `maximum_bet_odd`, the only ones a selection can take.
+    Return their start times (days, fixtures), whether they are settled
+    (days, fixtures) and the odds and results of the outcomes of their market
+    (days, fixtures, outcomes), padded with NaN, +inf and False.
+    """
+    rows = []
+    for day in days:
+        day_rows = []
+        for recorded in sorted(day, key=lambda recorded: recorded.fixture.start_time):
+            # Like `get_bet_type_from_fixture_markets`, the first market of the
+            # bet type is the one bet on
+            market = next(
+                (m for m in recorded.markets if m.get("name") == bet_type), None
+            )
+            if not market:
+                continue
+            odds = [
+                np.inf if outcome.get("odds") is None else outcome["odds"]
+                for outcome in market["outcomes"]
+            ]
+            if not odds or min(odds) > maximum_bet_odd:
+                continue
+            winning_outcome_ids = recorded.winning_outcome_ids
+            day_rows.append(
+                (
+                    recorded.fixture.start_time.timestamp(),
+                    winning_outcome_ids is not None,
+                    odds,
+                    [
+                        bool(winning_outcome_ids)
+                        and outcome["id"] in winning_outcome_ids
+                        for outcome in market["outcomes"]
+                    ],
+                )
+            )
+        rows.append(day_rows)
+
+    number_of_fixtures = max((len(day_rows) for day_rows in rows), default=0)
+    number_of_outcomes = max(
+        (len(row[2]) for day_rows in rows for row in day_rows), default=0
+    )
+    shape = (len(days), number_of_fixtures)
+    start_times = np.full(shape, np.nan)
+    settled = np.zeros(shape, dtype=bool)
+    odds = np.full(shape + (number_of_outcomes,), np.inf)
+    won = np.zeros(shape + (number_of_outcomes,), dtype=bool)
+    for day_index, day_rows in enumerate(rows):
+        for index, (start_time, is_settled, outcome_odds, outcome_won) in enumerate(
+            day_rows
+        ):
+            start_times[day_index, index] = start_time
+            settled[day_index, index] = is_settled
+            odds[day_index, index, : len(outcome_odds)] = outcome_odds
+            won[day_index, index, : len(outcome_won)] = outcome_won
+    return start_times, settled, odds, won
+
+
+def get_suitable_bets(
+    odds: np.ndarray, won: np.ndarray, maximum_bet_odds: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    For each `maximum_bet_odd`, whether each fixture has a suitable bet, and its odd
+    and result, as (maximum bet odds, days, fixtures) arrays. Like `get_match_to_bet`,
+    the suitable bet is the last outcome of the market within `maximum_bet_odd`.
+    """
+    within = odds[np.newaxis] <= maximum_bet_odds[:, None, None, None]
+    has_bet = within.any(axis=-1)
+    last = within.shape[-1] - 1 - np.argmax(within[..., ::-1], axis=-1)
+    chosen = last[..., np.newaxis]
+    shape = within.shape
+    chosen_odds = np.take_along_axis(np.broadcast_to(odds, shape), chosen, -1)[..., 0]
+    chosen_won = np.take_along_axis(np.broadcast_to(won, shape), chosen, -1)[..., 0]
+    return has_bet, chosen_odds, chosen_won
+
+
+def backtest_bet_type(
+    days: list[list[RecordedFixture]],
+    bet_type: str,
+    configs: list[dict[str, Any]],
+    stake_fraction: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Run the greedy selection of every config of a bet type over every day at once.
+    Return the bets, settled bets and won bets of each config and its bankroll
+    multiplier of each day.
+
+    `max_number_of_bets_per_day` only cuts the walk short, so the configs sharing
+    a `maximum_bet_odd` and `minimum_hours_between_matches` share one walk taking
+    up to the most bets any of them does, whose state after each bet is kept.
+    The walk over the fixtures of a day is sequential, so it is the only loop, over
+    the fixture positions of all days together. Every step updates the state of
+    all walks and days as (walks, days) arrays.
+    """
+    maximum_bet_odds = np.unique([config["maximum_bet_odd"] for config in configs])
+    start_times, settled, odds, won = get_bet_type_arrays(
+        days, bet_type, maximum_bet_odds.max()
+    )
+    if not start_times.shape[1]:
+        # No fixture of any day has a suitable bet
+        no_bets = np.zeros(len(configs), dtype=np.int64)
+        return no_bets, no_bets, no_bets, np.ones((len(configs), len(days)))
+
+    has_bet, chosen_odds, chosen_won = get_suitable_bets(odds, won, maximum_bet_odds)
+    # What a bet does to the bankroll, nothing if it is not settled, and whether it
+    # was won, with the fixture positions first so that every step of the walk
+    # reads contiguous memory
+    settled = settled[np.newaxis]
+    factors, has_bet, chosen_won = (
+        np.ascontiguousarray(np.moveaxis(array, 2, 0))
+        for array in (
+            np.where(
+                settled,
+                np.where(
+                    chosen_won,
+                    1 - stake_fraction + stake_fraction * chosen_odds,
+                    1 - stake_fraction,
+                ),
+                1.0,
+            ),
+            has_bet,
+            chosen_won & settled,
+        )
+    )
+    settled = np.ascontiguousarray(settled[0].T)
+
+    walks: dict[tuple[float, float], int] = {}
+    walk_indexes = np.array(
+        [
+            walks.setdefault(
+                (config["maximum_bet_odd"], config["minimum_hours_between_matches"]),
+                len(walks),
+            )
+            for config in configs
+        ]
+    )
+    max_number_of_bets = np.array(
+        [config["max_number_of_bets_per_day"] for config in configs]
+    )
+    odd_indexes = np.searchsorted(maximum_bet_odds, [odd for odd, _ in walks])
+    hours_between_matches = np.array([hours for _, hours in walks], dtype=float)[
+        :, None
+    ]
+    walk_max_number_of_bets = np.zeros(len(walks), dtype=np.int64)
+    np.maximum.at(walk_max_number_of_bets, walk_indexes, max_number_of_bets)
+    walk_max_number_of_bets = walk_max_number_of_bets[:, None]
+
+    shape = (len(walks), len(days))
+    last_start_times = np.full(shape, -np.inf)
+    bets = np.zeros(shape, dtype=np.int64)
+    settled_bets = np.zeros(shape, dtype=np.int64)
+    won_bets = np.zeros(shape, dtype=np.int64)
+    multipliers = np.ones(shape)
+    # State of each walk and day after its n-th bet
+    bet_slots = shape + (walk_max_number_of_bets.max() + 1,)
+    multipliers_after = np.ones(bet_slots)
+    settled_bets_after = np.zeros(bet_slots, dtype=np.int64)
+    won_bets_after = np.zeros(bet_slots, dtype=np.int64)
+    # Buffers reused by every step
+    hours = np.empty(shape)
+    taken = np.empty(shape, dtype=bool)
+    mask = np.empty(shape, dtype=bool)
+    factor = np.empty(shape)
+
+    for index in range(start_times.shape[1]):
+        start_time = start_times[:, index]
+        # The checks of `select_greedy`: a suitable bet, far enough from the last
+        # taken match, with bets left for the day. Padding never has a bet.
+        np.take(has_bet[index], odd_indexes, axis=0, out=taken)
+        with np.errstate(invalid="ignore"):
+            np.subtract(start_time, last_start_times, out=hours)
+        hours /= 3600
+        taken &= np.greater_equal(hours, hours_between_matches, out=mask)
+        taken &= np.less(bets, walk_max_number_of_bets, out=mask)
+        np.copyto(last_start_times, start_time, where=taken)
+        bets += taken
+
+        np.take(factors[index], odd_indexes, axis=0, out=factor)
+        np.multiply(multipliers, factor, out=multipliers, where=taken)
+        settled_bets += np.logical_and(taken, settled[index], out=mask)
+        won_bets += np.logical_and(
+            taken, np.take(chosen_won[index], odd_indexes, axis=0, out=mask), out=mask
+        )
+
+        walk_rows, day_columns = np.nonzero(taken)
+        slots = (walk_rows, day_columns, bets[walk_rows, day_columns])
+        multipliers_after[slots] = multipliers[walk_rows, day_columns]
+        settled_bets_after[slots] = settled_bets[walk_rows, day_columns]
+        won_bets_after[slots] = won_bets[walk_rows, day_columns]
+
+    # Each config reads the state of its walk after its own number of bets
+    config_bets = np.minimum(max_number_of_bets[:, None], bets[walk_indexes])
+    slots = (walk_indexes[:, None], np.arange(len(days)), config_bets)
+    return (
+        config_bets.sum(axis=1),
+        settled_bets_after[slots].sum(axis=1),
+        won_bets_after[slots].sum(axis=1),
+        multipliers_after[slots],
+    )
+
+
+def backtest(
+    days: list[list[RecordedFixture]],
+    configs: list[dict[str, Any]],
+    stake_fraction: float = 1.0,
+    initial_bankroll: float = 1.0,
+) -> BacktestResult:
+    """
+    Replay the recorded days through the greedy selection of `get_matches_to_bet`
+    for every config, each a dict of `GRID_PARAMETERS`.
+
+    Each bet stakes `stake_fraction` of the bankroll, 1.0 being how the bets are
+    placed live: the whole balance, rolled over from one bet to the next.
+    """
+    number_of_configs = len(configs)
+    bets = np.zeros(number_of_configs, dtype=np.int64)
+    settled = np.zeros(number_of_configs, dtype=np.int64)
+    wins = np.zeros(number_of_configs, dtype=np.int64)
+    multipliers = np.ones((number_of_configs, len(days)))
+
+    bet_types = dict.fromkeys(config["bet_type"] for config in configs)
+    for bet_type in bet_types:
+        indexes = [
+            index
+            for index, config in enumerate(configs)
+            if config["bet_type"] == bet_type
+        ]
+        (
+            bets[indexes],
+            settled[indexes],
+            wins[indexes],
+            multipliers[indexes],
+        ) = backtest_bet_type(
+            days, bet_type, [configs[index] for index in indexes], stake_fraction
+        )
+
+    bankroll = initial_bankroll * np.concatenate(
+        [np.ones((number_of_configs, 1)), np.cumprod(multipliers, axis=1)], axis=1
+    )
+    return BacktestResult(configs, bets, settled, wins, bankroll)
+
+
+def get_recorded_bet_types(days: list[list[RecordedFixture]]) -> set[str]:
+    """Names of the markets the recorded days hold odds for."""
+    return {
+        market["name"]
+        for day in days
+        for recorded in day
+        for market in recorded.markets
+        if market["name"]
+    }
+
+
+def load_recorded_days(
+    store: HistoryStore,
+    start: datetime,
+    end: datetime,
+    timezone: tzinfo,
+    results: Optional[dict[str, frozenset]] = None,
+) -> list[list[RecordedFixture]]:
+    """
+    The offers recorded by discovery runs for the matches starting within [start, end),
+    one list per local day. Each outcome keeps the first odd discovery saw.
+    `results` maps fixture ids to their winning outcome ids, the history does not
+    hold them. Odds are only recorded for the `bet_type` market of the fixtures a
+    live run fetched, so a replay only sees those fixtures and that market:
+    configs reaching past the live selection replay part of the offer.
+    Markets recorded before the history kept their name match no `bet_type`.
+    """
+    results = results or {}
+    fixtures: dict[str, RecordedFixture] = {}
+    seen = set()
+    for row in store.get_recorded_offers(start, end):
+        recorded = fixtures.get(row["fixture_id"])
+        if recorded is None:
+            league = League(
+                id=row["league_id"],
+                name=row["league_name"],
+                league_seo_name=row["league_seo_name"],
+                category_id="",
+                category=Category(id="", seo_name=row["category_seo_name"]),
+            )
+            recorded = fixtures[row["fixture_id"]] = RecordedFixture(
+                fixture=Fixture(
+                    id=row["fixture_id"],
+                    name=row["name"],
+                    start_time=datetime.fromtimestamp(
+                        row["start_time"] / 1000, timezone
+                    ),
+                    match_seo_name=row["match_seo_name"],
+                    league=league,
+                ),
+                markets=[],
+                winning_outcome_ids=results.get(row["fixture_id"]),
+            )
+        if (row["fixture_id"], row["outcome_id"]) in seen:
+            continue
+        seen.add((row["fixture_id"], row["outcome_id"]))
+
+        market = next(
+            (
+                market
+                for market in recorded.markets
+                if market["marketTypeId"] == row["market_type_id"]
+            ),
+            None,
+        )
+        if market is None:
+            market = {
+                "name": row["market_name"],
+                "marketTypeId": row["market_type_id"],
+                "marketTypeName": row["market_type_name"],
+                "outcomes": [],
+            }
+            recorded.markets.append(market)
+        market["outcomes"].append(
+            {"id": row["outcome_id"], "name": row["outcome_name"], "odds": row["odds"]}
+        )
+
+    days: dict[Any, list[RecordedFixture]] = {}
+    for recorded in fixtures.values():
+        days.setdefault(recorded.fixture.start_time.date(), []).append(recorded)
+    return [days[date] for date in sorted(days)]
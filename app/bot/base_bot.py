@@ -1,12 +1,14 @@
 import uuid
+import base64
 import time
 import random
 import requests
 
 
-from typing import Optional
+from typing import Any, Optional
+from requests.adapters import HTTPAdapter
 
-from seleniumwire import webdriver
+from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.remote.webelement import WebElement
@@ -20,7 +22,11 @@ from selenium.common.exceptions import (
 
 from utils.webdriver import get_new_driver
 from utils.headers import get_headers
-from config.config import load_yaml
+from utils.http_cache import ResponseCache
+from utils.session_store import get_session_store, serialize_session
+from utils.profile_cache import get_profile_cache
+from utils.runtime import runtime
+from utils.tracing import span
 
 
 class BaseBot:
@@ -32,10 +38,11 @@ class BaseBot:
         proxy_password: str,
         proxy_host: str,
         proxy_port: int,
+        config: Optional[dict[str, Any]] = None,
     ):
-        self.bot_config = load_yaml()
+        # Accounts of a multi-account run bring their own config
+        self.bot_config = config or runtime.get_config()
 
-        self.driver = get_new_driver(proxy_user, proxy_password, proxy_host, proxy_port)
         self.app_email = app_email
         self.app_password = app_password
         self.proxy_user = proxy_user
@@ -43,7 +50,10 @@ class BaseBot:
         self.proxy_host = proxy_host
         self.proxy_port = proxy_port
 
-        self.wait = WebDriverWait(self.driver, self.bot_config["driver"]["wait_time"])
+        # The browser is only started when a code path needs it
+        self._driver = None
+        self._wait = None
+        self.browser_logged_in = False
 
         self.session = requests.Session()
         self.session.proxies = {
@@ -52,23 +62,95 @@ class BaseBot:
         }
         self.session.headers.update(get_headers())
 
+        # Size the connection pool to the discovery fan-out so that parallel
+        # requests reuse connections instead of opening new ones.
+        pool_size = max(
+            self.bot_config["discovery"]["fixtures_fetch_workers"],
+            self.bot_config["discovery"]["markets_prefetch_depth"],
+            1,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.response_cache = ResponseCache(
+            directory=self.bot_config["cache"]["directory"],
+            endpoint_ttls={
+                self.bot_config["website"][endpoint]: ttl
+                for endpoint, ttl in self.bot_config["cache"]["ttl"].items()
+            },
+        )
+
+        self.session_store = get_session_store(self.bot_config["session_store"])
+        self.profile_cache = get_profile_cache(self.bot_config["profile_cache"])
+
+        # Requests are traced under the name of their `website` endpoint
+        self.endpoint_patterns = [
+            (ResponseCache.template_to_pattern(template), endpoint)
+            for endpoint, template in self.bot_config["website"].items()
+            if isinstance(template, str) and template.startswith("http")
+        ]
+
+    @property
+    def driver(self) -> webdriver.Chrome:
+        """The browser, started on first use."""
+        if self._driver is None:
+            user_data_dir = None
+            if self.profile_cache:
+                with span("restore_profile") as restore_span:
+                    restore_span.set_attributes(
+                        restored=self.profile_cache.restore(self.app_email)
+                    )
+                user_data_dir = self.profile_cache.directory
+            self._driver = get_new_driver(
+                self.proxy_user,
+                self.proxy_password,
+                self.proxy_host,
+                self.proxy_port,
+                backend=self.bot_config["driver"]["backend"],
+                user_data_dir=user_data_dir,
+            )
+            self._wait = WebDriverWait(
+                self._driver, self.bot_config["driver"]["wait_time"]
+            )
+        return self._driver
+
+    @property
+    def wait(self) -> WebDriverWait:
+        if self._wait is None:
+            self.driver
+        return self._wait
+
+    @property
+    def has_driver(self) -> bool:
+        """Check if the browser was started."""
+        return self._driver is not None
+
     def visit_url(self, url: str) -> None:
         """Visit a given URL"""
-        self.driver.get(url)
+        with span("visit_url"):
+            self.driver.get(url)
+
+    def pause(self, delay: str) -> None:
+        """Sleep for a random time within the [min, max] seconds of a `driver` delay."""
+        time.sleep(random.uniform(*self.bot_config["driver"][delay]))
 
     def click(self, locator: tuple[By, str] = None, parent: WebElement = None) -> None:
         """Click on an element either using driver or element itself"""
         try:
-            if parent:
-                self.wait.until(lambda _: parent.is_enabled() and parent.is_displayed())
-                parent.click()
-            else:
-                self.wait.until(EC.element_to_be_clickable(locator)).click()
+            with span("click", locator=str(locator)):
+                if parent:
+                    self.wait.until(
+                        lambda _: parent.is_enabled() and parent.is_displayed()
+                    )
+                    parent.click()
+                else:
+                    self.wait.until(EC.element_to_be_clickable(locator)).click()
         except ElementClickInterceptedException:
             # Reload page and try again
             self.driver.refresh()
             self.click(locator=locator, parent=parent)
-        time.sleep(random.uniform(0, 1))
+        self.pause("click_delay")
 
     def send_keys(
         self, text: str, locator: tuple[By, str] = None, parent: WebElement = None
@@ -79,10 +161,11 @@ class BaseBot:
         else:
             input_element = self.wait.until(EC.presence_of_element_located(locator))
 
-        input_element.clear()
-        for char in text:
-            input_element.send_keys(char)
-            time.sleep(random.uniform(0, 2))
+        with span("send_keys", locator=str(locator)):
+            input_element.clear()
+            for char in text:
+                input_element.send_keys(char)
+                self.pause("typing_delay")
 
     def get_element(
         self, locator: tuple[By, str] = None, parent: WebElement = None
@@ -90,12 +173,13 @@ class BaseBot:
         """Get an element located by the given locator either globally
         or from a parent element."""
         try:
-            if parent:
-                return WebDriverWait(parent, 10).until(
-                    lambda x: x.find_element(*locator)
-                )
-            else:
-                return self.wait.until(EC.presence_of_element_located(locator))
+            with span("get_element", locator=str(locator)):
+                if parent:
+                    return WebDriverWait(parent, 10).until(
+                        lambda x: x.find_element(*locator)
+                    )
+                else:
+                    return self.wait.until(EC.presence_of_element_located(locator))
         except (TimeoutException, NoSuchElementException):
             print(f"Element not found: {locator}")
             return None
@@ -120,57 +204,153 @@ class BaseBot:
         """Refresh the current page"""
         self.driver.refresh()
 
-    def take_screenshot(self) -> str:
-        """Take a screenshot of the current page and return the file path."""
-        screenshot_name = f"/tmp/screenshot_{uuid.uuid4().hex}.png"
-        try:
-            self.driver.save_screenshot(screenshot_name)
-            return screenshot_name
-        except Exception as e:
-            print(f"Error saving screenshot: {e}")
-        finally:
-            return screenshot_name
+    def take_screenshot(self, max_size: Optional[int] = None) -> Optional[str]:
+        """
+        Take a screenshot of the current page and return the file path.
+        Return None if the browser was never started.
+
+        The screenshot is captured as a JPEG at `driver.screenshot_quality`, and
+        captured again at lower qualities while it is over `max_size` bytes.
+        A PNG is saved instead if Chrome cannot capture a JPEG.
+        """
+        if not self.has_driver:
+            return None
+
+        screenshot_name = f"/tmp/screenshot_{uuid.uuid4().hex}"
+        with span("take_screenshot") as screenshot_span:
+            try:
+                quality = self.bot_config["driver"]["screenshot_quality"]
+                while True:
+                    screenshot = base64.b64decode(
+                        self.driver.execute_cdp_cmd(
+                            "Page.captureScreenshot",
+                            {"format": "jpeg", "quality": quality},
+                        )["data"]
+                    )
+                    if max_size is None or len(screenshot) <= max_size or quality <= 10:
+                        break
+                    quality //= 2
+                screenshot_name += ".jpg"
+                with open(screenshot_name, "wb") as f:
+                    f.write(screenshot)
+                screenshot_span.set_attributes(quality=quality, bytes=len(screenshot))
+            except Exception as e:
+                print(f"Error capturing a JPEG screenshot: {e}")
+                screenshot_name += ".png"
+                try:
+                    self.driver.save_screenshot(screenshot_name)
+                except Exception as e:
+                    print(f"Error saving screenshot: {e}")
+        return screenshot_name
 
     def set_session_cookies(self, max_attempts: int = 5) -> None:
         """
         Set session cookies from the browser after authentication.
         Ensure that cookies work by testing the balance endpoint.
         Retry up to `max_attempts` times.
+        The working cookies are saved in the session store.
+        """
+        with span("set_session_cookies") as cookies_span:
+            for attempt in range(1, max_attempts + 1):
+                cookies_span.set_attributes(attempts=attempt)
+                self.session.cookies.clear()
+                driver_cookies = self.driver.get_cookies()
+                cookies = {cookie["name"]: cookie["value"] for cookie in driver_cookies}
+                self.session.cookies.update(cookies)
+                if self.is_session_logged_in():
+                    break
+                time.sleep(5)
+            else:
+                raise ValueError("Authentication cookies could not be obtained.")
+
+        self.session_store.save(
+            self.app_email,
+            serialize_session(
+                driver_cookies, self.bot_config["session_store"]["max_age"]
+            ),
+        )
+
+    def restore_session_cookies(self) -> bool:
         """
-        for _ in range(max_attempts):
+        Restore the cookies saved by a previous successful login.
+        Return False, and forget them, if they expired or were rejected.
+        """
+        stored_session = self.session_store.load(self.app_email)
+        if not stored_session:
+            return False
+
+        if stored_session["expires_at"] > time.time():
             self.session.cookies.clear()
-            cookies = {
-                cookie["name"]: cookie["value"] for cookie in self.driver.get_cookies()
-            }
-            self.session.cookies.update(cookies)
+            self.session.cookies.update(
+                {
+                    cookie["name"]: cookie["value"]
+                    for cookie in stored_session["cookies"]
+                }
+            )
+            if self.is_session_logged_in():
+                return True
+
+        self.session.cookies.clear()
+        self.session_store.clear(self.app_email)
+        return False
+
+    def is_session_logged_in(self) -> bool:
+        """Check if the session cookies are accepted by the balance endpoint."""
+        try:
             response = self.session_send_request(
                 "GET", self.bot_config["website"]["balance_endpoint"]
             )
-            if (
-                response.status_code == 200
-                and response.json().get("status") == "LOGGED_IN"
-            ):
-                break
-            time.sleep(5)
-        else:
-            raise ValueError("Authentication cookies could not be obtained.")
+        except ValueError:
+            return False
+        return (
+            response.status_code == 200 and response.json().get("status") == "LOGGED_IN"
+        )
+
+    def get_endpoint_name(self, url: str) -> str:
+        """Return the name of the `website` endpoint the URL belongs to."""
+        for pattern, endpoint in self.endpoint_patterns:
+            if pattern.fullmatch(url):
+                return endpoint
+        return url.split("?")[0]
 
     def session_send_request(
         self, method: str, url: str, **kwargs
     ) -> requests.models.Response:
         """Send a request using the session with the given method and URL."""
+        with span(
+            "session_send_request", method=method, endpoint=self.get_endpoint_name(url)
+        ) as request_span:
+            try:
+                if method.upper() not in ["GET", "POST"]:
+                    raise ValueError("Invalid HTTP method specified.")
+                if method.upper() == "GET" and self.response_cache.get_ttl(url):
+                    response = self.response_cache.request(self.session, url, **kwargs)
+                else:
+                    response = self.session.request(method, url, **kwargs)
+                request_span.set_attributes(
+                    status=response.status_code, bytes=len(response.content)
+                )
+                response.raise_for_status()
+                return response
+            except requests.RequestException as e:
+                raise ValueError("Error sending requests using session.")
+
+    def close(self, save_profile: bool = False):
+        """
+        Close the driver if it was started. With `save_profile`, the profile of
+        the browser is snapshotted into the profile cache once Chrome has exited.
+        """
+        if not self.has_driver:
+            return
         try:
-            if method.upper() not in ["GET", "POST"]:
-                raise ValueError("Invalid HTTP method specified.")
-            response = self.session.request(method, url, **kwargs)
-            response.raise_for_status()
-            return response
-        except requests.RequestException as e:
-            raise ValueError("Error sending requests using session.")
-
-    def close(self):
-        """Close the driver"""
-        try:
-            self.driver.quit()
+            self._driver.quit()
         except Exception:
-            pass
+            # Chrome may still be writing to the profile, do not snapshot it
+            save_profile = False
+        finally:
+            self._driver = None
+            self._wait = None
+
+        if save_profile and self.profile_cache:
+            with span("save_profile") as save_span:
+                save_span.set_attributes(bytes=self.profile_cache.save(self.app_email))
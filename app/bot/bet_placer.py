@@ -1,8 +1,12 @@
-import time
-import random
+import requests
+
+from typing import Any, Optional
+from urllib3.exceptions import ProtocolError
 
 from bot.website import WebsiteBot
-from utils.exceptions import EventOddsChangedError
+from utils.exceptions import BetslipRejectedError, EventOddsChangedError
+from utils.history import history
+from utils.tracing import traced
 
 from bot.selectors import (
     BET_CONTAINER,
@@ -21,6 +25,8 @@ class BetPlacer:
         bet_option_id: str,
         market_type_name: str,
         bet_amount: float = 0.0,
+        fixture_id: Optional[str] = None,
+        account_key: Optional[str] = None,
     ):
         self.bot = bot
         self.match_url = match_url
@@ -29,11 +35,16 @@ class BetPlacer:
         self.market_type_name = market_type_name
         self.bet_amount = bet_amount or self.bot.get_available_balance()
         self.bet_odd_value = ""
+        self.placement_mode = self.bot.bot_config["placement"]["mode"]
+        # Only used to record the placement in the history
+        self.fixture_id = fixture_id
+        self.account_key = account_key
 
+    @traced("place_bet")
     def place_bet(self) -> str:
         self.bot.visit_url(self.match_url)
         # wait some comfortable amount of time here.
-        time.sleep(random.uniform(15, 30))
+        self.bot.pause("page_settle_delay")
 
         bet_container_locator = (
             BET_CONTAINER[0],
@@ -56,7 +67,7 @@ class BetPlacer:
             float(self.bet_odd_value)
             > self.bot.bot_config["website"]["maximum_bet_odd"]
         ):
-            raise EventOddsChangedError()
+            raise EventOddsChangedError(actual_odd=self.bet_odd_value)
 
         bet_container = self.bot.get_element(locator=bet_container_locator)
         # Means the section is collapsed
@@ -81,5 +92,92 @@ class BetPlacer:
 
         self.bot.click(locator=BETSPLIT_PLACEMENT_BUTTON, parent=None)
 
+    @traced("place_bet_over_http")
+    def place_bet_over_http(self) -> None:
+        """
+        Post the betslip through the logged in session, without the browser.
+        Raise `BetslipRejectedError` only when the bet was certainly not placed.
+        The endpoint and payload are the ones of the stand-in betting site of
+        `benchmarks.betting_site` and have not been checked against the real one.
+        """
+        maximum_bet_odd = self.bot.bot_config["website"]["maximum_bet_odd"]
+        try:
+            response = self.bot.session_send_request(
+                "POST",
+                self.bot.bot_config["website"]["betslip_endpoint"],
+                json={
+                    "stake": self.bet_amount,
+                    "selections": [
+                        {
+                            "marketTypeId": self.market_type_id,
+                            "outcomeId": self.bet_option_id,
+                            "maxOdds": maximum_bet_odd,
+                        }
+                    ],
+                },
+            )
+        except ValueError as e:
+            # A client error or a connection which was never made (DNS failure,
+            # refused connection, connect timeout) means the bet was not taken,
+            # while a read timeout, a connection dropped mid-request or a server
+            # error may hide a placed bet, so it must not be placed again
+            error = e.__context__
+            if (
+                isinstance(error, requests.ConnectionError)
+                and not (error.args and isinstance(error.args[0], ProtocolError))
+            ) or (
+                isinstance(error, requests.HTTPError)
+                and error.response is not None
+                and error.response.status_code < 500
+            ):
+                raise BetslipRejectedError(f"Betslip request failed: {error}")
+            raise
+
+        result = response.json()
+        if result.get("status") == "ODDS_CHANGED":
+            raise EventOddsChangedError(actual_odd=result.get("currentOdds"))
+        if result.get("status") != "PLACED":
+            raise BetslipRejectedError(f"Betslip rejected: {result.get('status')}")
+
+        self.bet_odd_value = str(result["acceptedOdds"][0])
+        print(f"Bet placed over HTTP at odd {self.bet_odd_value}.")
+
+    def record_placement(self, mode: str, status: str, odds: Any = None) -> None:
+        try:
+            odds = float(odds if odds is not None else self.bet_odd_value)
+        except (TypeError, ValueError):
+            odds = None
+        history.record_placement(
+            account=self.account_key,
+            fixture_id=self.fixture_id,
+            market_type_id=self.market_type_id,
+            bet_option_id=self.bet_option_id,
+            stake=self.bet_amount,
+            odds=odds,
+            mode=mode,
+            status=status,
+        )
+
     def run(self):
-        self.place_bet()
+        mode = self.placement_mode
+        try:
+            if mode == "http":
+                try:
+                    self.place_bet_over_http()
+                    self.record_placement(mode, "placed")
+                    return
+                except BetslipRejectedError as e:
+                    print(f"{e} Falling back to the browser.")
+                    mode = "browser"
+
+            # Placing a bet in the browser needs the browser to be logged in as well
+            if not self.bot.login(browser=True):
+                raise ValueError("The browser could not log in to place the bet.")
+            self.place_bet()
+            self.record_placement(mode, "placed")
+        except EventOddsChangedError as e:
+            self.record_placement(mode, "odds_changed", e.actual_odd)
+            raise
+        except Exception:
+            self.record_placement(mode, "failed")
+            raise
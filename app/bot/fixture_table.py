@@ -0,0 +1,97 @@
+import heapq
+import numpy as np
+
+from datetime import datetime, time, timedelta, tzinfo
+from typing import Any, Iterator
+
+from utils.types import Fixture, League
+
+
+def get_tomorrow_window(timezone: tzinfo, minimum_start_hour: int) -> tuple[int, int]:
+    """
+    Return the [start, end) epoch milliseconds of tomorrow in the given timezone,
+    starting at `minimum_start_hour` local time.
+    """
+    tomorrow = (datetime.now(timezone) + timedelta(days=1)).date()
+    start = timezone.localize(datetime.combine(tomorrow, time(minimum_start_hour)))
+    end = timezone.localize(datetime.combine(tomorrow + timedelta(days=1), time()))
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+
+class FixtureTable:
+    """
+    Columnar table of the raw fixtures of all leagues.
+    Start times are kept in an int64 epoch-ms column so filtering and sorting
+    run over the whole day at once, and `Fixture` records are only built
+    for the rows which are kept.
+    Rows of a league are contiguous, which lets `iter_fixtures` merge the
+    already ordered leagues instead of sorting the whole day.
+    """
+
+    def __init__(self):
+        self.leagues: list[League] = []
+        self.raw_fixtures: list[dict[str, Any]] = []
+        self._start_times: list[int] = []
+        self._league_offsets: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.raw_fixtures)
+
+    def add_league_fixtures(
+        self, league: League, raw_fixtures: list[dict[str, Any]]
+    ) -> None:
+        """Append the fixtures of a league, as returned by the fixtures endpoint."""
+        self.leagues.append(league)
+        self._league_offsets.append(len(self.raw_fixtures))
+        self.raw_fixtures.extend(raw_fixtures)
+        self._start_times.extend(fixture["startDatetime"] for fixture in raw_fixtures)
+
+    @property
+    def start_times(self) -> np.ndarray:
+        return np.asarray(self._start_times, dtype=np.int64)
+
+    def iter_fixtures(
+        self, window_start: int, window_end: int, timezone: tzinfo
+    ) -> Iterator[Fixture]:
+        """
+        Lazily yield the fixtures starting within [window_start, window_end) by start
+        time, by heap-merging the per-league runs of rows. Rows with equal start times
+        keep their insertion order.
+        """
+        start_times = self.start_times
+        in_window = (start_times >= window_start) & (start_times < window_end)
+        offsets = self._league_offsets + [len(self)]
+
+        runs = []
+        for league_index, (start, end) in enumerate(zip(offsets, offsets[1:])):
+            rows = np.nonzero(in_window[start:end])[0] + start
+            if rows.size == 0:
+                continue
+            league_start_times = start_times[rows]
+            # Leagues come back ordered by time, but do not rely on it
+            if np.any(league_start_times[1:] < league_start_times[:-1]):
+                order = np.argsort(league_start_times, kind="stable")
+                rows, league_start_times = rows[order], league_start_times[order]
+            runs.append(
+                zip(
+                    league_start_times.tolist(),
+                    rows.tolist(),
+                    [league_index] * rows.size,
+                )
+            )
+
+        # Equal start times are ordered by row
+        for _, row, league_index in heapq.merge(*runs):
+            yield self.build_fixture(row, league_index, timezone)
+
+    def build_fixture(self, row: int, league_index: int, timezone: tzinfo) -> Fixture:
+        raw_fixture = self.raw_fixtures[row]
+        return Fixture(
+            id=raw_fixture["id"],
+            name=raw_fixture["name"],
+            start_time=datetime.fromtimestamp(
+                raw_fixture["startDatetime"] / 1000, timezone
+            ),
+            match_seo_name=raw_fixture["seoName"],
+            league=self.leagues[league_index],
+        )
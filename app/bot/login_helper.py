@@ -1,4 +1,5 @@
 from bot.base_bot import BaseBot
+from utils.tracing import traced
 
 from bot.selectors import (
     COOKIES_ACCEPT_BUTTON,
@@ -9,6 +10,7 @@ from bot.selectors import (
 )
 
 
+@traced("login_to_website")
 def login_to_website(bot: BaseBot, username: str, password: str) -> None:
     """Login to the website using the provided username and password."""
     print("Logging in to the website.")
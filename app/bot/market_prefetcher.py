@@ -0,0 +1,118 @@
+from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from utils.types import Fixture
+
+
+class MarketPrefetcher:
+    """
+    Speculatively fetch the markets of upcoming fixtures while the current one
+    is being evaluated.
+
+    Fixtures must be sorted by `start_time` and are pulled lazily from the given
+    iterable, only as far as the walk and its lookahead need them. Only fixtures which still respect
+    `hours_between_matches` relative to the last selected match are prefetched,
+    at most `depth` at a time. Prefetches which can no longer be selected are
+    cancelled, so the consumer sees exactly the same markets as a serial walk.
+    """
+
+    def __init__(
+        self,
+        fetch_markets: Callable[[Fixture], list[dict[str, Any]]],
+        fixtures: Iterable[Fixture],
+        depth: int,
+        hours_between_matches: float,
+    ):
+        self.fetch_markets = fetch_markets
+        self.source = iter(fixtures)
+        self.depth = depth
+        self.hours_between_matches = hours_between_matches
+
+        self.executor = ThreadPoolExecutor(max_workers=depth) if depth > 0 else None
+        self.futures: dict[int, tuple[Fixture, Future]] = {}
+        # Fixtures pulled from the source ahead of the walk, by index
+        self.buffer: dict[int, Fixture] = {}
+        self.pulled = 0
+        # Index of the next fixture which was not yet considered for prefetching
+        self.next_index = 0
+
+    def __enter__(self) -> "MarketPrefetcher":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[tuple[int, Fixture]]:
+        """Walk the fixtures in order, yielding their index along with them."""
+        index = 0
+        while self.get_fixture(index) is not None:
+            yield index, self.buffer.pop(index)
+            index += 1
+
+    def get_fixture(self, index: int) -> Optional[Fixture]:
+        """Return the fixture at `index`, pulling it from the source if needed."""
+        while self.pulled <= index:
+            fixture = next(self.source, None)
+            if fixture is None:
+                return None
+            self.buffer[self.pulled] = fixture
+            self.pulled += 1
+        return self.buffer.get(index)
+
+    def is_far_enough(
+        self, fixture: Fixture, last_start_time: Optional[datetime]
+    ) -> bool:
+        """Check if the fixture starts at least `hours_between_matches` after the last match."""
+        if last_start_time is None:
+            return True
+        return (
+            fixture.start_time - last_start_time
+        ).total_seconds() / 3600 >= self.hours_between_matches
+
+    def get(
+        self, index: int, fixture: Fixture, last_start_time: Optional[datetime]
+    ) -> list[dict[str, Any]]:
+        """
+        Return the markets of the fixture found at `index`, given the start time of the
+        last selected match, and schedule prefetches for the next eligible fixtures.
+        """
+        if self.executor is None:
+            return self.fetch_markets(fixture)
+
+        # Drop prefetches which were skipped or fall within the gap of the last match
+        for future_index, (future_fixture, future) in list(self.futures.items()):
+            if future_index < index or not self.is_far_enough(
+                future_fixture, last_start_time
+            ):
+                self.futures.pop(future_index)
+                future.cancel()
+
+        self.next_index = max(self.next_index, index)
+        if index not in self.futures:
+            self.submit(index, fixture)
+            self.next_index = max(self.next_index, index + 1)
+
+        while len(self.futures) < self.depth:
+            next_fixture = self.get_fixture(self.next_index)
+            if next_fixture is None:
+                break
+            if self.is_far_enough(next_fixture, last_start_time):
+                self.submit(self.next_index, next_fixture)
+            self.next_index += 1
+
+        return self.futures.pop(index)[1].result()
+
+    def submit(self, index: int, fixture: Fixture) -> None:
+        self.futures[index] = (
+            fixture,
+            self.executor.submit(self.fetch_markets, fixture),
+        )
+
+    def close(self) -> None:
+        """Cancel outstanding prefetches without waiting for the running ones."""
+        for _, future in self.futures.values():
+            future.cancel()
+        self.futures.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
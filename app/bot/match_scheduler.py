@@ -1,16 +1,69 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Any, Optional
 
-from bot.website import WebsiteBot
-from utils.scheduler import create_schedule
-from utils.types import TriggerType
+from bot.website import TIMEZONE, WebsiteBot
+from bot.offer_snapshot import OfferSnapshot
+from utils.history import history
+from utils.scheduler import (
+    get_match_schedule_name,
+    get_match_schedule_prefix,
+    get_schedule_manager,
+)
+from utils.types import MatchesToBetDict, TriggerType
+
+# The bet of a match is placed this long before it starts
+SCHEDULE_LEAD = timedelta(minutes=15)
+
+
+def get_match_schedule(
+    match: MatchesToBetDict, config: dict[str, Any], account_key: Optional[str] = None
+) -> tuple[str, tuple[datetime, dict[str, Any]]]:
+    """
+    Return the name, start date and PLACE_BET payload of the schedule of a match.
+    `account_key` is set for the accounts of a multi-account run, so that their
+    schedules do not collide and name the account whose bet they place.
+    """
+    schedule_name = get_match_schedule_name(match["id"], account_key)
+    match_url = config["website"]["match_base_url"].format(
+        match["category_seo_name"],
+        match["league_seo_name"],
+        match["match_seo_name"],
+    )
+    payload = {
+        "trigger_type": TriggerType.PLACE_BET,
+        # Lets the odds be checked again before starting the browser
+        "fixture_id": match["id"],
+        "market_type_name": match["market_type_name"],
+        "market_type_id": match["market_type_id"],
+        "bet_option_id": match["bet_option_id"],
+        "match_name": match["name"],
+        "match_url": match_url,
+        # We need this so that we have a reference to the
+        # Amazon EventBridge event that triggered the Lambda
+        "schedule_name": schedule_name,
+        "schedule_group": config["scheduler"]["group_name"],
+        "start_time": match["start_time"].strftime("%Y-%m-%d %H:%M:%S"),
+        "odd_value": match["odd_value"],
+    }
+    if account_key:
+        # Tells which account the bet is placed with
+        payload["account"] = account_key
+    return schedule_name, (match["start_time"] - SCHEDULE_LEAD, payload)
 
 
 class MatchesScheduler:
-    def __init__(self, bot: WebsiteBot):
+    def __init__(
+        self,
+        bot: WebsiteBot,
+        account_key: Optional[str] = None,
+        offer_snapshot: Optional[OfferSnapshot] = None,
+    ):
         self.bot = bot
+        self.account_key = account_key
+        self.offer_snapshot = offer_snapshot
 
     def schedule_matches(self):
-        self.matches = self.bot.get_matches_to_bet()
+        self.matches = self.bot.get_matches_to_bet(offer_snapshot=self.offer_snapshot)
         self.matches_formatted = [
             {
                 "name": match["name"],
@@ -24,29 +77,24 @@ class MatchesScheduler:
             }
             for match in self.matches
         ]
+        schedules = dict(
+            get_match_schedule(match, self.bot.bot_config, self.account_key)
+            for match in self.matches
+        )
+
+        # The matches are picked among the ones of tomorrow, so a previous run of
+        # the same account for that day is replaced, the pending bets of today are not
+        day = (datetime.now(TIMEZONE) + timedelta(days=1)).strftime("%Y-%m-%d")
+        schedule_manager = get_schedule_manager(self.bot.bot_config["scheduler"])
+        report = schedule_manager.sync_schedules(
+            schedules,
+            prefix=get_match_schedule_prefix(self.account_key),
+            replaces=lambda payload: payload.get("account") == self.account_key
+            and payload.get("start_time", "").startswith(day),
+        )
+        print(f"Schedules: {report}")
         for match in self.matches:
-            schedule_name = f"match-schedule-{match['id']}".replace(":", "-")
-            start_date = match["start_time"] - timedelta(minutes=15)
-            create_schedule(
-                schedule_name=schedule_name,
-                start_date=start_date,
-                payload={
-                    "trigger_type": TriggerType.PLACE_BET,
-                    "market_type_name": match["market_type_name"],
-                    "market_type_id": match["market_type_id"],
-                    "bet_option_id": match["bet_option_id"],
-                    "match_name": match["name"],
-                    "match_url": self.bot.bot_config["website"][
-                        "match_base_url"
-                    ].format(
-                        match["category_seo_name"],
-                        match["league_seo_name"],
-                        match["match_seo_name"],
-                    ),
-                    # We need this so that we have a reference to the
-                    # Amazon EventBridge event that triggered the Lambda
-                    "schedule_name": schedule_name,
-                    "start_time": match["start_time"].strftime("%Y-%m-%d %H:%M:%S"),
-                    "odd_value": match["odd_value"],
-                },
-            )
+            _, payload = schedules[
+                get_match_schedule_name(match["id"], self.account_key)
+            ]
+            history.record_schedule(payload, match["start_time"])
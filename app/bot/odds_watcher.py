@@ -0,0 +1,295 @@
+from datetime import datetime, time, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from bot.website import TIMEZONE, WebsiteBot
+from bot.offer_snapshot import OfferSnapshot
+from bot.fixture_table import get_tomorrow_window
+from bot.match_scheduler import SCHEDULE_LEAD, get_match_schedule
+from utils.accounts import Account, get_account
+from utils.history import history
+from utils.scheduler import ScheduleManager
+from utils.tracing import span
+from utils.types import Fixture, MatchesToBetDict, TriggerType
+
+# Stands for an odd which could not be fetched, as opposed to a bet option which
+# is no longer offered (None)
+UNKNOWN_ODD = object()
+
+
+def has_free_slot(
+    start: datetime, end: datetime, other_start_times: list[datetime], gap: timedelta
+) -> bool:
+    """
+    Whether some time of [start, end) keeps `gap` from every one of
+    `other_start_times`, i.e. lies outside all the (other - gap, other + gap) ranges.
+    """
+    cursor = start
+    for other in sorted(other_start_times):
+        if cursor >= end:
+            return False
+        if cursor <= other - gap:
+            return True
+        cursor = max(cursor, other + gap)
+    return cursor < end
+
+
+class OddsWatcher:
+    """
+    Sweep the pending match schedules and deal with the ones whose bet moved past
+    the `maximum_bet_odd` of their account, long before their PLACE_BET invocation
+    would start a browser only to find out.
+
+    The payloads of the schedules are read, then the current odds of their bet
+    options are fetched over plain HTTP, `watcher.workers` at a time. A schedule
+    whose odd went over `maximum_bet_odd`, or whose bet option is no longer offered,
+    is cancelled. With the "replace" action, the closest fixture of the same day
+    which has a suitable bet and keeps `minimum_hours_between_matches` from the
+    other schedules of the account is scheduled in its place. The offer is only
+    downloaded when a schedule has to be replaced.
+    """
+
+    def __init__(self, bot: WebsiteBot, schedule_manager: ScheduleManager):
+        self.bot = bot
+        self.config = bot.bot_config
+        self.schedule_manager = schedule_manager
+        self.workers = self.config["watcher"]["workers"]
+        self.action = self.config["watcher"]["action"]
+        self.minimum_lead = timedelta(
+            minutes=self.config["watcher"]["minimum_lead_minutes"]
+        )
+        self._offer_snapshot = None
+
+    @staticmethod
+    def get_start_time(payload: dict[str, Any]) -> datetime:
+        return TIMEZONE.localize(
+            datetime.strptime(payload["start_time"], "%Y-%m-%d %H:%M:%S")
+        )
+
+    def get_earliest_start_time(self) -> datetime:
+        """Matches starting before this are left to the odds check of PLACE_BET."""
+        return datetime.now(TIMEZONE) + SCHEDULE_LEAD + self.minimum_lead
+
+    def get_scheduled_bets(self) -> list[dict[str, Any]]:
+        """Payloads of the PLACE_BET schedules of the schedule group."""
+        return [
+            payload
+            for payload in self.schedule_manager.get_schedule_payloads().values()
+            if payload.get("trigger_type") == TriggerType.PLACE_BET
+        ]
+
+    def get_current_odd(self, payload: dict[str, Any]) -> Any:
+        try:
+            current_odd = self.bot.get_outcome_odd(
+                payload["fixture_id"],
+                payload["market_type_id"],
+                payload["bet_option_id"],
+            )
+        except ValueError as e:
+            print(f"Could not check the odd of {payload['match_name']}: {e}")
+            return UNKNOWN_ODD
+        history.record_outcome_odd(
+            payload["fixture_id"],
+            payload["market_type_id"],
+            payload["bet_option_id"],
+            current_odd,
+            source="watcher",
+        )
+        return current_odd
+
+    def get_current_odds(self, schedules: list[dict[str, Any]]) -> list[Any]:
+        """Fetch the current odd of every schedule, concurrently."""
+        if not schedules:
+            return []
+        with ThreadPoolExecutor(
+            max_workers=min(self.workers, len(schedules))
+        ) as executor:
+            return list(executor.map(self.get_current_odd, schedules))
+
+    def get_offer_snapshot(self) -> OfferSnapshot:
+        if self._offer_snapshot is None:
+            self._offer_snapshot = self.bot.get_offer_snapshot()
+        return self._offer_snapshot
+
+    def find_replacement(
+        self,
+        payload: dict[str, Any],
+        account_config: dict[str, Any],
+        other_start_times: list[datetime],
+        scheduled_fixture_ids: set[str],
+    ) -> Optional[MatchesToBetDict]:
+        """
+        Find the fixture closest to the one of `payload` which starts the same day,
+        keeps `minimum_hours_between_matches` from `other_start_times` and has a
+        suitable bet. Markets are fetched closest first, `watcher.workers` at a time.
+        The offer is not downloaded when no time of the day could be spaced out from
+        `other_start_times`.
+        """
+        start_time = self.get_start_time(payload)
+        earliest_start_time = self.get_earliest_start_time()
+        gap = timedelta(
+            hours=account_config["website"]["minimum_hours_between_matches"]
+        )
+        maximum_bet_odd = account_config["website"]["maximum_bet_odd"]
+
+        # The offer endpoints only serve tomorrow, so once the day of the matches
+        # has come there is nothing of the same day to replace them with
+        window_start, window_end = get_tomorrow_window(
+            TIMEZONE, account_config["website"]["bet_events_minimum_start_hour"]
+        )
+        day_start = TIMEZONE.localize(datetime.combine(start_time.date(), time()))
+        day_end = TIMEZONE.localize(
+            datetime.combine(start_time.date() + timedelta(days=1), time())
+        )
+        if not has_free_slot(
+            max(
+                day_start,
+                earliest_start_time,
+                datetime.fromtimestamp(window_start / 1000, TIMEZONE),
+            ),
+            min(day_end, datetime.fromtimestamp(window_end / 1000, TIMEZONE)),
+            other_start_times,
+            gap,
+        ):
+            return None
+
+        offer_snapshot = self.get_offer_snapshot()
+        candidates: list[Fixture] = [
+            fixture
+            for fixture in offer_snapshot.iter_fixtures(
+                window_start, window_end, TIMEZONE
+            )
+            if fixture.id not in scheduled_fixture_ids
+            and fixture.start_time.date() == start_time.date()
+            and fixture.start_time >= earliest_start_time
+            and all(
+                abs(fixture.start_time - other) >= gap for other in other_start_times
+            )
+        ]
+        candidates.sort(key=lambda fixture: abs(fixture.start_time - start_time))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for offset in range(0, len(candidates), self.workers):
+                batch = candidates[offset : offset + self.workers]
+                for fixture, fixture_markets in zip(
+                    batch, executor.map(offer_snapshot.get_markets, batch)
+                ):
+                    match = self.bot.get_match_to_bet(
+                        fixture, fixture_markets, maximum_bet_odd
+                    )
+                    if match:
+                        return match
+        return None
+
+    def sweep(self) -> list[dict[str, Any]]:
+        """Check every pending schedule. Return a row per schedule which was acted on."""
+        with span("watch_odds") as watch_span:
+            scheduled_bets = self.get_scheduled_bets()
+            earliest_start_time = self.get_earliest_start_time()
+            schedules = [
+                payload
+                for payload in scheduled_bets
+                # Schedules created before the fixture id was part of the payload
+                # cannot be checked
+                if payload.get("fixture_id")
+                and self.get_start_time(payload) >= earliest_start_time
+            ]
+            current_odds = dict(
+                zip(
+                    (payload["schedule_name"] for payload in schedules),
+                    self.get_current_odds(schedules),
+                )
+            )
+            watch_span.set_attributes(schedules=len(schedules))
+
+        scheduled_fixture_ids = {
+            payload.get("fixture_id") for payload in scheduled_bets
+        }
+        # Start times of the schedules which are kept, per account
+        kept_start_times: dict[Optional[str], list[datetime]] = {}
+        accounts: dict[Optional[str], Account] = {}
+        moved = []
+        for payload in scheduled_bets:
+            try:
+                account_key = payload.get("account")
+                if account_key not in accounts:
+                    accounts[account_key] = get_account(self.config, account_key)
+                account = accounts[account_key]
+            except ValueError as e:
+                print(f"Skipping {payload['schedule_name']}: {e}")
+                continue
+            current_odd = current_odds.get(payload["schedule_name"], UNKNOWN_ODD)
+            maximum_bet_odd = account.config["website"]["maximum_bet_odd"]
+            if current_odd is UNKNOWN_ODD or (
+                current_odd is not None and current_odd <= maximum_bet_odd
+            ):
+                kept_start_times.setdefault(account.key, []).append(
+                    self.get_start_time(payload)
+                )
+                continue
+            moved.append((payload, account, current_odd))
+
+        report = []
+        for payload, account, current_odd in moved:
+            replacement = None
+            try:
+                if self.action == "replace":
+                    with span("find_replacement"):
+                        replacement = self.find_replacement(
+                            payload,
+                            account.config,
+                            kept_start_times.get(account.key, []),
+                            scheduled_fixture_ids,
+                        )
+                # Deleted first, so a schedule which cannot be deleted is never
+                # doubled by its replacement
+                self.schedule_manager.delete_schedule(
+                    payload["schedule_name"], payload["schedule_group"]
+                )
+            except Exception as e:
+                print(f"Failed to move {payload['schedule_name']}: {e}")
+                kept_start_times.setdefault(account.key, []).append(
+                    self.get_start_time(payload)
+                )
+                action, replacement = "failed", None
+            else:
+                action = "replaced" if replacement else "cancelled"
+                if replacement:
+                    try:
+                        schedule_name, schedule = get_match_schedule(
+                            replacement, account.config, account.key
+                        )
+                        self.schedule_manager.sync_schedules({schedule_name: schedule})
+                        history.record_schedule(schedule[1], replacement["start_time"])
+                        kept_start_times.setdefault(account.key, []).append(
+                            replacement["start_time"]
+                        )
+                        scheduled_fixture_ids.add(replacement["id"])
+                    except Exception as e:
+                        print(
+                            f"Failed to schedule {replacement['name']} in place of "
+                            f"{payload['schedule_name']}: {e}"
+                        )
+                        action, replacement = "cancelled", None
+                history.record_schedule_status(
+                    payload, self.get_start_time(payload), action
+                )
+            report.append(
+                {
+                    "account": account.key or "",
+                    "match_name": payload["match_name"],
+                    "scheduled_odd": payload["odd_value"],
+                    "current_odd": (
+                        "unavailable" if current_odd is None else current_odd
+                    ),
+                    "action": action,
+                    "replacement": (
+                        f"{replacement['name']} ({replacement['odd_value']}, "
+                        f"{replacement['start_time'].strftime('%H:%M')})"
+                        if replacement
+                        else ""
+                    ),
+                }
+            )
+        print(f"Odds watcher: {len(schedules)} schedules checked, {report}")
+        return report
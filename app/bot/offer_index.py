@@ -0,0 +1,36 @@
+from typing import Any, Optional
+
+from utils.types import Category, League
+
+
+class OfferIndex:
+    """
+    In-memory index of the offer gathered during one discovery run.
+    Categories and leagues are stored once and looked up by id.
+    """
+
+    def __init__(self):
+        self.categories: dict[str, Category] = {}
+        self.leagues: dict[str, League] = {}
+
+    def add_categories(self, categories: list[dict[str, Any]]) -> None:
+        """Index the categories as returned by the categories endpoint."""
+        for category in categories:
+            # Keep the first occurrence of a category, like a linear scan would
+            if category["id"] in self.categories or "seoName" not in category:
+                continue
+            self.categories[category["id"]] = Category(
+                id=category["id"], seo_name=category["seoName"]
+            )
+
+    def add_league(self, league: League) -> Optional[League]:
+        """
+        Link the league to its category and index it.
+        Return None if the category of the league is unknown.
+        """
+        category = self.categories.get(league.category_id)
+        if category is None:
+            return None
+        league.category = category
+        self.leagues[league.id] = league
+        return league
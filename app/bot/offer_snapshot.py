@@ -0,0 +1,73 @@
+import threading
+
+from datetime import tzinfo
+from concurrent.futures import Future
+from typing import Any, Callable, Iterator
+
+from bot.offer_index import OfferIndex
+from bot.fixture_table import FixtureTable
+from utils.types import Fixture
+
+
+class OfferSnapshot:
+    """
+    The offer of tomorrow as downloaded by one discovery run, shared by the match
+    selection of several accounts.
+
+    Categories, leagues and fixtures are gathered upfront. The markets of a fixture
+    are only fetched the first time a selection reaches it and are kept for the
+    next ones, so every payload is downloaded at most once however many accounts
+    walk the offer. Markets are decoded for the `bet_type` of the snapshot.
+    Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        offer_index: OfferIndex,
+        fixture_table: FixtureTable,
+        fetch_markets: Callable[[Fixture], list[dict[str, Any]]],
+        bet_type: str,
+    ):
+        self.offer_index = offer_index
+        self.fixture_table = fixture_table
+        self.fetch_markets = fetch_markets
+        self.bet_type = bet_type
+
+        self.lock = threading.Lock()
+        self.markets: dict[str, Future] = {}
+
+    def iter_fixtures(
+        self, window_start: int, window_end: int, timezone: tzinfo
+    ) -> Iterator[Fixture]:
+        """Lazily yield the fixtures starting within the window, by start time."""
+        return self.fixture_table.iter_fixtures(window_start, window_end, timezone)
+
+    def get_markets(self, fixture: Fixture) -> list[dict[str, Any]]:
+        """
+        Return the markets of a fixture, fetching them unless another selection
+        already did. Concurrent callers wait for the fetch in flight. A failed
+        fetch is raised to its waiters and retried by the next caller.
+        """
+        with self.lock:
+            future = self.markets.get(fixture.id)
+            is_owner = future is None
+            if is_owner:
+                future = self.markets[fixture.id] = Future()
+
+        if is_owner:
+            try:
+                future.set_result(self.fetch_markets(fixture))
+            except Exception as e:
+                with self.lock:
+                    del self.markets[fixture.id]
+                future.set_exception(e)
+        return future.result()
+
+    @property
+    def markets_fetched(self) -> int:
+        with self.lock:
+            return sum(
+                1
+                for future in self.markets.values()
+                if future.done() and not future.exception()
+            )
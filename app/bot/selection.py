@@ -0,0 +1,44 @@
+from typing import Any, Callable, Iterable, Optional
+
+from bot.market_prefetcher import MarketPrefetcher
+from utils.types import Fixture, MatchesToBetDict
+
+FetchMarkets = Callable[[Fixture], list[dict[str, Any]]]
+GetMatch = Callable[[Fixture, list[dict[str, Any]]], Optional[MatchesToBetDict]]
+
+
+def select_greedy(
+    fixtures: Iterable[Fixture],
+    fetch_markets: FetchMarkets,
+    get_match: GetMatch,
+    max_number_of_bets: int,
+    hours_between_matches: float,
+    prefetch_depth: int = 0,
+) -> list[MatchesToBetDict]:
+    """
+    Walk the fixtures by start time and take every fixture which is far enough from
+    the last taken one and has a suitable bet, until `max_number_of_bets` are taken.
+    """
+    matches_to_bet = []
+
+    with MarketPrefetcher(
+        fetch_markets,
+        fixtures,
+        depth=prefetch_depth,
+        hours_between_matches=hours_between_matches,
+    ) as prefetcher:
+        for index, fixture in prefetcher:
+            if len(matches_to_bet) >= max_number_of_bets:
+                break
+
+            last_start_time = (
+                matches_to_bet[-1]["start_time"] if matches_to_bet else None
+            )
+            if not prefetcher.is_far_enough(fixture, last_start_time):
+                continue
+
+            match = get_match(fixture, prefetcher.get(index, fixture, last_start_time))
+            if match:
+                matches_to_bet.append(match)
+
+    return matches_to_bet
@@ -1,19 +1,42 @@
 import pytz
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
-from utils.types import FixtureDict, LeagueDict, MatchesToBetDict
+from utils.types import Fixture, League, MatchesToBetDict
+from utils.json_decoding import ProjectionError, extract_object, loads, project
 
-from typing import Any
+from typing import Any, Optional
 
 from bot.base_bot import BaseBot
+from bot.selection import select_greedy
+from bot.offer_index import OfferIndex
+from bot.offer_snapshot import OfferSnapshot
+from bot.fixture_table import FixtureTable, get_tomorrow_window
 from bot.login_helper import login_to_website
+from utils.history import history
+
+TIMEZONE = pytz.timezone("Europe/Bucharest")
+
+# Fields of the raw fixtures which are kept for the whole discovery
+FIXTURE_FIELDS = ("id", "name", "startDatetime", "seoName")
+# Fields a market needs to be the one we bet on
+MARKET_FIELDS = ("marketTypeId", "marketTypeName", "outcomes")
 
 
 class WebsiteBot(BaseBot):
-    def login(self) -> bool:
-        """Login to the website using the provided username and password."""
+    def login(self, browser: bool = False) -> bool:
+        """
+        Login to the website using the provided username and password.
+        Unless the browser itself has to be logged in, first try to restore
+        the session saved by a previous login.
+        """
         try:
+            if self.browser_logged_in:
+                return True
+            if not browser and self.restore_session_cookies():
+                print("Restored previous session.")
+                return True
             login_to_website(self, self.app_email, self.app_password)
+            self.browser_logged_in = True
             return True
         except Exception:
             return False
@@ -25,7 +48,7 @@ class WebsiteBot(BaseBot):
         )
         return response.json()["userInfo"]["account"]["balance"]
 
-    def get_leagues_data(self) -> list[LeagueDict]:
+    def get_leagues_data(self) -> list[League]:
         """Get the leagues data using session."""
         response = self.session_send_request(
             "GET", self.bot_config["website"]["leagues_ids_endpoint"]
@@ -33,79 +56,110 @@ class WebsiteBot(BaseBot):
 
         leagues = []
 
-        for league in response.json()["tournaments"]:
+        for league in loads(response.content)["tournaments"]:
             if (
                 isinstance(league["features"], list) and "MATCHES" in league["features"]
             ) and (
                 isinstance(league["filters"], list) and "tomorrow" in league["filters"]
             ):
                 leagues.append(
-                    {
-                        "id": league["id"],
-                        "name": league["name"],
-                        "league_seo_name": league["seoName"],
-                        "category_id": league["categoryId"],
-                    }
+                    League(
+                        id=league["id"],
+                        name=league["name"],
+                        league_seo_name=league["seoName"],
+                        category_id=league["categoryId"],
+                        category=None,
+                    )
                 )
         return leagues
 
-    def get_fixtures_data_from_league(
-        self, league: LeagueDict, category_seo_name: str
-    ) -> list[FixtureDict]:
+    def get_fixtures_data_from_league(self, league: League) -> list[dict[str, Any]]:
         """
-        Get the fixtures from a league using session.
-        We also filter out the fixtures which start before `bet_events_minimum_start_hour`.
+        Get the raw fixtures from a league using session.
+        Only the `FIXTURE_FIELDS` of each fixture are kept.
         """
-        league_id = league["id"]
+        league_id = league.id
         response = self.session_send_request(
             "GET",
             self.bot_config["website"]["fixtures_from_league_endpoint"].format(
                 league_id
             ),
         )
+        return project(loads(response.content)["fixtures"], FIXTURE_FIELDS)
 
-        timezone = pytz.timezone("Europe/Bucharest")
-        tomorrow = datetime.now(timezone) + timedelta(days=1)
-
-        fixtures = []
-
-        for fixture in response.json()["fixtures"]:
-            timestamp = fixture["startDatetime"] / 1000
-            utc_date = datetime.utcfromtimestamp(timestamp).replace(tzinfo=pytz.utc)
-            match_local_date = utc_date.astimezone(timezone)
-
-            # For some reason, even we hit the /tomorrow endpoint, some matches from
-            # the day after tomorrow appear, especially from leagues from South America
-            # so make sure to filter those out as well.
-            if (
-                match_local_date.hour
-                < self.bot_config["website"]["bet_events_minimum_start_hour"]
-                or match_local_date.day - tomorrow.day != 0
-            ):
-                continue
+    def get_fixtures_data_from_leagues(
+        self, leagues: list[League]
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Get the fixtures of multiple leagues.
+        Up to `fixtures_fetch_workers` leagues are fetched in parallel and the results
+        are returned in the same order as the given leagues.
+        """
+        workers = min(
+            self.bot_config["discovery"]["fixtures_fetch_workers"], len(leagues)
+        )
+        if workers <= 1:
+            return [self.get_fixtures_data_from_league(league) for league in leagues]
 
-            fixtures.append(
-                {
-                    "id": fixture["id"],
-                    "name": fixture["name"],
-                    "start_time": match_local_date,
-                    "category_seo_name": category_seo_name,
-                    "league_seo_name": league["league_seo_name"],
-                    "match_seo_name": fixture["seoName"],
-                }
-            )
-        return fixtures
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.get_fixtures_data_from_league, leagues))
 
-    def get_markets_from_fixture(self, fixture: FixtureDict) -> list[dict[str, Any]]:
-        """Get the markets from a fixture using session."""
-        fixture_id = fixture["id"]
+    def get_markets_content(self, fixture_id: str) -> bytes:
+        """Get the raw markets payload of a fixture using session."""
         response = self.session_send_request(
             "GET",
             self.bot_config["website"]["markets_from_fixture_endpoint"].format(
                 fixture_id
             ),
         )
-        return response.json()
+        return response.content
+
+    def get_markets_from_fixture(self, fixture: Fixture) -> list[dict[str, Any]]:
+        """
+        Get the markets from a fixture using session.
+        Only the market of the predefined `bet_type` is decoded, the rest of the
+        payload is never turned into Python objects. The payload is decoded in full
+        when that market cannot be extracted on its own.
+        The odds of that market are recorded in the history, whoever fetched it.
+        """
+        content = self.get_markets_content(fixture.id)
+        try:
+            market = extract_object(
+                content,
+                "name",
+                self.bot_config["website"]["bet_type"],
+                MARKET_FIELDS,
+            )
+            fixture_markets = [market] if market else []
+        except ProjectionError:
+            fixture_markets = loads(content)
+
+        target_bet_market = self.get_bet_type_from_fixture_markets(fixture_markets)
+        if target_bet_market:
+            history.record_odds(fixture.id, [target_bet_market], source="discovery")
+        return fixture_markets
+
+    def get_outcome_odd(
+        self, fixture_id: str, market_type_id: str, bet_option_id: str
+    ) -> Optional[float]:
+        """
+        Get the current odd of a bet option from the markets endpoint, without the browser.
+        Return None if the option is no longer offered.
+        """
+        content = self.get_markets_content(fixture_id)
+        try:
+            outcome = extract_object(content, "id", bet_option_id, ("odds",))
+            return outcome["odds"] if outcome else None
+        except ProjectionError:
+            pass
+
+        for market in loads(content):
+            if market.get("marketTypeId") != market_type_id:
+                continue
+            for outcome in market.get("outcomes", []):
+                if outcome.get("id") == bet_option_id:
+                    return outcome.get("odds")
+        return None
 
     def get_bet_type_from_fixture_markets(
         self, fixture_markets: list[dict[str, Any]]
@@ -123,95 +177,132 @@ class WebsiteBot(BaseBot):
             pass
         return None
 
-    def get_matches_to_bet(self, maximum_bet_odd: int = 0) -> list[MatchesToBetDict]:
+    def get_match_to_bet(
+        self,
+        fixture: Fixture,
+        fixture_markets: list[dict[str, Any]],
+        maximum_bet_odd: float,
+    ) -> Optional[MatchesToBetDict]:
+        """
+        Return the match to bet on for a fixture if its markets contain the predefined
+        `bet_type` with an outcome within `maximum_bet_odd`.
+        """
+        target_bet_market = self.get_bet_type_from_fixture_markets(fixture_markets)
+        if not target_bet_market:
+            return None
+
+        suitable_bet = None
+        for outcome in target_bet_market["outcomes"]:
+            if outcome["odds"] <= maximum_bet_odd:
+                suitable_bet = outcome
+
+        if not suitable_bet:
+            return None
+
+        return {
+            "id": fixture.id,
+            "name": fixture.name,
+            "start_time": fixture.start_time,
+            "category_seo_name": fixture.category_seo_name,
+            "league_seo_name": fixture.league_seo_name,
+            "match_seo_name": fixture.match_seo_name,
+            "market_type_id": target_bet_market[
+                "marketTypeId"
+            ],  # The id of the container in which the bet is found
+            "market_type_name": target_bet_market["marketTypeName"],
+            "bet_option_id": suitable_bet[
+                "id"
+            ],  # The id of the bet option (example 1 / X / 2)
+            "odd_value": suitable_bet["odds"],
+        }
+
+    def get_offer_snapshot(self) -> OfferSnapshot:
+        """
+        Download the categories, leagues and fixtures of tomorrow into a snapshot
+        whose markets are fetched on demand, with the session of this bot.
+        """
+        offer_index = OfferIndex()
+        offer_index.add_categories(
+            loads(
+                self.session_send_request(
+                    "GET", self.bot_config["website"]["categories_endpoint"]
+                ).content
+            )
+        )
+
+        # Leagues whose category is unknown are skipped
+        leagues = [
+            league
+            for league in self.get_leagues_data()
+            if offer_index.add_league(league)
+        ]
+
+        fixture_table = FixtureTable()
+        for league, league_fixtures in zip(
+            leagues, self.get_fixtures_data_from_leagues(leagues)
+        ):
+            fixture_table.add_league_fixtures(league, league_fixtures)
+
+        if history.enabled:
+            # The whole day, not only the fixtures a selection reaches, so that a
+            # replay sees the same offer
+            history.record_fixtures(
+                fixture_table.iter_fixtures(*get_tomorrow_window(TIMEZONE, 0), TIMEZONE)
+            )
+
+        return OfferSnapshot(
+            offer_index,
+            fixture_table,
+            fetch_markets=self.get_markets_from_fixture,
+            bet_type=self.bot_config["website"]["bet_type"],
+        )
+
+    def get_matches_to_bet(
+        self, maximum_bet_odd: int = 0, offer_snapshot: Optional[OfferSnapshot] = None
+    ) -> list[MatchesToBetDict]:
         """
         Get the matches to bet on.
         Check all leagues and fixtures for the bet type we are interested in.
         We also need to make sure that the fixtures are at least `minimum_hours_between_matches`
         apart from each other and their markets contain the predefined `bet_type` and that
         the `bet_type` has odds within `maximum_bet_odd` range.
+        The offer is downloaded unless the `offer_snapshot` of another discovery is given.
         """
-        all_fixtures = []
-
-        categories = self.session_send_request(
-            "GET", self.bot_config["website"]["categories_endpoint"]
-        ).json()
-
-        leagues = self.get_leagues_data()
-        for league in leagues:
-            # Find league category based on the league's category_id
-            try:
-                found_category_id = [
-                    c for c in categories if c["id"] == league["category_id"]
-                ][0]
-                category_seo_name = found_category_id["seoName"]
-            except Exception:
-                continue
-
-            league_fixtures = self.get_fixtures_data_from_league(
-                league, category_seo_name
+        if offer_snapshot is None:
+            offer_snapshot = self.get_offer_snapshot()
+        elif offer_snapshot.bet_type != self.bot_config["website"]["bet_type"]:
+            raise ValueError(
+                f"The offer snapshot holds the markets of {offer_snapshot.bet_type}, "
+                f"not {self.bot_config['website']['bet_type']}."
             )
-            if league_fixtures:
-                all_fixtures.extend(league_fixtures)
 
-        all_fixtures.sort(key=lambda x: x["start_time"])
+        # For some reason, even we hit the /tomorrow endpoint, some matches from
+        # the day after tomorrow appear, especially from leagues from South America
+        # so make sure to filter those out as well.
+        # We also filter out the fixtures which start before `bet_events_minimum_start_hour`.
+        window_start, window_end = get_tomorrow_window(
+            TIMEZONE, self.bot_config["website"]["bet_events_minimum_start_hour"]
+        )
+        # Fixtures are merged by start time lazily, so only the ones the
+        # selection actually reaches are built
+        fixtures = offer_snapshot.iter_fixtures(window_start, window_end, TIMEZONE)
 
         _maximum_bet_odd = (
             maximum_bet_odd or self.bot_config["website"]["maximum_bet_odd"]
         )
 
-        hours_between_matches = self.bot_config["website"][
-            "minimum_hours_between_matches"
-        ]
-
-        matches_to_bet = []
-
-        for fixture in all_fixtures:
-            if (
-                len(matches_to_bet)
-                >= self.bot_config["website"]["max_number_of_bets_per_day"]
-            ):
-                break
-
-            if len(matches_to_bet) > 0:
-                last_bet_match = matches_to_bet[-1]
-                if (
-                    not (
-                        fixture["start_time"] - last_bet_match["start_time"]
-                    ).total_seconds()
-                    / 3600
-                    >= hours_between_matches
-                ):
-                    continue
-
-            fixture_markets = self.get_markets_from_fixture(fixture)
-            target_bet_market = self.get_bet_type_from_fixture_markets(fixture_markets)
-            if not target_bet_market:
-                continue
-
-            suitable_bet = None
-            for outcome in target_bet_market["outcomes"]:
-                if outcome["odds"] <= _maximum_bet_odd:
-                    suitable_bet = outcome
-
-            if suitable_bet:
-                matches_to_bet.append(
-                    {
-                        "id": fixture["id"],
-                        "name": fixture["name"],
-                        "start_time": fixture["start_time"],
-                        "category_seo_name": fixture["category_seo_name"],
-                        "league_seo_name": fixture["league_seo_name"],
-                        "match_seo_name": fixture["match_seo_name"],
-                        "market_type_id": target_bet_market[
-                            "marketTypeId"
-                        ],  # The id of the container in which the bet is found
-                        "market_type_name": target_bet_market["marketTypeName"],
-                        "bet_option_id": suitable_bet[
-                            "id"
-                        ],  # The id of the bet option (example 1 / X / 2)
-                        "odd_value": suitable_bet["odds"],
-                    }
-                )
+        matches_to_bet = select_greedy(
+            fixtures,
+            fetch_markets=offer_snapshot.get_markets,
+            get_match=lambda fixture, fixture_markets: self.get_match_to_bet(
+                fixture, fixture_markets, _maximum_bet_odd
+            ),
+            max_number_of_bets=self.bot_config["website"]["max_number_of_bets_per_day"],
+            hours_between_matches=self.bot_config["website"][
+                "minimum_hours_between_matches"
+            ],
+            prefetch_depth=self.bot_config["discovery"]["markets_prefetch_depth"],
+        )
 
+        print(f"Response cache: {self.response_cache.get_stats()}")
         return matches_to_bet
@@ -1,9 +1,37 @@
 import os
 import yaml
 
+from urllib.parse import urlsplit, urlunsplit
+
+# `website` endpoints served by the offer API
+OFFER_API_ENDPOINTS = (
+    "categories_endpoint",
+    "leagues_ids_endpoint",
+    "fixtures_from_league_endpoint",
+    "markets_from_fixture_endpoint",
+)
+
+
+def apply_offer_api_override(config: dict) -> dict:
+    """
+    Point the offer API endpoints at `website.offer_api_override`, e.g. a local
+    stand-in server, keeping their paths and queries.
+    """
+    override = config["website"].get("offer_api_override")
+    if not override:
+        return config
+
+    scheme, netloc = urlsplit(override)[:2]
+    for endpoint in OFFER_API_ENDPOINTS:
+        url = urlsplit(config["website"][endpoint])
+        config["website"][endpoint] = urlunsplit(
+            (scheme, netloc, url.path, url.query, url.fragment)
+        )
+    return config
+
 
 def load_yaml():
     config_path = os.path.join(os.path.dirname(__file__), "config.yaml")
     with open(config_path, "r") as file:
         config = yaml.safe_load(file)
-    return config
+    return apply_offer_api_override(config)
@@ -1,24 +1,47 @@
 import os
 import shutil
+import fnmatch
+import threading
 import traceback
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
 from bot.website import WebsiteBot
 from bot.bet_placer import BetPlacer
 from bot.match_scheduler import MatchesScheduler
+from bot.offer_snapshot import OfferSnapshot
+from bot.odds_watcher import OddsWatcher
 
 from utils._email import EmailSender
-from utils.secrets import get_secret
-from utils.scheduler import delete_all_schedules, delete_schedule
+from utils.outbox import NotificationOutbox
+from utils.runtime import runtime
+from utils.accounts import DEFAULT_SECRET_NAME, Account, get_account, get_accounts
+from utils.scheduler import (
+    delete_account_schedules,
+    delete_all_schedules,
+    delete_schedule,
+    get_schedule_manager,
+)
+from utils.history import history
+from utils.tracing import span, tracer
 from utils.types import TriggerType
 from utils.exceptions import EventOddsChangedError
 
 RETURN_BODY = {"statusCode": 200, "body": ""}
 
 
-def clean_tmp():
+def clean_tmp(keep: Optional[list[str]] = None):
+    """
+    Delete everything from /tmp except the entries matching one of the `keep`
+    glob patterns, e.g. "/tmp/bet-builder-*".
+    """
     tmp_dir = "/tmp"
+    kept_patterns = [os.path.abspath(pattern) for pattern in keep or []]
     for filename in os.listdir(tmp_dir):
         file_path = os.path.join(tmp_dir, filename)
+        if any(fnmatch.fnmatch(file_path, pattern) for pattern in kept_patterns):
+            continue
         try:
             if os.path.isfile(file_path) or os.path.islink(file_path):
                 os.unlink(file_path)
@@ -28,31 +51,263 @@ def clean_tmp():
             print(f"Failed to delete {file_path}: {e}")
 
 
+def check_current_odd(bot: WebsiteBot, event: dict) -> None:
+    """
+    Raise `EventOddsChangedError` if the odd of the bet went above `maximum_bet_odd`
+    or the bet option is no longer offered. The check is skipped if the markets
+    endpoint cannot be reached, leaving the decision to the browser.
+    """
+    try:
+        current_odd = bot.get_outcome_odd(
+            event["fixture_id"], event["market_type_id"], event["bet_option_id"]
+        )
+    except ValueError as e:
+        print(f"Could not check the current odd: {e}")
+        return
+
+    print(f"Current odd: {current_odd}")
+    history.record_outcome_odd(
+        event["fixture_id"],
+        event["market_type_id"],
+        event["bet_option_id"],
+        current_odd,
+        source="placement",
+    )
+    if current_odd is None:
+        raise EventOddsChangedError(actual_odd="unavailable")
+    if current_odd > bot.bot_config["website"]["maximum_bet_odd"]:
+        raise EventOddsChangedError(actual_odd=current_odd)
+
+
+def send_changed_odd_email(
+    outbox: NotificationOutbox,
+    to_email: str,
+    event: dict,
+    account_key: Optional[str],
+    actual_odd: Any,
+) -> None:
+    print("Odds have changed, not placing bet.")
+    outbox.send_email(
+        to_email=to_email,
+        subject=EmailSender.SUBJECT_ERROR_TYPE,
+        body=get_account_body(
+            EmailSender.BODY_CHANGED_ODD.format(
+                event["match_name"],
+                event["match_url"],
+                event["odd_value"],
+                actual_odd,
+            ),
+            account_key,
+        ),
+    )
+
+
+def get_bot(secrets: dict, config: dict) -> WebsiteBot:
+    """Build the bot of the account whose credentials are in `secrets`"""
+    return WebsiteBot(
+        app_email=secrets["bet_app_username"],
+        app_password=secrets["bet_app_password"],
+        proxy_user=secrets["proxy_user"],
+        proxy_password=secrets["proxy_password"],
+        proxy_host=secrets["proxy_host"],
+        proxy_port=secrets["proxy_port"],
+        config=config,
+    )
+
+
+def find_matches(
+    bot: WebsiteBot,
+    to_email: str,
+    outbox: NotificationOutbox,
+    account_key: Optional[str] = None,
+    offer_snapshot: Optional[OfferSnapshot] = None,
+) -> None:
+    """Schedule the matches of the account of `bot` and report them."""
+    matches_scheduler = MatchesScheduler(
+        bot=bot, account_key=account_key, offer_snapshot=offer_snapshot
+    )
+    matches_scheduler.schedule_matches()
+    if len(matches_scheduler.matches) < 1:
+        outbox.send_email(
+            to_email=to_email,
+            subject=EmailSender.SUBJECT_INFO_TYPE,
+            body=get_account_body(EmailSender.BODY_NO_MATCHES_FOUND, account_key),
+        )
+    else:
+        outbox.send_email(
+            to_email=to_email,
+            subject=EmailSender.SUBJECT_INFO_TYPE,
+            body=get_account_body(
+                EmailSender.BODY_MATCHES_SCHEDULED.format(
+                    len(matches_scheduler.matches)
+                ),
+                account_key,
+            ),
+            events=matches_scheduler.matches_formatted,
+        )
+
+
+def watch_odds(bot: WebsiteBot, to_email: str, outbox: NotificationOutbox) -> None:
+    """Sweep the pending schedules for moved odds and report what was done."""
+    report = OddsWatcher(bot, get_schedule_manager(bot.bot_config["scheduler"])).sweep()
+    if report:
+        outbox.send_email(
+            to_email=to_email,
+            subject=EmailSender.SUBJECT_INFO_TYPE,
+            body=EmailSender.BODY_ODDS_WATCHED.format(
+                len(report), sum(row["action"] == "replaced" for row in report)
+            ),
+            events=report,
+        )
+
+
+def get_account_body(body: str, account_key: Optional[str]) -> str:
+    """Name the account in the emails of a multi-account run."""
+    return EmailSender.BODY_ACCOUNT.format(account_key, body) if account_key else body
+
+
+def find_matches_for_accounts(
+    accounts: list[Account], secrets: dict, outbox: NotificationOutbox
+) -> None:
+    """
+    Find and schedule the matches of several accounts, each in a worker of its own
+    with its own bot, session and browser profile.
+    The offer is downloaded once: the first account to log in fetches it into an
+    `OfferSnapshot` while the others are still logging in, then every account
+    selects its matches from the snapshot with its own config.
+    """
+    config = runtime.get_config()
+    offer_snapshot = Future()
+    discovery_claimed = threading.Lock()
+
+    def run_account(account: Account) -> None:
+        with span("account", account=account.key):
+            account_secrets = runtime.get_secret(account.secret_name)
+            to_email = account_secrets.get("to_address", secrets["to_address"])
+            bot = get_bot(account_secrets, account.config)
+            run_failed = False
+            try:
+                if not bot.login():
+                    outbox.send_email(
+                        to_email=to_email,
+                        subject=EmailSender.SUBJECT_ERROR_TYPE,
+                        body=get_account_body(
+                            EmailSender.BODY_NOT_LOGGED_IN, account.key
+                        ),
+                    )
+                    return
+                print(
+                    f"Available balance of {account.key}: {bot.get_available_balance()}"
+                )
+
+                if discovery_claimed.acquire(blocking=False):
+                    try:
+                        offer_snapshot.set_result(bot.get_offer_snapshot())
+                    except Exception as e:
+                        offer_snapshot.set_exception(e)
+                find_matches(
+                    bot, to_email, outbox, account.key, offer_snapshot.result()
+                )
+            except Exception:
+                run_failed = True
+                traceback_path = f"/tmp/traceback_{account.key}.txt"
+                with open(traceback_path, "w") as f:
+                    f.write(traceback.format_exc())
+                outbox.send_email(
+                    to_email=to_email,
+                    subject=EmailSender.SUBJECT_ERROR_TYPE,
+                    body=get_account_body(
+                        EmailSender.BODY_UNCAUGHT_EXCEPTION, account.key
+                    ),
+                    traceback_logs_path=traceback_path,
+                    image_path=bot.take_screenshot(
+                        max_size=config["notifications"]["max_attachment_size"]
+                    ),
+                )
+            finally:
+                bot.close(save_profile=not run_failed)
+
+    workers = min(config["accounts"]["workers"], len(accounts))
+    with span("accounts", accounts=len(accounts)) as accounts_span:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run_account, accounts))
+        # Markets the accounts shared, each downloaded once
+        if offer_snapshot.done() and not offer_snapshot.exception():
+            accounts_span.set_attributes(
+                markets_fetched=offer_snapshot.result().markets_fetched
+            )
+
+
 def lambda_handler(event, context):
     """Main function to handle the Lambda event"""
     try:
-        clean_tmp()
-        secrets = get_secret("bet-builder-secrets")
-
-        email_sender = EmailSender(
-            from_email=secrets["from_address"],
-            password=secrets["gmail_app_password"],
+        # Keep the response cache, the saved sessions and the profile snapshots
+        # so that retries and warm invocations can reuse them
+        config = runtime.get_config()
+        tracer.configure(config["tracing"])
+        tracer.reset()
+        history.configure(config["history"])
+        history.reset()
+        run_failed = False
+        bot = None
+        clean_tmp(
+            keep=config["cleanup"]["keep"]
+            + [
+                config["cache"]["directory"],
+                config["session_store"]["directory"],
+                config["profile_cache"]["snapshot_directory"],
+            ]
         )
+        # The default secret holds the email credentials of every account
+        secrets = runtime.get_secret(DEFAULT_SECRET_NAME)
+        to_email = secrets["to_address"]
 
-        bot = WebsiteBot(
-            app_email=secrets["bet_app_username"],
-            app_password=secrets["bet_app_password"],
-            proxy_user=secrets["proxy_user"],
-            proxy_password=secrets["proxy_password"],
-            proxy_host=secrets["proxy_host"],
-            proxy_port=secrets["proxy_port"],
+        # Emails are queued and delivered in the background, over one connection
+        outbox = NotificationOutbox(
+            EmailSender.from_config(
+                from_email=secrets["from_address"],
+                password=secrets["gmail_app_password"],
+                config=config["notifications"],
+            ),
+            config["notifications"],
         )
+
+        accounts = get_accounts(config)
+        if event["trigger_type"] == TriggerType.FIND_MATCHES and accounts[0].key:
+            find_matches_for_accounts(accounts, secrets, outbox)
+            return RETURN_BODY
+
+        # Odds are watched over plain HTTP only, without logging in
+        if event["trigger_type"] == TriggerType.WATCH_ODDS:
+            bot = get_bot(secrets, config)
+            watch_odds(bot, to_email, outbox)
+            return RETURN_BODY
+
+        # Bets of a multi-account run are placed with the account which found them
+        account = get_account(config, event.get("account"))
+        account_secrets = runtime.get_secret(account.secret_name)
+        to_email = account_secrets.get("to_address", to_email)
+
+        bot = get_bot(account_secrets, account.config)
+        # Check the odds over plain HTTP first, the markets endpoint needs no login,
+        # so that no browser is started for a bet which would not be placed anyway
+        if event["trigger_type"] == TriggerType.PLACE_BET and event.get("fixture_id"):
+            try:
+                check_current_odd(bot, event)
+            except EventOddsChangedError as e:
+                send_changed_odd_email(
+                    outbox, to_email, event, account.key, e.actual_odd
+                )
+                return RETURN_BODY
+
         logged_in = bot.login()
         if not logged_in:
-            email_sender.send_email(
-                to_email=secrets["to_address"],
+            # Credentials might have been rotated, fetch them again next time
+            runtime.invalidate_secrets()
+            outbox.send_email(
+                to_email=to_email,
                 subject=EmailSender.SUBJECT_ERROR_TYPE,
-                body=EmailSender.BODY_NOT_LOGGED_IN,
+                body=get_account_body(EmailSender.BODY_NOT_LOGGED_IN, account.key),
             )
             return RETURN_BODY
 
@@ -60,34 +315,44 @@ def lambda_handler(event, context):
         print(f"Available balance: {balance}")
 
         if event["trigger_type"] == TriggerType.FIND_MATCHES:
-            matches_scheduler = MatchesScheduler(bot=bot)
-            matches_scheduler.schedule_matches()
-            if len(matches_scheduler.matches) < 1:
-                email_sender.send_email(
-                    to_email=secrets["to_address"],
-                    subject=EmailSender.SUBJECT_INFO_TYPE,
-                    body=EmailSender.BODY_NO_MATCHES_FOUND,
-                )
-            else:
-                email_sender.send_email(
-                    to_email=secrets["to_address"],
-                    subject=EmailSender.SUBJECT_INFO_TYPE,
-                    body=EmailSender.BODY_MATCHES_SCHEDULED.format(
-                        len(matches_scheduler.matches)
-                    ),
-                    events=matches_scheduler.matches_formatted,
-                )
+            find_matches(bot, to_email, outbox)
         elif event["trigger_type"] == TriggerType.PLACE_BET:
             try:
                 if balance < 2.00:
-                    email_sender.send_email(
-                        to_email=secrets["to_address"],
-                        subject=EmailSender.SUBJECT_ERROR_TYPE,
-                        body=EmailSender.BODY_NO_BALANCE.format(balance),
-                    )
                     # All schedules are deleted. The main one which gather matches
                     # is disabled only until human intervention.
-                    delete_all_schedules()
+                    # Other accounts keep betting with their own balance
+                    purge_report = (
+                        delete_account_schedules(account.key)
+                        if account.key
+                        else delete_all_schedules()
+                    )
+                    outbox.send_email(
+                        to_email=to_email,
+                        subject=EmailSender.SUBJECT_ERROR_TYPE,
+                        body=get_account_body(
+                            EmailSender.BODY_NO_BALANCE.format(balance), account.key
+                        ),
+                        events=[
+                            {"schedule": schedule_name, "action": action}
+                            for action, schedule_names in purge_report.items()
+                            for schedule_name in schedule_names
+                        ],
+                    )
+                    return RETURN_BODY
+
+                # Placing a bet in the browser needs it to be logged in as well,
+                # the HTTP placement only does if it has to fall back to it
+                if account.config["placement"]["mode"] == "browser" and not bot.login(
+                    browser=True
+                ):
+                    outbox.send_email(
+                        to_email=to_email,
+                        subject=EmailSender.SUBJECT_ERROR_TYPE,
+                        body=get_account_body(
+                            EmailSender.BODY_NOT_LOGGED_IN, account.key
+                        ),
+                    )
                     return RETURN_BODY
 
                 print(f"Placing bet with: {balance}")
@@ -98,12 +363,17 @@ def lambda_handler(event, context):
                     bet_option_id=event["bet_option_id"],
                     market_type_name=event["market_type_name"],
                     bet_amount=balance,
+                    fixture_id=event.get("fixture_id"),
+                    account_key=account.key,
                 )
                 bet_placer.run()
-                email_sender.send_email(
-                    to_email=secrets["to_address"],
+                outbox.send_email(
+                    to_email=to_email,
                     subject=EmailSender.SUBJECT_INFO_TYPE,
-                    body=EmailSender.BODY_PLACED_BET.format(event["match_name"]),
+                    body=get_account_body(
+                        EmailSender.BODY_PLACED_BET.format(event["match_name"]),
+                        account.key,
+                    ),
                     events=[
                         {
                             "name": event["match_name"],
@@ -114,40 +384,47 @@ def lambda_handler(event, context):
                         }
                     ],
                 )
-            except EventOddsChangedError:
-                print("Odds have changed, not placing bet.")
-                email_sender.send_email(
-                    to_email=secrets["to_address"],
-                    subject=EmailSender.SUBJECT_ERROR_TYPE,
-                    body=EmailSender.BODY_CHANGED_ODD.format(
-                        event["match_name"],
-                        event["match_url"],
-                        event["odd_value"],
-                        bet_placer.bet_odd_value,
-                    ),
+            except EventOddsChangedError as e:
+                send_changed_odd_email(
+                    outbox, to_email, event, account.key, e.actual_odd
                 )
     except Exception:
+        run_failed = True
         traceback_path = "/tmp/traceback.txt"
         with open(traceback_path, "w") as f:
             f.write(traceback.format_exc())
 
-        screenshot_path = bot.take_screenshot()
-        if not os.path.exists(screenshot_path):
+        screenshot_path = (
+            bot.take_screenshot(max_size=config["notifications"]["max_attachment_size"])
+            if bot
+            else None
+        )
+        if screenshot_path and not os.path.exists(screenshot_path):
             screenshot_path = None
 
-        email_sender.send_email(
-            to_email=secrets["to_address"],
+        outbox.send_email(
+            to_email=to_email,
             subject=EmailSender.SUBJECT_ERROR_TYPE,
             body=EmailSender.BODY_UNCAUGHT_EXCEPTION,
             traceback_logs_path=traceback_path,
             image_path=screenshot_path,
         )
     finally:
-        bot.close()
+        # Only a browser which went through a run without errors is worth reusing
+        if bot:
+            bot.close(save_profile=not run_failed)
         # This should only delete TriggerType.PLACE_BET events,
         # since TriggerType.FIND_MATCHES does not send the schedule name
         # in the event.
         if event.get("schedule_name"):
-            delete_schedule(event["schedule_name"])
+            delete_schedule(
+                event["schedule_name"], event.get("schedule_group", "default")
+            )
+        # Wait for the queued emails, the container is frozen once the handler returns
+        outbox.flush()
+        # Write what the invocation saw to the history store in one transaction
+        history.flush()
+        # Emit the trace of the invocation along with its per-phase metrics
+        tracer.flush()
 
     return RETURN_BODY
@@ -1,11 +1,15 @@
 import os
 import smtplib
 
+from typing import Any, Optional
+
 from email import encoders
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 
+from utils.tracing import span
+
 
 class EmailSender:
     """Class to handle email sending functionality"""
@@ -23,29 +27,106 @@ class EmailSender:
         "An uncaught exception occurred. See attached log file for details."
     )
 
-    def __init__(self, from_email: str, password: str) -> None:
+    BODY_ODDS_WATCHED = "Odds moved for {} scheduled match(es), {} replaced."
+    BODY_ACCOUNT = "Account {}: {}"
+    BODY_DIGEST = "{} update(s) from this run."
+    BODY_ATTACHMENT_SKIPPED = "Attachment {} was left out, it is over {} bytes."
+
+    def __init__(
+        self,
+        from_email: str,
+        password: str,
+        smtp_host: str = "smtp.gmail.com",
+        smtp_port: int = 465,
+        smtp_security: str = "ssl",
+        timeout: float = 30,
+        max_attachment_size: Optional[int] = None,
+    ) -> None:
         self.from_email = from_email
         self.password = password
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.smtp_security = smtp_security
+        self.timeout = timeout
+        self.max_attachment_size = max_attachment_size
+
+    @classmethod
+    def from_config(
+        cls, from_email: str, password: str, config: dict[str, Any]
+    ) -> "EmailSender":
+        """Build a sender from the `notifications` config section."""
+        return cls(
+            from_email=from_email,
+            password=password,
+            smtp_host=config["smtp_host"],
+            smtp_port=config["smtp_port"],
+            smtp_security=config["smtp_security"],
+            timeout=config["timeout"],
+            max_attachment_size=config["max_attachment_size"],
+        )
+
+    def connect(self) -> smtplib.SMTP:
+        """Open an authenticated connection to the SMTP server."""
+        with span("smtp_connect", host=self.smtp_host):
+            if self.smtp_security == "ssl":
+                server = smtplib.SMTP_SSL(
+                    self.smtp_host, self.smtp_port, timeout=self.timeout
+                )
+            else:
+                server = smtplib.SMTP(
+                    self.smtp_host, self.smtp_port, timeout=self.timeout
+                )
+                if self.smtp_security == "starttls":
+                    server.starttls()
+            try:
+                server.login(self.from_email, self.password)
+            except Exception:
+                server.close()
+                raise
+        return server
+
+    def read_attachment(self, attachment_path: str) -> Optional[bytes]:
+        """
+        Read an attachment, capped to `max_attachment_size` bytes. Text logs keep
+        their tail, where the error is; other files over the cap are left out.
+        """
+        with open(attachment_path, "rb") as f:
+            content = f.read()
+        if self.max_attachment_size is None or len(content) <= self.max_attachment_size:
+            return content
+        if attachment_path.endswith(".txt"):
+            return content[-self.max_attachment_size :]
+        return None
 
     def add_attachment(self, attachment_path: str) -> None:
         """Add an attachment to the email message"""
         if attachment_path and os.path.exists(attachment_path):
-            with open(attachment_path, "rb") as f:
-                part = MIMEBase("application", "octet-stream")
-                part.set_payload(f.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    "Content-Disposition",
-                    f'attachment; filename="{os.path.basename(attachment_path)}"',
+            content = self.read_attachment(attachment_path)
+            file_name = os.path.basename(attachment_path)
+            if content is None:
+                self.message.attach(
+                    MIMEText(
+                        self.BODY_ATTACHMENT_SKIPPED.format(
+                            file_name, self.max_attachment_size
+                        )
+                    )
                 )
-                self.message.attach(part)
+                return
+            part = MIMEBase("application", "octet-stream")
+            part.set_payload(content)
+            encoders.encode_base64(part)
+            part.add_header(
+                "Content-Disposition",
+                f'attachment; filename="{file_name}"',
+            )
+            self.message.attach(part)
 
     def get_new_message(
         self,
         to_email: str,
         subject: str,
         body: str,
-        events: list[dict] = [],
+        events: Optional[list[dict]] = None,
         traceback_logs_path: str = None,
         image_path: str = None,
     ) -> MIMEMultipart:
@@ -61,6 +142,13 @@ class EmailSender:
         if image_path:
             self.add_attachment(image_path)
 
+        body_content = MIMEText(self.get_html_body(body, events or []), "html")
+        self.message.attach(body_content)
+        return self.message
+
+    @staticmethod
+    def get_html_body(body: str, events: Optional[list[dict]] = None) -> str:
+        """Render a message and the summary table of its events as HTML"""
         body = "<h3>{}</h3>".format(body)
         if events:
             body += "<br><h4>Summary</h4><br>"
@@ -83,9 +171,23 @@ class EmailSender:
                 table_content += row
 
             body += table.format(table_content)
+        return body
 
-        body_content = MIMEText(body, "html")
-        self.message.attach(body_content)
+    def get_digest_message(
+        self, to_email: str, subject: str, messages: list[tuple[str, list[dict]]]
+    ) -> MIMEMultipart:
+        """Create one email holding several messages, given as (body, events)"""
+        self.message = MIMEMultipart("alternative")
+        self.message["Subject"] = subject
+        self.message["From"] = self.from_email
+        self.message["To"] = to_email
+
+        body = "<h3>{}</h3><hr>".format(self.BODY_DIGEST.format(len(messages)))
+        body += "<hr>".join(
+            self.get_html_body(message_body, events)
+            for message_body, events in messages
+        )
+        self.message.attach(MIMEText(body, "html"))
         return self.message
 
     def send_email(
@@ -93,7 +195,7 @@ class EmailSender:
         to_email: str,
         subject: str,
         body: str,
-        events: list[dict] = [],
+        events: Optional[list[dict]] = None,
         traceback_logs_path: str = None,
         image_path: str = None,
     ) -> None:
@@ -102,13 +204,13 @@ class EmailSender:
             to_email=to_email,
             subject=subject,
             body=body,
-            events=events,
+            events=events or [],
             traceback_logs_path=traceback_logs_path,
             image_path=image_path,
         )
 
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(self.from_email, self.password)
-            server.sendmail(self.from_email, to_email, new_message.as_string())
+        with span("send_email", subject=subject):
+            with self.connect() as server:
+                server.sendmail(self.from_email, to_email, new_message.as_string())
 
         print("Email sent successfully.")
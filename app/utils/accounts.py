@@ -0,0 +1,84 @@
+import re
+import copy
+
+from typing import Any, Optional
+
+DEFAULT_SECRET_NAME = "bet-builder-secrets"
+# Account keys end up in schedule names, which are at most 64 characters long
+ACCOUNT_KEY_PATTERN = re.compile(r"[a-z0-9]{1,16}")
+
+
+class Account:
+    """
+    A betting account handled by the Lambda: the secret holding its credentials and
+    the config it runs with. `key` is None for the single account of the default
+    secret, whose schedules keep their historical names.
+    """
+
+    __slots__ = ("key", "secret_name", "config")
+
+    def __init__(self, key: Optional[str], secret_name: str, config: dict[str, Any]):
+        self.key = key
+        self.secret_name = secret_name
+        self.config = config
+
+
+def merge_config(config: dict[str, Any], overrides: dict[str, Any]) -> dict[str, Any]:
+    """Return a deep copy of `config` with the nested `overrides` applied."""
+    merged = copy.deepcopy(config)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def get_account_config(
+    config: dict[str, Any], key: str, overrides: dict[str, Any]
+) -> dict[str, Any]:
+    """
+    The config of an account: the shared one with the overrides of the account, and
+    a browser profile directory of its own so that accounts can run side by side.
+    """
+    account_config = merge_config(config, overrides)
+    account_config["profile_cache"][
+        "directory"
+    ] = f"{config['profile_cache']['directory']}-{key}"
+    return account_config
+
+
+def get_accounts(config: dict[str, Any]) -> list[Account]:
+    """
+    The accounts of the `accounts` config section, or the single account of the
+    default secret if none are listed.
+    """
+    entries = config["accounts"]["entries"]
+    if not entries:
+        return [Account(None, DEFAULT_SECRET_NAME, config)]
+
+    accounts = []
+    for entry in entries:
+        key = entry["key"]
+        if not ACCOUNT_KEY_PATTERN.fullmatch(key):
+            raise ValueError(f"Invalid account key {key!r}, expected [a-z0-9]{{1,16}}.")
+        if any(account.key == key for account in accounts):
+            raise ValueError(f"Duplicate account key {key!r}.")
+        accounts.append(
+            Account(
+                key,
+                entry["secret_name"],
+                get_account_config(config, key, entry.get("overrides") or {}),
+            )
+        )
+    return accounts
+
+
+def get_account(config: dict[str, Any], key: Optional[str]) -> Account:
+    """The account of a given key, the default account for None."""
+    if key is None:
+        return Account(None, DEFAULT_SECRET_NAME, config)
+    for account in get_accounts(config):
+        if account.key == key:
+            return account
+    raise ValueError(f"Unknown account {key!r}.")
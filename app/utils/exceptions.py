@@ -2,5 +2,14 @@ class EventOddsChangedError(Exception):
     """Exception raised when the odds of a bet change.
     and exceed the maximum bet odd allowed."""
 
-    def __init__(self, message="The odds of the bet have changed."):
+    def __init__(self, message="The odds of the bet have changed.", actual_odd=None):
+        super().__init__(message)
+        self.actual_odd = actual_odd
+
+
+class BetslipRejectedError(Exception):
+    """Exception raised when the betslip endpoint did not place the bet,
+    so it is safe to place it another way."""
+
+    def __init__(self, message="The betslip was rejected."):
         super().__init__(message)
@@ -0,0 +1,416 @@
+import os
+import time
+import sqlite3
+import threading
+
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from utils.types import Fixture
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fixtures (
+    fixture_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    league_id TEXT NOT NULL,
+    league_name TEXT NOT NULL,
+    category_seo_name TEXT,
+    league_seo_name TEXT,
+    match_seo_name TEXT,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fixtures_start_time ON fixtures (start_time);
+
+CREATE TABLE IF NOT EXISTS odds_snapshots (
+    fixture_id TEXT NOT NULL,
+    market_type_id TEXT NOT NULL,
+    market_type_name TEXT,
+    -- The name the `bet_type` of the config is matched against
+    market_name TEXT,
+    outcome_id TEXT NOT NULL,
+    outcome_name TEXT,
+    odds REAL,
+    observed_at INTEGER NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS odds_snapshots_fixture
+    ON odds_snapshots (fixture_id, outcome_id, observed_at);
+CREATE INDEX IF NOT EXISTS odds_snapshots_market_type
+    ON odds_snapshots (market_type_id, observed_at);
+
+CREATE TABLE IF NOT EXISTS schedules (
+    schedule_name TEXT PRIMARY KEY,
+    account TEXT,
+    fixture_id TEXT NOT NULL,
+    market_type_id TEXT NOT NULL,
+    bet_option_id TEXT NOT NULL,
+    odd_value REAL NOT NULL,
+    start_time INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS schedules_fixture ON schedules (fixture_id);
+CREATE INDEX IF NOT EXISTS schedules_start_time ON schedules (start_time);
+
+CREATE TABLE IF NOT EXISTS placements (
+    placement_id INTEGER PRIMARY KEY,
+    account TEXT,
+    fixture_id TEXT,
+    market_type_id TEXT NOT NULL,
+    bet_option_id TEXT NOT NULL,
+    stake REAL NOT NULL,
+    odds REAL,
+    mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    placed_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS placements_fixture ON placements (fixture_id);
+CREATE INDEX IF NOT EXISTS placements_placed_at ON placements (placed_at);
+"""
+
+# Odds movement of the bet options we scheduled, between the first and the last
+# snapshot taken of them
+ODDS_MOVEMENTS_QUERY = """
+SELECT
+    s.schedule_name,
+    s.account,
+    s.fixture_id,
+    f.name,
+    s.start_time,
+    s.status,
+    s.odd_value,
+    (SELECT o.odds FROM odds_snapshots o
+        WHERE o.fixture_id = s.fixture_id AND o.outcome_id = s.bet_option_id
+        ORDER BY o.observed_at LIMIT 1) AS first_odds,
+    (SELECT o.odds FROM odds_snapshots o
+        WHERE o.fixture_id = s.fixture_id AND o.outcome_id = s.bet_option_id
+        ORDER BY o.observed_at DESC LIMIT 1) AS last_odds,
+    (SELECT MIN(o.odds) FROM odds_snapshots o
+        WHERE o.fixture_id = s.fixture_id AND o.outcome_id = s.bet_option_id)
+        AS min_odds,
+    (SELECT MAX(o.odds) FROM odds_snapshots o
+        WHERE o.fixture_id = s.fixture_id AND o.outcome_id = s.bet_option_id)
+        AS max_odds,
+    (SELECT COUNT(*) FROM odds_snapshots o
+        WHERE o.fixture_id = s.fixture_id AND o.outcome_id = s.bet_option_id)
+        AS snapshots,
+    (SELECT p.odds FROM placements p
+        WHERE p.fixture_id = s.fixture_id AND p.bet_option_id = s.bet_option_id
+        ORDER BY p.placed_at DESC LIMIT 1) AS placed_odds
+FROM schedules s
+LEFT JOIN fixtures f ON f.fixture_id = s.fixture_id
+WHERE s.start_time >= ? AND s.start_time < ?
+ORDER BY s.start_time
+"""
+
+
+def to_timestamp(value: datetime) -> int:
+    """Epoch milliseconds, the unit of the offer API."""
+    return int(value.timestamp() * 1000)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open the store, creating it in WAL mode on first use."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # Durable enough in WAL mode, a crash only loses the last transactions
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    # Stores created before the market name was recorded
+    columns = {
+        row[1] for row in connection.execute("PRAGMA table_info(odds_snapshots)")
+    }
+    if "market_name" not in columns:
+        connection.execute("ALTER TABLE odds_snapshots ADD COLUMN market_name TEXT")
+    return connection
+
+
+class HistoryRecorder:
+    """
+    Buffer what an invocation saw (the fixtures of the offer, the odds of the
+    markets it fetched, the schedules it created and the bets it placed) and
+    write it to the SQLite history store in one transaction when it is over,
+    so that recording adds no round trip to the hot paths.
+
+    Rows are keyed by what they describe, so recording the same fixture or the
+    same odds twice in a run, e.g. by several accounts walking a shared offer
+    snapshot, stores it once. Safe to use from several threads.
+    """
+
+    def __init__(self, path: str = "", enabled: bool = False):
+        self.path = path
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset()
+
+    def configure(self, config: dict[str, Any]) -> None:
+        """Apply the `history` config section."""
+        self.path = config["path"]
+        self.enabled = config["enabled"]
+
+    def reset(self) -> None:
+        """Drop whatever was buffered and not flushed."""
+        with self.lock:
+            self.fixtures: dict[str, tuple] = {}
+            self.odds: dict[tuple[str, str, str], tuple] = {}
+            self.schedules: dict[str, tuple] = {}
+            self.placements: list[tuple] = []
+
+    def record_fixtures(self, fixtures: Iterable[Fixture]) -> None:
+        if not self.enabled:
+            return
+        now = int(time.time() * 1000)
+        rows = {
+            fixture.id: (
+                fixture.id,
+                fixture.name,
+                to_timestamp(fixture.start_time),
+                fixture.league.id,
+                fixture.league.name,
+                fixture.category_seo_name,
+                fixture.league_seo_name,
+                fixture.match_seo_name,
+                now,
+                now,
+            )
+            for fixture in fixtures
+        }
+        with self.lock:
+            self.fixtures.update(rows)
+
+    def record_odds(
+        self, fixture_id: str, markets: list[dict[str, Any]], source: str
+    ) -> None:
+        """Record the odds of every outcome of the given markets of a fixture."""
+        if not self.enabled:
+            return
+        now = int(time.time() * 1000)
+        rows = {
+            (fixture_id, outcome["id"], source): (
+                fixture_id,
+                market.get("marketTypeId", ""),
+                market.get("marketTypeName"),
+                market.get("name"),
+                outcome["id"],
+                outcome.get("name"),
+                outcome.get("odds"),
+                now,
+                source,
+            )
+            for market in markets
+            for outcome in market.get("outcomes", [])
+        }
+        with self.lock:
+            self.odds.update(rows)
+
+    def record_outcome_odd(
+        self,
+        fixture_id: str,
+        market_type_id: str,
+        outcome_id: str,
+        odds: Optional[float],
+        source: str,
+    ) -> None:
+        """Record the odd of a single outcome, None if it is no longer offered."""
+        self.record_odds(
+            fixture_id,
+            [
+                {
+                    "marketTypeId": market_type_id,
+                    "outcomes": [{"id": outcome_id, "odds": odds}],
+                }
+            ],
+            source,
+        )
+
+    def record_schedule(self, payload: dict[str, Any], start_date: datetime) -> None:
+        """Record a PLACE_BET schedule, given its payload and the match start time."""
+        self.record_schedule_status(payload, start_date, "scheduled")
+
+    def record_schedule_status(
+        self, payload: dict[str, Any], start_time: datetime, status: str
+    ) -> None:
+        if not self.enabled:
+            return
+        row = (
+            payload["schedule_name"],
+            payload.get("account"),
+            payload["fixture_id"],
+            payload["market_type_id"],
+            payload["bet_option_id"],
+            payload["odd_value"],
+            to_timestamp(start_time),
+            status,
+            int(time.time() * 1000),
+        )
+        with self.lock:
+            self.schedules[payload["schedule_name"]] = row
+
+    def record_placement(
+        self,
+        account: Optional[str],
+        fixture_id: Optional[str],
+        market_type_id: str,
+        bet_option_id: str,
+        stake: float,
+        odds: Optional[float],
+        mode: str,
+        status: str,
+    ) -> None:
+        if not self.enabled:
+            return
+        row = (
+            account,
+            fixture_id,
+            market_type_id,
+            bet_option_id,
+            stake,
+            odds,
+            mode,
+            status,
+            int(time.time() * 1000),
+        )
+        with self.lock:
+            self.placements.append(row)
+
+    def flush(self) -> None:
+        """Write the buffered rows in one transaction."""
+        if not self.enabled:
+            return
+        with self.lock:
+            fixtures = list(self.fixtures.values())
+            odds = list(self.odds.values())
+            schedules = list(self.schedules.values())
+            placements = self.placements
+        if not (fixtures or odds or schedules or placements):
+            return
+
+        try:
+            connection = connect(self.path)
+            try:
+                with connection:
+                    # No upsert before SQLite 3.24, which the Lambda runtime lacks:
+                    # insert the new fixtures, then refresh the ones already known
+                    connection.executemany(
+                        "INSERT OR IGNORE INTO fixtures VALUES "
+                        "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        fixtures,
+                    )
+                    connection.executemany(
+                        "UPDATE fixtures SET name = ?, start_time = ?, last_seen = ? "
+                        "WHERE fixture_id = ?",
+                        [
+                            (fixture[1], fixture[2], fixture[9], fixture[0])
+                            for fixture in fixtures
+                        ],
+                    )
+                    connection.executemany(
+                        "INSERT INTO odds_snapshots (fixture_id, market_type_id, "
+                        "market_type_name, market_name, outcome_id, outcome_name, "
+                        "odds, observed_at, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        odds,
+                    )
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO schedules VALUES "
+                        "(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        schedules,
+                    )
+                    connection.executemany(
+                        "INSERT INTO placements (account, fixture_id, market_type_id, "
+                        "bet_option_id, stake, odds, mode, status, placed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        placements,
+                    )
+            finally:
+                connection.close()
+        except (sqlite3.Error, OSError) as e:
+            # The history is a by-product of the run, never a reason to fail it,
+            # e.g. when its volume is not mounted or read-only
+            print(f"Failed to write the history: {e}")
+            return
+        self.reset()
+
+
+class HistoryStore:
+    """Queries over the history written by `HistoryRecorder`."""
+
+    def __init__(self, path: str):
+        self.connection = connect(path)
+        self.connection.row_factory = sqlite3.Row
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def get_odds_movements(
+        self, start: datetime, end: datetime
+    ) -> list[dict[str, Any]]:
+        """
+        How the odds of the scheduled bet options of the matches starting within
+        [start, end) moved: the scheduled odd, the first, last, lowest and highest
+        recorded odds, and the odd the bet was placed at, if it was.
+        """
+        rows = self.connection.execute(
+            ODDS_MOVEMENTS_QUERY, (to_timestamp(start), to_timestamp(end))
+        )
+        return [dict(row) for row in rows]
+
+    def get_odds_history(
+        self, fixture_id: str, outcome_id: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        """Every recorded odd of a fixture, or of one of its outcomes, oldest first."""
+        query = "SELECT * FROM odds_snapshots WHERE fixture_id = ?"
+        parameters: tuple = (fixture_id,)
+        if outcome_id:
+            query += " AND outcome_id = ?"
+            parameters += (outcome_id,)
+        rows = self.connection.execute(f"{query} ORDER BY observed_at", parameters)
+        return [dict(row) for row in rows]
+
+    def get_recorded_offers(
+        self, start: datetime, end: datetime
+    ) -> list[dict[str, Any]]:
+        """
+        The fixtures starting within [start, end) with the odds discovery recorded
+        for them, a row per outcome, in start time then recording order. Fixtures
+        whose markets were never fetched have no odds and are left out.
+        """
+        rows = self.connection.execute(
+            """
+            SELECT f.fixture_id, f.name, f.start_time, f.league_id, f.league_name,
+                f.category_seo_name, f.league_seo_name, f.match_seo_name,
+                o.market_type_id, o.market_type_name, o.market_name, o.outcome_id,
+                o.outcome_name,
+                o.odds
+            FROM fixtures f
+            JOIN odds_snapshots o
+                ON o.fixture_id = f.fixture_id AND o.source = 'discovery'
+            WHERE f.start_time >= ? AND f.start_time < ?
+            ORDER BY f.start_time, o.observed_at, o.rowid
+            """,
+            (to_timestamp(start), to_timestamp(end)),
+        )
+        return [dict(row) for row in rows]
+
+    def count_fixtures(self, start: datetime, end: datetime) -> int:
+        """The recorded fixtures starting within [start, end), with odds or not."""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM fixtures WHERE start_time >= ? AND start_time < ?",
+            (to_timestamp(start), to_timestamp(end)),
+        ).fetchone()[0]
+
+    def get_placements(self, start: datetime, end: datetime) -> list[dict[str, Any]]:
+        """The placement attempts made within [start, end)."""
+        rows = self.connection.execute(
+            "SELECT * FROM placements WHERE placed_at >= ? AND placed_at < ? "
+            "ORDER BY placed_at",
+            (to_timestamp(start), to_timestamp(end)),
+        )
+        return [dict(row) for row in rows]
+
+
+history = HistoryRecorder()
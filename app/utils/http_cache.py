@@ -0,0 +1,144 @@
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import requests
+
+from datetime import date
+from typing import Optional
+from requests.structures import CaseInsensitiveDict
+
+# Response headers kept alongside the cached body
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class ResponseCache:
+    """
+    On-disk cache for GET responses of the offer-structure endpoints.
+
+    Each endpoint template from the `website` config section gets its own TTL.
+    Fresh entries are served without touching the network, stale entries are
+    revalidated with `If-None-Match` / `If-Modified-Since` when the server sent
+    an `ETag` / `Last-Modified`. Entries are keyed by the local date as well,
+    since the `tomorrow` endpoints change meaning at midnight.
+    """
+
+    def __init__(self, directory: str, endpoint_ttls: dict[str, int]):
+        self.directory = directory
+        self.rules = [
+            (self.template_to_pattern(template), ttl)
+            for template, ttl in endpoint_ttls.items()
+        ]
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0}
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def template_to_pattern(template: str) -> re.Pattern:
+        """Turn an endpoint template such as `.../tournament/{}/fixtures` into a regex."""
+        return re.compile(re.escape(template).replace(r"\{\}", r"[^/?]+"))
+
+    def get_ttl(self, url: str) -> Optional[int]:
+        """Return the TTL of the endpoint matching the URL, None if it is not cached."""
+        for pattern, ttl in self.rules:
+            if pattern.fullmatch(url):
+                return ttl
+        return None
+
+    def get_stats(self) -> dict[str, int]:
+        with self.lock:
+            return dict(self.stats)
+
+    def count(self, stat: str) -> None:
+        with self.lock:
+            self.stats[stat] += 1
+
+    def get_paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(f"{date.today().isoformat()} {url}".encode()).hexdigest()
+        base_path = os.path.join(self.directory, key)
+        return f"{base_path}.json", f"{base_path}.body"
+
+    def load(self, url: str) -> Optional[tuple[dict, bytes]]:
+        """Load the metadata and body of a cached response."""
+        metadata_path, body_path = self.get_paths(url)
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+            with open(body_path, "rb") as f:
+                return metadata, f.read()
+        except (OSError, ValueError):
+            return None
+
+    def write_atomic(self, path: str, content: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def store(self, url: str, metadata: dict, body: Optional[bytes] = None) -> None:
+        """Store a response. The body is left untouched when not given."""
+        metadata_path, body_path = self.get_paths(url)
+        try:
+            if body is not None:
+                self.write_atomic(body_path, body)
+            self.write_atomic(metadata_path, json.dumps(metadata).encode())
+        except OSError as e:
+            print(f"Failed to cache response for {url}: {e}")
+
+    @staticmethod
+    def build_response(url: str, metadata: dict, body: bytes) -> requests.Response:
+        """Rebuild a `requests.Response` from a cached entry."""
+        response = requests.Response()
+        response.status_code = metadata["status_code"]
+        response.headers = CaseInsensitiveDict(metadata["headers"])
+        response.url = url
+        response._content = body
+        return response
+
+    def request(
+        self, session: requests.Session, url: str, **kwargs
+    ) -> requests.Response:
+        """Send a GET request through the cache."""
+        ttl = self.get_ttl(url)
+        cached = self.load(url)
+
+        if cached is not None:
+            metadata, body = cached
+            if time.time() - metadata["stored_at"] < ttl:
+                self.count("hits")
+                return self.build_response(url, metadata, body)
+
+            headers = dict(kwargs.pop("headers", None) or {})
+            if metadata["headers"].get("ETag"):
+                headers["If-None-Match"] = metadata["headers"]["ETag"]
+            if metadata["headers"].get("Last-Modified"):
+                headers["If-Modified-Since"] = metadata["headers"]["Last-Modified"]
+            kwargs["headers"] = headers
+
+        response = session.request("GET", url, **kwargs)
+
+        if cached is not None and response.status_code == 304:
+            self.count("revalidated")
+            metadata["stored_at"] = time.time()
+            self.store(url, metadata)
+            return self.build_response(url, metadata, body)
+
+        self.count("misses")
+        if response.status_code == 200:
+            self.store(
+                url,
+                {
+                    "status_code": response.status_code,
+                    "headers": {
+                        header: response.headers[header]
+                        for header in STORED_HEADERS
+                        if header in response.headers
+                    },
+                    "stored_at": time.time(),
+                },
+                response.content,
+            )
+        return response
@@ -0,0 +1,94 @@
+import re
+import json
+
+from typing import Any, Iterable, Optional
+
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+# Strings (with their escapes) and brackets, so nesting can be tracked
+# without looking inside strings
+JSON_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]', re.DOTALL)
+
+
+class ProjectionError(ValueError):
+    """The payload could not be projected, it has to be decoded in full."""
+
+
+def project(items: Iterable[dict[str, Any]], fields: tuple[str, ...]) -> list[dict]:
+    """Keep only the given fields of each item, skipping the missing ones."""
+    return [{field: item[field] for field in fields if field in item} for item in items]
+
+
+def find_object_end(content: bytes, start: int) -> Optional[int]:
+    """Return the index right after the JSON object opening at `start`."""
+    depth = 0
+    for token in JSON_TOKEN.finditer(content, start):
+        bracket = token.group()
+        if bracket in (b"{", b"["):
+            depth += 1
+        elif bracket in (b"}", b"]"):
+            depth -= 1
+            if depth == 0:
+                return token.end()
+    return None
+
+
+def encode_value(value: str) -> list[bytes]:
+    """The ways a string value may be encoded in a payload."""
+    return list(
+        dict.fromkeys(
+            [
+                json.dumps(value).encode(),
+                json.dumps(value, ensure_ascii=False).encode(),
+            ]
+        )
+    )
+
+
+def extract_object(
+    content: bytes, key: str, value: str, required_keys: tuple[str, ...] = ()
+) -> Optional[dict[str, Any]]:
+    """
+    Decode only the first object of the payload whose `key` equals `value` and
+    which has all of the `required_keys`.
+
+    The `"key": "value"` pair is searched in the raw bytes, then the innermost object
+    enclosing it is sliced out and decoded. Return None if the value does not appear
+    in the payload at all. Raise `ProjectionError` if it does but no matching object
+    could be verified, in which case the caller should decode the payload in full.
+    """
+    encoded_values = encode_value(value)
+    if not any(encoded in content for encoded in encoded_values):
+        return None
+
+    pattern = re.compile(
+        re.escape(json.dumps(key).encode())
+        + rb"\s*:\s*(?:"
+        + b"|".join(re.escape(encoded) for encoded in encoded_values)
+        + rb")"
+    )
+    for match in pattern.finditer(content):
+        start = content.rfind(b"{", 0, match.start())
+        while start >= 0:
+            end = find_object_end(content, start)
+            if end is not None and end >= match.end():
+                try:
+                    candidate = loads(content[start:end])
+                except ValueError:
+                    candidate = None
+                if (
+                    isinstance(candidate, dict)
+                    and candidate.get(key) == value
+                    and all(required in candidate for required in required_keys)
+                ):
+                    return candidate
+                # The innermost enclosing object is not the one we look for
+                break
+            start = content.rfind(b"{", 0, start)
+
+    raise ProjectionError(f"No object with {key} {value!r} could be extracted.")
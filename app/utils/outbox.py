@@ -0,0 +1,225 @@
+import queue
+import smtplib
+import threading
+
+from typing import Any, Optional
+
+from utils._email import EmailSender
+from utils.tracing import span
+
+
+class Notification:
+    """An email waiting in the outbox, built only when it is delivered."""
+
+    __slots__ = (
+        "to_email",
+        "subject",
+        "body",
+        "events",
+        "traceback_logs_path",
+        "image_path",
+        "messages",
+    )
+
+    def __init__(
+        self,
+        to_email: str,
+        subject: str,
+        body: str,
+        events: Optional[list[dict]] = None,
+        traceback_logs_path: Optional[str] = None,
+        image_path: Optional[str] = None,
+        messages: Optional[list[tuple[str, list[dict]]]] = None,
+    ):
+        self.to_email = to_email
+        self.subject = subject
+        self.body = body
+        self.events = list(events or [])
+        self.traceback_logs_path = traceback_logs_path
+        self.image_path = image_path
+        # The (body, events) of the emails merged into a digest
+        self.messages = list(messages or [])
+
+
+class NotificationOutbox:
+    """
+    Queue the emails of an invocation and deliver them from a background thread,
+    over one authenticated SMTP connection which is opened on the first email and
+    reused by the next ones. Reading attachments and building the messages also
+    happens on that thread, off the critical path of the handler.
+
+    With `digest`, info emails are held until `flush` and sent as one email per
+    recipient. Other emails are delivered as soon as the thread gets to them.
+    `flush` must be called before the invocation returns, since a frozen Lambda
+    container does not run background threads.
+    """
+
+    def __init__(self, email_sender: EmailSender, config: dict[str, Any]):
+        self.email_sender = email_sender
+        self.digest = config["digest"]
+        self.flush_timeout = config["flush_timeout"]
+
+        self.queue: queue.Queue[Optional[Notification]] = queue.Queue()
+        self.digest_notifications: list[Notification] = []
+        self.server: Optional[smtplib.SMTP] = None
+        self.thread: Optional[threading.Thread] = None
+        # Guards the delivery thread and the held digest, since the accounts of a
+        # run send their emails concurrently. Reentrant so `flush` can start it
+        self.lock = threading.RLock()
+        # Set when `flush` gave up waiting, the thread then drops what is left
+        self.abandoned = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def send_email(
+        self,
+        to_email: str,
+        subject: str,
+        body: str,
+        events: Optional[list[dict]] = None,
+        traceback_logs_path: Optional[str] = None,
+        image_path: Optional[str] = None,
+    ) -> None:
+        """Queue an email, with the arguments of `EmailSender.send_email`"""
+        notification = Notification(
+            to_email, subject, body, events, traceback_logs_path, image_path
+        )
+        if self.digest and subject == EmailSender.SUBJECT_INFO_TYPE:
+            with self.lock:
+                self.digest_notifications.append(notification)
+            return
+        self.start()
+        self.queue.put(notification)
+
+    def start(self) -> None:
+        """Start the delivery thread, if it is not running."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.deliver_queued, daemon=True)
+                self.thread.start()
+
+    def get_digest(self) -> list[Notification]:
+        """Merge the held info emails into one per recipient."""
+        with self.lock:
+            notifications, self.digest_notifications = self.digest_notifications, []
+        recipients: dict[str, list[Notification]] = {}
+        for notification in notifications:
+            recipients.setdefault(notification.to_email, []).append(notification)
+
+        digest = []
+        for to_email, notifications in recipients.items():
+            if len(notifications) == 1:
+                digest.append(notifications[0])
+                continue
+            digest.append(
+                Notification(
+                    to_email,
+                    EmailSender.SUBJECT_INFO_TYPE,
+                    body="",
+                    messages=[(n.body, n.events) for n in notifications],
+                )
+            )
+        return digest
+
+    def build_message(self, notification: Notification) -> str:
+        if notification.messages:
+            message = self.email_sender.get_digest_message(
+                notification.to_email, notification.subject, notification.messages
+            )
+        else:
+            message = self.email_sender.get_new_message(
+                to_email=notification.to_email,
+                subject=notification.subject,
+                body=notification.body,
+                events=notification.events,
+                traceback_logs_path=notification.traceback_logs_path,
+                image_path=notification.image_path,
+            )
+        return message.as_string()
+
+    def deliver(self, notification: Notification) -> None:
+        """Send one email, reconnecting once if the connection was dropped."""
+        message = self.build_message(notification)
+        with span("send_email", subject=notification.subject) as email_span:
+            email_span.set_attributes(reused=self.server is not None)
+            for attempt in range(2):
+                if self.abandoned.is_set():
+                    raise smtplib.SMTPServerDisconnected("The outbox was abandoned.")
+                if self.server is None:
+                    self.server = self.email_sender.connect()
+                try:
+                    self.server.sendmail(
+                        self.email_sender.from_email, notification.to_email, message
+                    )
+                    break
+                except smtplib.SMTPServerDisconnected:
+                    self.server = None
+                    if attempt:
+                        raise
+
+    def deliver_queued(self) -> None:
+        """Deliver the queued emails until the None sentinel of `flush`."""
+        while True:
+            notification = self.queue.get()
+            try:
+                if notification is None:
+                    return
+                if self.abandoned.is_set():
+                    self.dropped += 1
+                    print(
+                        f"Dropped email {notification.subject!r} to "
+                        f"{notification.to_email}, the outbox was abandoned."
+                    )
+                    continue
+                self.deliver(notification)
+                self.sent += 1
+                print("Email sent successfully.")
+            except Exception as e:
+                self.failed += 1
+                print(f"Failed to send email: {e}")
+            finally:
+                self.queue.task_done()
+
+    def flush(self) -> None:
+        """
+        Queue the digest, wait up to `flush_timeout` seconds for every email to be
+        delivered and close the connection.
+        The thread is joined under the lock, so an email sent meanwhile waits and
+        starts a new thread once this one is gone instead of racing it.
+        """
+        with self.lock:
+            digest = self.get_digest()
+            if digest:
+                self.start()
+            for notification in digest:
+                self.queue.put(notification)
+            if self.thread is None:
+                return
+
+            self.queue.put(None)
+            self.thread.join(self.flush_timeout)
+            if self.thread.is_alive():
+                # The container may be frozen and thawed by a later invocation, which
+                # must not find this thread still delivering, so drop what is left and
+                # break the connection it may be blocked on
+                self.abandoned.set()
+                print(
+                    f"Outbox not delivered within {self.flush_timeout} seconds, "
+                    f"dropping {max(self.queue.qsize() - 1, 0)} queued emails."
+                )
+                server = self.server
+                if server is not None:
+                    try:
+                        server.close()
+                    except (smtplib.SMTPException, OSError):
+                        pass
+                return
+            self.thread = None
+
+            if self.server is not None:
+                try:
+                    self.server.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self.server = None
@@ -0,0 +1,223 @@
+import io
+import os
+import shutil
+import fnmatch
+import hashlib
+import tarfile
+import tempfile
+
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from utils.runtime import runtime
+
+# Parts of a Chrome profile which are tied to the process which wrote them,
+# or only hold caches which Chrome rebuilds cheaply
+EXCLUDED_PATTERNS = (
+    "Singleton*",
+    "*/Singleton*",
+    "*.lock",
+    "*/LOCK",
+    "Crashpad",
+    "Crashpad/*",
+    "*GPUCache*",
+    "*ShaderCache*",
+    "*/Code Cache*",
+    "*/Service Worker/CacheStorage*",
+)
+# The HTTP cache, dropped first when the snapshot is over its size cap
+HTTP_CACHE_PATTERNS = ("*/Cache", "*/Cache/*", "Cache_Data*", "*/Cache_Data*")
+
+
+def get_account_key(account: str) -> str:
+    return hashlib.sha256(account.encode()).hexdigest()[:16]
+
+
+class ProfileStorage(ABC):
+    """
+    Base class of the locations where the compressed profile snapshot of an
+    account is kept. Subclasses only need to implement how it is read and written.
+    """
+
+    @abstractmethod
+    def load(self, account: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def save(self, account: str, snapshot: bytes) -> None:
+        pass
+
+
+class FileProfileStorage(ProfileStorage):
+    """Keep the snapshots in a local directory, reused by warm containers."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def get_path(self, account: str) -> str:
+        return os.path.join(
+            self.directory, f"profile_{get_account_key(account)}.tar.gz"
+        )
+
+    def load(self, account: str) -> Optional[bytes]:
+        try:
+            with open(self.get_path(account), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def save(self, account: str, snapshot: bytes) -> None:
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.get_path(account))
+
+
+class S3ProfileStorage(ProfileStorage):
+    """Keep the snapshots in S3, shared by every container."""
+
+    def __init__(self, bucket: str, prefix: str):
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get_key(self, account: str) -> str:
+        return f"{self.prefix}profile_{get_account_key(account)}.tar.gz"
+
+    def load(self, account: str) -> Optional[bytes]:
+        client = runtime.get_client("s3")
+        try:
+            response = client.get_object(Bucket=self.bucket, Key=self.get_key(account))
+        except client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    def save(self, account: str, snapshot: bytes) -> None:
+        runtime.get_client("s3").put_object(
+            Bucket=self.bucket, Key=self.get_key(account), Body=snapshot
+        )
+
+
+class ProfileCache:
+    """
+    Restore a known-good Chrome profile (cookies, consent, HTTP cache) into the
+    user data directory before the browser starts, and snapshot it again after
+    a successful run. Snapshots are gzipped tarballs of at most `max_size` bytes:
+    the HTTP cache is left out when the whole profile does not fit, and nothing
+    is saved when even that is too big.
+    """
+
+    def __init__(self, storage: ProfileStorage, directory: str, max_size: int):
+        self.storage = storage
+        self.directory = directory
+        self.max_size = max_size
+
+    def restore(self, account: str) -> bool:
+        """Replace the profile directory with the snapshot of the account, if any."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+        try:
+            snapshot = self.storage.load(account)
+        except Exception as e:
+            print(f"Failed to load the profile snapshot: {e}")
+            return False
+        if not snapshot:
+            return False
+
+        try:
+            with tarfile.open(fileobj=io.BytesIO(snapshot), mode="r:gz") as archive:
+                members = [
+                    member
+                    for member in archive.getmembers()
+                    if self.is_safe_member(member)
+                ]
+                archive.extractall(self.directory, members=members)
+        except (tarfile.TarError, OSError, EOFError) as e:
+            print(f"Failed to restore the profile snapshot: {e}")
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.makedirs(self.directory, exist_ok=True)
+            return False
+        return True
+
+    @staticmethod
+    def is_safe_member(member: tarfile.TarInfo) -> bool:
+        """Only extract regular files and directories which stay within the profile."""
+        path = os.path.normpath(member.name)
+        return (
+            (member.isfile() or member.isdir())
+            and not os.path.isabs(path)
+            and not path.startswith("..")
+        )
+
+    @staticmethod
+    def is_excluded(path: str, patterns: tuple[str, ...]) -> bool:
+        return any(fnmatch.fnmatch(path, pattern) for pattern in patterns)
+
+    def build_snapshot(self, patterns: tuple[str, ...]) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            for root, directories, files in os.walk(self.directory):
+                relative_root = os.path.relpath(root, self.directory)
+                # Do not descend into excluded directories at all
+                directories[:] = [
+                    directory
+                    for directory in directories
+                    if not self.is_excluded(
+                        os.path.normpath(os.path.join(relative_root, directory)),
+                        patterns,
+                    )
+                ]
+                for file_name in files:
+                    path = os.path.normpath(os.path.join(relative_root, file_name))
+                    full_path = os.path.join(root, file_name)
+                    if self.is_excluded(path, patterns) or not os.path.isfile(
+                        full_path
+                    ):
+                        continue
+                    try:
+                        archive.add(full_path, arcname=path, recursive=False)
+                    except OSError:
+                        # Files may vanish while the profile is being walked
+                        continue
+        return buffer.getvalue()
+
+    def save(self, account: str) -> Optional[int]:
+        """
+        Snapshot the profile directory of a browser which was closed.
+        Return the size of the saved snapshot, None if nothing was saved.
+        """
+        if not os.path.isdir(self.directory):
+            return None
+
+        for patterns in (EXCLUDED_PATTERNS, EXCLUDED_PATTERNS + HTTP_CACHE_PATTERNS):
+            snapshot = self.build_snapshot(patterns)
+            if len(snapshot) <= self.max_size:
+                break
+        else:
+            print(
+                f"Profile snapshot of {len(snapshot)} bytes is over the "
+                f"{self.max_size} bytes cap, not saving it."
+            )
+            return None
+
+        try:
+            self.storage.save(account, snapshot)
+        except Exception as e:
+            print(f"Failed to save the profile snapshot: {e}")
+            return None
+        return len(snapshot)
+
+
+def get_profile_cache(config: dict[str, Any]) -> Optional[ProfileCache]:
+    """Build the profile cache described by the `profile_cache` config section."""
+    if not config["enabled"]:
+        return None
+
+    if config["storage"] == "file":
+        storage = FileProfileStorage(config["snapshot_directory"])
+    elif config["storage"] == "s3":
+        storage = S3ProfileStorage(config["bucket"], config["prefix"])
+    else:
+        raise ValueError(f"Unknown profile storage: {config['storage']}")
+    return ProfileCache(storage, config["directory"], config["max_size"])
@@ -0,0 +1,56 @@
+import time
+import boto3
+import threading
+
+from typing import Any
+
+from config.config import load_yaml
+from utils.secrets import get_secret
+
+
+class RuntimeContext:
+    """
+    Objects which are expensive to build and can be shared by every invocation
+    handled by the same (warm) Lambda container: the parsed config, boto3 clients
+    and the secrets. Everything is built lazily on first use.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.config = None
+        self.clients = {}
+        self.secrets = {}
+
+    def get_config(self) -> dict[str, Any]:
+        with self.lock:
+            if self.config is None:
+                self.config = load_yaml()
+            return self.config
+
+    def get_client(self, service_name: str) -> Any:
+        """Return the boto3 client of the given service. boto3 clients are thread safe."""
+        with self.lock:
+            if service_name not in self.clients:
+                self.clients[service_name] = boto3.client(service_name)
+            return self.clients[service_name]
+
+    def get_secret(self, secret_name: str) -> dict:
+        """Return the secret, fetching it again once `runtime.secrets_ttl` expired."""
+        ttl = self.get_config()["runtime"]["secrets_ttl"]
+        with self.lock:
+            cached = self.secrets.get(secret_name)
+            if cached is not None and time.time() - cached[0] < ttl:
+                return cached[1]
+
+        secret = get_secret(secret_name, client=self.get_client("secretsmanager"))
+        with self.lock:
+            self.secrets[secret_name] = (time.time(), secret)
+        return secret
+
+    def invalidate_secrets(self) -> None:
+        """Drop the cached secrets, e.g. when the credentials were rejected."""
+        with self.lock:
+            self.secrets.clear()
+
+
+runtime = RuntimeContext()
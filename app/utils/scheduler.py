@@ -1,71 +1,422 @@
 import json
-import boto3
+import time
 
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
+from utils.runtime import runtime
+from utils.tracing import span
 
-def create_schedule(schedule_name: str, start_date: datetime, payload: dict) -> dict:
-    """Function to create a schedule for the Lambda function."""
-    schedule_client = boto3.client("scheduler")
-    lambda_client = boto3.client("lambda")
+MATCH_SCHEDULE_PREFIX = "match-schedule-"
+GATHER_MATCHES_SCHEDULE = "bet-builder-gather-matches"
+WATCH_ODDS_SCHEDULE = "bet-builder-watch-odds"
+# Recurring schedules managed by terraform, disabled rather than deleted
+RECURRING_SCHEDULES = (GATHER_MATCHES_SCHEDULE, WATCH_ODDS_SCHEDULE)
+DEFAULT_GROUP = "default"
 
-    lambda_function_name = "bet-builder-lambda-function"
-    lambda_details = lambda_client.get_function(FunctionName=lambda_function_name)
+# Fields of `get_schedule` which `update_schedule` accepts back
+SCHEDULE_FIELDS = (
+    "GroupName",
+    "ScheduleExpression",
+    "ScheduleExpressionTimezone",
+    "FlexibleTimeWindow",
+    "Target",
+    "Description",
+    "StartDate",
+    "EndDate",
+    "KmsKeyArn",
+    "ActionAfterCompletion",
+)
 
-    cron_expression = f"cron({start_date.minute} {start_date.hour} {start_date.day} {start_date.month} ? {start_date.year})"
 
-    response = schedule_client.create_schedule(
-        Name=schedule_name,
-        ScheduleExpressionTimezone="Europe/Bucharest",
-        ScheduleExpression=cron_expression,
-        FlexibleTimeWindow={"Mode": "OFF"},
-        Target={
-            "Arn": lambda_details["Configuration"]["FunctionArn"],
-            "RoleArn": lambda_details["Configuration"]["Role"],
-            "Input": json.dumps(payload),
-        },
+def get_match_schedule_prefix(account_key: Optional[str] = None) -> str:
+    """Prefix of the match schedules of an account, None for the default account."""
+    if account_key is None:
+        return MATCH_SCHEDULE_PREFIX
+    return f"{MATCH_SCHEDULE_PREFIX}{account_key}-"
+
+
+def get_match_schedule_name(match_id: str, account_key: Optional[str] = None) -> str:
+    return f"{get_match_schedule_prefix(account_key)}{match_id}".replace(":", "-")
+
+
+def get_cron_expression(start_date: datetime) -> str:
+    """One-time cron expression firing at `start_date`."""
+    return f"cron({start_date.minute} {start_date.hour} {start_date.day} {start_date.month} ? {start_date.year})"
+
+
+class ScheduleManager:
+    """
+    Create the schedules of the Lambda function in bulk.
+
+    Match schedules live in their own schedule group, created on demand, so
+    that they can all be dropped at once. The function ARN and role are resolved once per manager, existing match
+    schedules are diffed against the desired ones and only the missing or
+    changed schedules are created or updated, concurrently. Running it twice
+    with the same matches is therefore a no-op.
+    Clients can be injected, e.g. to run against a moto stand-in.
+    """
+
+    def __init__(
+        self,
+        function_name: str,
+        group_name: str = DEFAULT_GROUP,
+        timezone: str = "Europe/Bucharest",
+        max_workers: int = 8,
+        scheduler_client: Optional[Any] = None,
+        lambda_client: Optional[Any] = None,
+    ):
+        self.function_name = function_name
+        self.group_name = group_name
+        self.timezone = timezone
+        self.max_workers = max_workers
+        self.scheduler_client = scheduler_client or runtime.get_client("scheduler")
+        self.lambda_client = lambda_client or runtime.get_client("lambda")
+        self._target = None
+
+    @property
+    def target(self) -> dict[str, str]:
+        """ARN and role of the Lambda function, resolved on first use."""
+        if self._target is None:
+            lambda_details = self.lambda_client.get_function(
+                FunctionName=self.function_name
+            )
+            self._target = {
+                "Arn": lambda_details["Configuration"]["FunctionArn"],
+                "RoleArn": lambda_details["Configuration"]["Role"],
+            }
+        return self._target
+
+    def ensure_group(self, timeout: int = 60) -> None:
+        """Create the schedule group if needed, waiting for a previous deletion to end."""
+        if self.group_name == DEFAULT_GROUP:
+            return
+
+        deadline = time.time() + timeout
+        while True:
+            try:
+                group = self.scheduler_client.get_schedule_group(Name=self.group_name)
+            except self.scheduler_client.exceptions.ResourceNotFoundException:
+                try:
+                    self.scheduler_client.create_schedule_group(Name=self.group_name)
+                except self.scheduler_client.exceptions.ConflictException:
+                    # Created in the meantime or still being deleted, check again
+                    pass
+                else:
+                    return
+            else:
+                if group["State"] == "ACTIVE":
+                    return
+            if time.time() > deadline:
+                raise ValueError(f"Schedule group {self.group_name} is not available.")
+            time.sleep(2)
+
+    def list_schedule_names(
+        self, prefix: str = MATCH_SCHEDULE_PREFIX, group_name: Optional[str] = None
+    ) -> list[str]:
+        """Return the names of all schedules starting with `prefix`, across pages."""
+        names = []
+        parameters = {"GroupName": group_name or self.group_name}
+        if prefix:
+            parameters["NamePrefix"] = prefix
+        paginator = self.scheduler_client.get_paginator("list_schedules")
+        try:
+            for page in paginator.paginate(**parameters):
+                names.extend(schedule["Name"] for schedule in page["Schedules"])
+        except self.scheduler_client.exceptions.ResourceNotFoundException:
+            # The group does not exist yet
+            pass
+        return names
+
+    def get_schedule_payloads(
+        self, prefix: str = MATCH_SCHEDULE_PREFIX
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Return the payload of every schedule of the group starting with `prefix`,
+        reading the schedules concurrently.
+        """
+        schedule_names = self.list_schedule_names(prefix=prefix)
+
+        def read(schedule_name: str) -> Optional[dict[str, Any]]:
+            try:
+                schedule = self.scheduler_client.get_schedule(
+                    Name=schedule_name, GroupName=self.group_name
+                )
+            except self.scheduler_client.exceptions.ResourceNotFoundException:
+                # Deleted in the meantime, e.g. after its bet was placed
+                return None
+            return json.loads(schedule["Target"].get("Input") or "null")
+
+        if not schedule_names:
+            return {}
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(schedule_names))
+        ) as executor:
+            return {
+                schedule_name: payload
+                for schedule_name, payload in zip(
+                    schedule_names, executor.map(read, schedule_names)
+                )
+                if payload is not None
+            }
+
+    def get_schedule_definition(self, start_date: datetime, payload: dict) -> dict:
+        return {
+            "ScheduleExpressionTimezone": self.timezone,
+            "ScheduleExpression": get_cron_expression(start_date),
+            "FlexibleTimeWindow": {"Mode": "OFF"},
+            "Target": {**self.target, "Input": json.dumps(payload)},
+        }
+
+    def is_up_to_date(self, schedule_name: str, definition: dict) -> bool:
+        """Check if the existing schedule already matches the definition."""
+        schedule = self.scheduler_client.get_schedule(
+            Name=schedule_name, GroupName=self.group_name
+        )
+        return (
+            schedule["ScheduleExpression"] == definition["ScheduleExpression"]
+            and schedule["ScheduleExpressionTimezone"]
+            == definition["ScheduleExpressionTimezone"]
+            and schedule["Target"]["Arn"] == definition["Target"]["Arn"]
+            and json.loads(schedule["Target"].get("Input") or "null")
+            == json.loads(definition["Target"]["Input"])
+        )
+
+    def put_schedule(
+        self, schedule_name: str, definition: dict, exists: bool
+    ) -> Optional[str]:
+        """Create or update a schedule. Return what was done, None if nothing was."""
+        if exists:
+            if self.is_up_to_date(schedule_name, definition):
+                return None
+            self.scheduler_client.update_schedule(
+                Name=schedule_name, GroupName=self.group_name, **definition
+            )
+            return "updated"
+
+        try:
+            self.scheduler_client.create_schedule(
+                Name=schedule_name, GroupName=self.group_name, **definition
+            )
+            return "created"
+        except self.scheduler_client.exceptions.ConflictException:
+            # Created in the meantime, e.g. by a concurrent run
+            return self.put_schedule(schedule_name, definition, exists=True)
+
+    def sync_schedules(
+        self,
+        schedules: dict[str, tuple[datetime, dict]],
+        prefix: str = MATCH_SCHEDULE_PREFIX,
+        replaces: Optional[Callable[[dict[str, Any]], bool]] = None,
+    ) -> dict[str, list[str]]:
+        """
+        Make sure a schedule exists for each name in `schedules`, firing at the given
+        start date with the given payload. Return the names per action taken.
+        With `replaces`, `schedules` stands for the whole selection it accepts the
+        payload of: the existing schedules of `prefix` it accepts which are not in
+        `schedules` are deleted, e.g. the matches a previous run no longer selects.
+        """
+        self.ensure_group()
+        report = {"created": [], "updated": [], "unchanged": []}
+        if replaces:
+            report.update(self.delete_stale_schedules(set(schedules), prefix, replaces))
+        existing_names = set(self.list_schedule_names(prefix=prefix))
+        # Resolve the target before fanning out
+        self.target
+
+        def sync(item: tuple[str, tuple[datetime, dict]]) -> Optional[str]:
+            schedule_name, (start_date, payload) = item
+            with span("create_schedule", schedule_name=schedule_name) as schedule_span:
+                action = self.put_schedule(
+                    schedule_name,
+                    self.get_schedule_definition(start_date, payload),
+                    exists=schedule_name in existing_names,
+                )
+                schedule_span.set_attributes(action=action or "unchanged")
+                return action
+
+        if not schedules:
+            return report
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(schedules))
+        ) as executor:
+            for schedule_name, action in zip(
+                schedules, executor.map(sync, schedules.items())
+            ):
+                report[action or "unchanged"].append(schedule_name)
+        return report
+
+    def delete_stale_schedules(
+        self,
+        kept_names: set[str],
+        prefix: str,
+        replaces: Callable[[dict[str, Any]], bool],
+    ) -> dict[str, list[str]]:
+        """
+        Delete the schedules of `prefix` which are not in `kept_names` and whose
+        payload `replaces` accepts, concurrently. Return the names per outcome.
+        """
+        report = {"deleted": [], "failed": []}
+        stale_names = [
+            schedule_name
+            for schedule_name, payload in self.get_schedule_payloads(prefix).items()
+            if schedule_name not in kept_names and replaces(payload)
+        ]
+
+        def delete(schedule_name: str) -> str:
+            try:
+                self.delete_schedule(schedule_name, self.group_name)
+                return "deleted"
+            except Exception as e:
+                print(f"Failed to delete stale schedule {schedule_name}: {e}")
+                return "failed"
+
+        if not stale_names:
+            return report
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(stale_names))
+        ) as executor:
+            for schedule_name, action in zip(
+                stale_names, executor.map(delete, stale_names)
+            ):
+                report[action].append(schedule_name)
+        return report
+
+    def disable_schedule(self, schedule_name: str, group_name: str) -> None:
+        """Disable a schedule, keeping the rest of its definition."""
+        schedule = self.scheduler_client.get_schedule(
+            Name=schedule_name, GroupName=group_name
+        )
+        self.scheduler_client.update_schedule(
+            Name=schedule_name,
+            State="DISABLED",
+            **{
+                field: schedule[field] for field in SCHEDULE_FIELDS if field in schedule
+            },
+        )
+
+    def delete_schedule(self, schedule_name: str, group_name: str) -> None:
+        """
+        Delete a schedule, raising if it could not be deleted. A schedule which is
+        already gone, e.g. after its bet was placed, counts as deleted.
+        """
+        try:
+            self.scheduler_client.delete_schedule(
+                Name=schedule_name, GroupName=group_name
+            )
+        except self.scheduler_client.exceptions.ResourceNotFoundException:
+            return
+        print(f"Schedule {schedule_name} deleted.")
+
+    def purge_group(self, group_name: str, prefix: str = "") -> dict[str, list[str]]:
+        """
+        Delete every schedule of a group starting with `prefix`, listing it page by
+        page and deleting concurrently. The recurring schedules gathering the
+        matches and watching the odds are disabled instead.
+        """
+        report = {"deleted": [], "disabled": [], "failed": []}
+        schedule_names = self.list_schedule_names(prefix=prefix, group_name=group_name)
+
+        def purge(schedule_name: str) -> str:
+            try:
+                if schedule_name in RECURRING_SCHEDULES:
+                    self.disable_schedule(schedule_name, group_name)
+                    return "disabled"
+                self.scheduler_client.delete_schedule(
+                    Name=schedule_name, GroupName=group_name
+                )
+                return "deleted"
+            except self.scheduler_client.exceptions.ResourceNotFoundException:
+                # Deleted in the meantime, e.g. after its bet was placed
+                return "deleted"
+            except Exception as e:
+                print(f"Failed to purge schedule {schedule_name}: {e}")
+                return "failed"
+
+        if not schedule_names:
+            return report
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(schedule_names))
+        ) as executor:
+            for schedule_name, action in zip(
+                schedule_names, executor.map(purge, schedule_names)
+            ):
+                report[action].append(f"{group_name}/{schedule_name}")
+        return report
+
+    def purge_schedules(self) -> dict[str, list[str]]:
+        """
+        Remove all the schedules of the Lambda function.
+        The match schedule group is dropped in one call, falling back to deleting its
+        schedules one by one if that fails. The default group is purged as well, for
+        schedules created before groups were used, keeping only the recurring
+        schedules, disabled.
+        """
+        report = {"groups_deleted": [], "deleted": [], "disabled": [], "failed": []}
+        groups_to_purge = [DEFAULT_GROUP]
+
+        if self.group_name != DEFAULT_GROUP:
+            try:
+                self.scheduler_client.delete_schedule_group(Name=self.group_name)
+                report["groups_deleted"].append(self.group_name)
+            except self.scheduler_client.exceptions.ResourceNotFoundException:
+                pass
+            except Exception as e:
+                print(f"Failed to delete schedule group {self.group_name}: {e}")
+                groups_to_purge.append(self.group_name)
+
+        for group_name in groups_to_purge:
+            for action, schedule_names in self.purge_group(group_name).items():
+                report[action].extend(schedule_names)
+        return report
+
+
+def get_schedule_manager(config: dict[str, Any]) -> ScheduleManager:
+    """Build a schedule manager from the `scheduler` config section."""
+    return ScheduleManager(
+        function_name=config["function_name"],
+        group_name=config["group_name"],
+        timezone=config["timezone"],
+        max_workers=config["max_workers"],
     )
-    return response
 
 
-def delete_schedule(schedule_name: str) -> dict:
+def delete_schedule(schedule_name: str, group_name: str = DEFAULT_GROUP) -> dict:
     """Function to delete a schedule for the Lambda function."""
     try:
-        schedule_client = boto3.client("scheduler")
-        schedule_client.delete_schedule(Name=schedule_name)
+        schedule_client = runtime.get_client("scheduler")
+        schedule_client.delete_schedule(Name=schedule_name, GroupName=group_name)
         print(f"Schedule {schedule_name} deleted.")
     except Exception:
         pass
 
 
-def disable_schedule(schedule_name: str) -> dict:
-    """Function to disable a schedule for the Lambda function."""
-    try:
-        schedule_client = boto3.client("scheduler")
-        response = schedule_client.update_schedule(
-            Name=schedule_name,
-            State="DISABLED",
-        )
-        print(f"Schedule {schedule_name} disabled.")
-        return response
-    except Exception as e:
-        print(f"Failed to disable schedule {schedule_name}: {e}")
-        return {}
+def delete_account_schedules(account_key: str) -> dict[str, list[str]]:
+    """
+    Delete the match schedules of one account of a multi-account run, leaving the
+    schedules of the other accounts and the one gathering the matches alone.
+    Return what was removed.
+    """
+    manager = get_schedule_manager(runtime.get_config()["scheduler"])
+    report = manager.purge_group(
+        manager.group_name, prefix=get_match_schedule_prefix(account_key)
+    )
+    print(f"Purged schedules of account {account_key}: {report}")
+    return report
 
 
-def delete_all_schedules():
+def delete_all_schedules() -> dict[str, list[str]]:
     """
     Function to delete all available schedules in EventBridge.
     Should only be used if we reached a point of no coming back
     and human intervention is required.
+    Return what was removed.
     """
-    schedule_client = boto3.client("scheduler")
-    for schedule in schedule_client.list_schedules()["Schedules"]:
-        try:
-            if schedule["Name"] == "bet-builder-gather-matches":
-                disable_schedule(schedule["Name"])
-                continue
-            schedule_client.delete_schedule(Name=schedule["Name"])
-            print(f"Schedule {schedule['Name']} deleted.")
-        except Exception:
-            continue
+    report = get_schedule_manager(runtime.get_config()["scheduler"]).purge_schedules()
+    print(f"Purged schedules: {report}")
+    return report
@@ -4,11 +4,12 @@ import boto3
 from botocore.exceptions import ClientError
 
 
-def get_secret(secret_name: str) -> dict:
+def get_secret(secret_name: str, client=None) -> dict:
     secret_name = secret_name
-    region_name = os.getenv("AWS_REGION")
-    session = boto3.session.Session()
-    client = session.client(service_name="secretsmanager", region_name=region_name)
+    if client is None:
+        region_name = os.getenv("AWS_REGION")
+        session = boto3.session.Session()
+        client = session.client(service_name="secretsmanager", region_name=region_name)
 
     try:
         get_secret_value_response = client.get_secret_value(SecretId=secret_name)
@@ -0,0 +1,87 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+
+class SessionStore(ABC):
+    """
+    Base class of the stores which keep the authenticated cookies of an account
+    between invocations. Subclasses only need to implement how a serialized
+    session is read, written and removed.
+    """
+
+    @abstractmethod
+    def load(self, account: str) -> Optional[dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def save(self, account: str, session: dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self, account: str) -> None:
+        pass
+
+
+class FileSessionStore(SessionStore):
+    """Keep the sessions as JSON files in a local directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def get_path(self, account: str) -> str:
+        account_key = hashlib.sha256(account.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"session_{account_key}.json")
+
+    def load(self, account: str) -> Optional[dict[str, Any]]:
+        try:
+            with open(self.get_path(account), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, account: str, session: dict[str, Any]) -> None:
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(session, f)
+        os.replace(tmp_path, self.get_path(account))
+
+    def clear(self, account: str) -> None:
+        try:
+            os.unlink(self.get_path(account))
+        except OSError:
+            pass
+
+
+def get_session_store(config: dict[str, Any]) -> SessionStore:
+    """Build the session store described by the `session_store` config section."""
+    if config["backend"] == "file":
+        return FileSessionStore(config["directory"])
+    raise ValueError(f"Unknown session store backend: {config['backend']}")
+
+
+def serialize_session(cookies: list[dict[str, Any]], max_age: int) -> dict[str, Any]:
+    """
+    Serialize the browser cookies along with the time after which the session
+    should no longer be trusted: the earliest cookie expiry, capped at `max_age`.
+    """
+    saved_at = time.time()
+    expiries = [cookie["expiry"] for cookie in cookies if cookie.get("expiry")]
+    return {
+        "saved_at": saved_at,
+        "expires_at": min(expiries + [saved_at + max_age]),
+        "cookies": [
+            {
+                key: cookie[key]
+                for key in ("name", "value", "domain", "path", "expiry", "secure")
+                if key in cookie
+            }
+            for cookie in cookies
+        ],
+    }
@@ -0,0 +1,169 @@
+import json
+import time
+import uuid
+import functools
+import threading
+import contextvars
+
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+# CloudWatch accepts at most 100 values per metric in one EMF record
+EMF_MAX_VALUES = 100
+# Span attributes which split the latency of a phase, e.g. per endpoint
+PHASE_ATTRIBUTES = ("endpoint",)
+
+
+class Span:
+    """A timed phase of an invocation, nested in the span current when it started."""
+
+    __slots__ = ("name", "span_id", "parent_id", "attributes", "start", "duration")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = None
+
+    def set_attributes(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """
+    Collect the spans of an invocation and emit them once it is over, as one
+    JSON trace line and as CloudWatch Embedded Metric Format lines holding the
+    latency of every phase, so percentiles can be charted per phase.
+
+    The current span is kept in a context variable, so nesting follows the code
+    path, and spans may be finished from any thread.
+    """
+
+    def __init__(self, namespace: str = "BetBuilder", enabled: bool = True):
+        self.namespace = namespace
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.current = contextvars.ContextVar("current_span", default=None)
+        self.reset()
+
+    def configure(self, config: dict[str, Any]) -> None:
+        """Apply the `tracing` config section."""
+        self.namespace = config["namespace"]
+        self.enabled = config["enabled"]
+
+    def reset(self) -> None:
+        """Start a new trace, dropping the spans of the previous one."""
+        with self.lock:
+            self.trace_id = uuid.uuid4().hex
+            self.spans: list[Span] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time the enclosed block. An escaping exception is recorded on the span."""
+        parent = self.current.get()
+        span = Span(name, parent.span_id if parent else None, attributes)
+        token = self.current.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.set_attributes(error=type(e).__name__)
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            self.current.reset(token)
+            with self.lock:
+                self.spans.append(span)
+
+    def traced(self, name: Optional[str] = None) -> Callable:
+        """Decorator running the whole function in a span named after it."""
+
+        def decorator(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name or function.__qualname__):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def get_trace(self) -> dict[str, Any]:
+        with self.lock:
+            spans = sorted(self.spans, key=lambda x: x.start)
+        return {
+            "trace_id": self.trace_id,
+            "spans": [span.to_dict() for span in spans],
+        }
+
+    @staticmethod
+    def get_phase(span: Span) -> str:
+        return " ".join(
+            [span.name]
+            + [
+                str(span.attributes[attribute])
+                for attribute in PHASE_ATTRIBUTES
+                if attribute in span.attributes
+            ]
+        )
+
+    def get_metric_records(self) -> list[dict[str, Any]]:
+        """EMF records of the latency of every phase, one record per phase and status."""
+        latencies: dict[tuple[str, str], list[float]] = {}
+        with self.lock:
+            for span in self.spans:
+                status = "error" if "error" in span.attributes else "ok"
+                latencies.setdefault((self.get_phase(span), status), []).append(
+                    round(span.duration * 1000, 3)
+                )
+
+        timestamp = int(time.time() * 1000)
+        records = []
+        for (phase, status), values in latencies.items():
+            for offset in range(0, len(values), EMF_MAX_VALUES):
+                records.append(
+                    {
+                        "_aws": {
+                            "Timestamp": timestamp,
+                            "CloudWatchMetrics": [
+                                {
+                                    "Namespace": self.namespace,
+                                    "Dimensions": [["Phase"], ["Phase", "Status"]],
+                                    "Metrics": [
+                                        {"Name": "Latency", "Unit": "Milliseconds"}
+                                    ],
+                                }
+                            ],
+                        },
+                        "Phase": phase,
+                        "Status": status,
+                        "TraceId": self.trace_id,
+                        "Latency": values[offset : offset + EMF_MAX_VALUES],
+                    }
+                )
+        return records
+
+    def flush(self) -> None:
+        """Print the trace and the EMF records of the spans, then start a new trace."""
+        if self.enabled and self.spans:
+            print(json.dumps({"trace": self.get_trace()}, default=str))
+            for record in self.get_metric_records():
+                print(json.dumps(record))
+        self.reset()
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
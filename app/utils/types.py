@@ -1,22 +1,50 @@
-from typing import TypedDict
+from typing import Optional, TypedDict
 from datetime import datetime
+from dataclasses import dataclass
 
 
-class FixtureDict(TypedDict):
-    """Fixture dictionary for storing fixture data."""
+@dataclass
+class Category:
+    """Category (country / competition group) of the offer."""
+
+    __slots__ = ("id", "seo_name")
 
     id: str
-    name: str
-    start_time: datetime
+    seo_name: str
+
 
+@dataclass
+class League:
+    """League of the offer, linked to its category once indexed."""
 
-class LeagueDict(TypedDict):
-    """League dictionary for storing league data."""
+    __slots__ = ("id", "name", "league_seo_name", "category_id", "category")
 
     id: str
     name: str
     league_seo_name: str
     category_id: str
+    category: Optional[Category]
+
+
+@dataclass
+class Fixture:
+    """Fixture of the offer, linked to the league it belongs to."""
+
+    __slots__ = ("id", "name", "start_time", "match_seo_name", "league")
+
+    id: str
+    name: str
+    start_time: datetime
+    match_seo_name: str
+    league: League
+
+    @property
+    def league_seo_name(self) -> str:
+        return self.league.league_seo_name
+
+    @property
+    def category_seo_name(self) -> str:
+        return self.league.category.seo_name
 
 
 class MatchesToBetDict(TypedDict):
@@ -35,3 +63,4 @@ class MatchesToBetDict(TypedDict):
 class TriggerType:
     FIND_MATCHES: str = "FIND_MATCHES"
     PLACE_BET: str = "PLACE_BET"
+    WATCH_ODDS: str = "WATCH_ODDS"
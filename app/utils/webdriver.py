@@ -1,21 +1,21 @@
 import os
 import uuid
-import tempfile
 
-from seleniumwire import webdriver
+from typing import Optional
+from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 
+from utils.tracing import span
 
-def get_new_driver(
-    proxy_user: str,
-    proxy_password: str,
-    proxy_host: str,
-    proxy_port: int,
-    headless: bool = True,
-) -> webdriver.Chrome:
-    """Initializes a new browser based on specific options
-    and returns its handle"""
+
+def get_chrome_options(
+    headless: bool = True, user_data_dir: Optional[str] = None
+) -> Options:
+    """
+    Chrome options shared by every browser backend.
+    A throwaway profile directory is used unless `user_data_dir` is given.
+    """
     chrome_options = Options()
     chrome_options.binary_location = "/opt/chrome/chrome-linux64/chrome"
 
@@ -29,21 +29,39 @@ def get_new_driver(
     chrome_options.add_argument("--disable-extensions")
     chrome_options.add_argument("--single-process")
 
-    temporary_data_dir = f"/tmp/selenium_profile_{uuid.uuid4().hex}"
-    os.makedirs(temporary_data_dir, exist_ok=True)
-    chrome_options.add_argument(f"--user-data-dir={temporary_data_dir}")
-    chrome_options.add_argument(f"--data-path={temporary_data_dir}")
-    chrome_options.add_argument(f"--disk-cache-dir={temporary_data_dir}")
+    data_dir = user_data_dir or f"/tmp/selenium_profile_{uuid.uuid4().hex}"
+    os.makedirs(data_dir, exist_ok=True)
+    chrome_options.add_argument(f"--user-data-dir={data_dir}")
+    chrome_options.add_argument(f"--data-path={data_dir}")
+    chrome_options.add_argument(f"--disk-cache-dir={data_dir}")
 
     chrome_options.add_argument("--remote-debugging-pipe")
     chrome_options.add_argument("--verbose")
     chrome_options.add_argument("--log-path=/tmp")
+    return chrome_options
+
 
-    service = Service(
+def get_chrome_service() -> Service:
+    return Service(
         executable_path="/opt/chrome-driver/chromedriver-linux64/chromedriver",
         service_log_path="/tmp/chromedriver.log",
     )
 
+
+def get_seleniumwire_driver(
+    proxy_user: str,
+    proxy_password: str,
+    proxy_host: str,
+    proxy_port: int,
+    headless: bool = True,
+    user_data_dir: Optional[str] = None,
+) -> webdriver.Chrome:
+    """
+    Chrome behind the selenium-wire proxy, which authenticates against the
+    upstream proxy. Every request goes through the in-process MITM proxy.
+    """
+    from seleniumwire import webdriver as seleniumwire_webdriver
+
     seleniumwire_options = {
         "proxy": {
             "http": "http://{}:{}@{}:{}".format(
@@ -53,10 +71,60 @@ def get_new_driver(
         "disable-encoding": True,
     }
 
-    driver = webdriver.Chrome(
-        service=service,
-        options=chrome_options,
+    return seleniumwire_webdriver.Chrome(
+        service=get_chrome_service(),
+        options=get_chrome_options(headless, user_data_dir),
         seleniumwire_options=seleniumwire_options,
     )
-    driver.maximize_window()
+
+
+def get_chrome_driver(
+    proxy_user: str,
+    proxy_password: str,
+    proxy_host: str,
+    proxy_port: int,
+    headless: bool = True,
+    user_data_dir: Optional[str] = None,
+) -> webdriver.Chrome:
+    """
+    Plain Chrome connected directly to the proxy. The proxy credentials are
+    answered by a WebDriver BiDi authentication handler, so no traffic goes
+    through an intermediate proxy.
+    """
+    chrome_options = get_chrome_options(headless, user_data_dir)
+    chrome_options.add_argument(f"--proxy-server=http://{proxy_host}:{proxy_port}")
+    chrome_options.enable_bidi = True
+
+    driver = webdriver.Chrome(service=get_chrome_service(), options=chrome_options)
+    driver.network.add_auth_handler(proxy_user, proxy_password)
+    return driver
+
+
+DRIVER_BACKENDS = {
+    "seleniumwire": get_seleniumwire_driver,
+    "chrome": get_chrome_driver,
+}
+
+
+def get_new_driver(
+    proxy_user: str,
+    proxy_password: str,
+    proxy_host: str,
+    proxy_port: int,
+    headless: bool = True,
+    backend: str = "seleniumwire",
+    user_data_dir: Optional[str] = None,
+) -> webdriver.Chrome:
+    """Initializes a new browser based on specific options
+    and returns its handle"""
+    try:
+        get_driver = DRIVER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown browser backend: {backend}")
+
+    with span("get_new_driver", backend=backend):
+        driver = get_driver(
+            proxy_user, proxy_password, proxy_host, proxy_port, headless, user_data_dir
+        )
+        driver.maximize_window()
     return driver
@@ -0,0 +1,137 @@
+"""
+Benchmark the discovery of several accounts against the stand-in offer API of
+`benchmarks.offer_api_server`.
+
+"separate" runs the discovery of every account on its own, like one Lambda per
+account would, and reports the summed time. "shared" downloads the offer once into
+an `OfferSnapshot` and runs the selection of every account from it in parallel
+workers, as a multi-account run does. Accounts get different `maximum_bet_odd` and
+`max_number_of_bets_per_day` overrides, so their selections reach different markets.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.accounts --accounts 1,2,4,8 --latency 0.02
+"""
+
+import time
+import shutil
+import argparse
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.offer_api_server import OfferApiServer, OfferDay
+from bot.website import WebsiteBot
+from config.config import apply_offer_api_override, load_yaml
+from utils.accounts import get_account_config
+
+
+def get_configs(server: OfferApiServer, accounts: int) -> list[dict]:
+    config = load_yaml()
+    config["website"]["offer_api_override"] = server.url
+    config["cache"]["directory"] = tempfile.mkdtemp(prefix="accounts-cache-")
+    config["session_store"]["directory"] = tempfile.mkdtemp(prefix="accounts-session-")
+    config = apply_offer_api_override(config)
+    return [
+        get_account_config(
+            config,
+            f"account{index}",
+            {
+                "website": {
+                    "maximum_bet_odd": 1.05 + 0.05 * (index % 4),
+                    "max_number_of_bets_per_day": 3 + index % 3,
+                }
+            },
+        )
+        for index in range(accounts)
+    ]
+
+
+def get_bot(config: dict) -> WebsiteBot:
+    bot = WebsiteBot(
+        app_email="benchmark",
+        app_password="benchmark",
+        proxy_user="benchmark",
+        proxy_password="benchmark",
+        proxy_host="127.0.0.1",
+        proxy_port=0,
+        config=config,
+    )
+    # Talk to the stand-in directly
+    bot.session.proxies = {}
+    bot.session.trust_env = False
+    return bot
+
+
+def run_separate(configs: list[dict]) -> list[int]:
+    matches = []
+    for config in configs:
+        # Every Lambda would start with a cold response cache
+        shutil.rmtree(config["cache"]["directory"], ignore_errors=True)
+        bot = get_bot(config)
+        try:
+            matches.append(len(bot.get_matches_to_bet()))
+        finally:
+            bot.close()
+    return matches
+
+
+def run_shared(configs: list[dict], workers: int) -> list[int]:
+    shutil.rmtree(configs[0]["cache"]["directory"], ignore_errors=True)
+    bots = [get_bot(config) for config in configs]
+    try:
+        offer_snapshot = bots[0].get_offer_snapshot()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(
+                    lambda bot: len(
+                        bot.get_matches_to_bet(offer_snapshot=offer_snapshot)
+                    ),
+                    bots,
+                )
+            )
+    finally:
+        for bot in bots:
+            bot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--accounts", default="1,2,4,8", help="Comma separated")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--leagues", type=int, default=60)
+    parser.add_argument("--fixtures-per-league", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    offer_day = OfferDay(
+        leagues=args.leagues,
+        fixtures_per_league=args.fixtures_per_league,
+        seed=args.seed,
+    )
+    with OfferApiServer(offer_day, latency=args.latency) as server:
+        for accounts in (int(x) for x in args.accounts.split(",")):
+            configs = get_configs(server, accounts)
+            try:
+                for mode in ("separate", "shared"):
+                    server.requests_served.clear()
+                    started = time.perf_counter()
+                    if mode == "separate":
+                        matches = run_separate(configs)
+                    else:
+                        matches = run_shared(configs, args.workers)
+                    seconds = time.perf_counter() - started
+                    print(
+                        f"{accounts} accounts, {mode:<8} {seconds:6.2f} s, "
+                        f"{sum(server.requests_served.values())} requests, "
+                        f"matches {matches}"
+                    )
+            finally:
+                shutil.rmtree(configs[0]["cache"]["directory"], ignore_errors=True)
+                shutil.rmtree(
+                    configs[0]["session_store"]["directory"], ignore_errors=True
+                )
+
+
+if __name__ == "__main__":
+    main()
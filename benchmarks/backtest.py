@@ -0,0 +1,301 @@
+"""
+Backtest grids of selection parameters with `bot.backtester`, over synthetic days
+or the offers recorded in the history store.
+
+Synthetic days hold `--fixtures` fixtures between 10:00 and 23:00 with a
+"Victorie fara egal" and a "Final" market, whose favourite wins with the
+probability its odds imply without the margin. `--history` replays the recorded
+offers instead, settled with the `fixture_id,outcome_id` rows of `--results`.
+The history only holds the odds of the markets live runs fetched, for the live
+bet type, and no results: the bet types are limited to the recorded ones and
+without `--results` only the number of bets is meaningful.
+
+`--check` replays that many random configs through `select_greedy` and
+`WebsiteBot.get_match_to_bet` and fails if they disagree with the vectorized run.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.backtest --days 365 --fixtures 300
+    PYTHONPATH=app python -m benchmarks.backtest --history /mnt/history.sqlite3 --results results.csv
+"""
+
+import csv
+import time
+import random
+import argparse
+import numpy as np
+
+from datetime import datetime, timedelta
+
+from bot.backtester import (
+    RecordedFixture,
+    backtest,
+    get_grid,
+    get_recorded_bet_types,
+    load_recorded_days,
+)
+from bot.selection import select_greedy
+from bot.website import TIMEZONE, WebsiteBot
+from config.config import load_yaml
+from utils.accounts import merge_config
+from utils.history import HistoryStore
+from utils.types import Category, Fixture, League
+
+BET_TYPES = ("Victorie fara egal", "Final")
+MARGIN = 0.05
+
+LEAGUE = League(
+    id="league",
+    name="League",
+    league_seo_name="league",
+    category_id="category",
+    category=Category(id="category", seo_name="category"),
+)
+
+
+def get_market(
+    fixture_id: str, name: str, probabilities: list[float], rnd: random.Random
+) -> tuple[dict, str]:
+    """A market with the given outcome probabilities and its sampled winner."""
+    outcomes = [
+        {
+            "id": f"{fixture_id}-{name}-{index}",
+            "name": str(index),
+            "odds": max(1.01, round(1 / (probability * (1 + MARGIN)), 2)),
+        }
+        for index, probability in enumerate(probabilities)
+    ]
+    winner = rnd.choices(outcomes, weights=probabilities)[0]["id"]
+    market = {
+        "name": name,
+        "marketTypeId": name,
+        "marketTypeName": name,
+        "outcomes": outcomes,
+    }
+    return market, winner
+
+
+def generate_day(
+    day: datetime, number_of_fixtures: int, rnd: random.Random
+) -> list[RecordedFixture]:
+    recorded = []
+    for index in range(number_of_fixtures):
+        fixture = Fixture(
+            id=f"{day:%Y%m%d}-{index}",
+            name=f"Fixture {index}",
+            start_time=day + timedelta(minutes=rnd.randrange(10 * 60, 23 * 60, 5)),
+            match_seo_name=f"fixture-{index}",
+            league=LEAGUE,
+        )
+        # Probability of the favourite, heavy favourites being rare
+        favourite = min(0.99, rnd.betavariate(5, 2))
+        markets, winners = [], set()
+        if rnd.random() < 0.8:
+            market, winner = get_market(
+                fixture.id, "Victorie fara egal", [favourite, 1 - favourite], rnd
+            )
+            markets.append(market)
+            winners.add(winner)
+        draw = (1 - favourite) * 0.4
+        market, winner = get_market(
+            fixture.id,
+            "Final",
+            [favourite - draw / 2, draw, 1 - favourite - draw / 2],
+            rnd,
+        )
+        markets.append(market)
+        winners.add(winner)
+        rnd.shuffle(markets)
+        recorded.append(RecordedFixture(fixture, markets, frozenset(winners)))
+    return recorded
+
+
+def load_results(path: str) -> dict[str, frozenset]:
+    winners: dict[str, set] = {}
+    with open(path, newline="") as f:
+        for fixture_id, outcome_id in csv.reader(f):
+            winners.setdefault(fixture_id, set()).add(outcome_id)
+    return {fixture_id: frozenset(ids) for fixture_id, ids in winners.items()}
+
+
+def check(days, configs, result, samples: int, stake_fraction: float, rnd) -> None:
+    """Replay random configs through the live selection and compare."""
+    bots = {}
+    for index in rnd.sample(range(len(configs)), min(samples, len(configs))):
+        config = configs[index]
+        bot = bots.get(config["bet_type"])
+        if bot is None:
+            bot = bots[config["bet_type"]] = WebsiteBot(
+                app_email="backtest",
+                app_password="backtest",
+                proxy_user="backtest",
+                proxy_password="backtest",
+                proxy_host="127.0.0.1",
+                proxy_port=0,
+                config=merge_config(
+                    load_yaml(), {"website": {"bet_type": config["bet_type"]}}
+                ),
+            )
+        bets, bankroll = 0, 1.0
+        for day in days:
+            recorded = {r.fixture.id: r for r in day}
+            matches = select_greedy(
+                sorted((r.fixture for r in day), key=lambda f: f.start_time),
+                fetch_markets=lambda fixture: recorded[fixture.id].markets,
+                get_match=lambda fixture, markets: bot.get_match_to_bet(
+                    fixture, markets, config["maximum_bet_odd"]
+                ),
+                max_number_of_bets=config["max_number_of_bets_per_day"],
+                hours_between_matches=config["minimum_hours_between_matches"],
+            )
+            for match in matches:
+                bets += 1
+                won = match["bet_option_id"] in (
+                    recorded[match["id"]].winning_outcome_ids or ()
+                )
+                if recorded[match["id"]].winning_outcome_ids is not None:
+                    bankroll *= (
+                        1
+                        - stake_fraction
+                        + (stake_fraction * match["odd_value"] if won else 0)
+                    )
+        if bets != result.bets[index] or not np.isclose(
+            bankroll, result.bankroll[index, -1], rtol=1e-9, atol=1e-12
+        ):
+            raise AssertionError(
+                f"{config}: {bets} bets, bankroll {bankroll} live, "
+                f"{result.bets[index]} bets, bankroll {result.bankroll[index, -1]} "
+                "vectorized"
+            )
+    print(f"check: {min(samples, len(configs))} configs match select_greedy")
+
+
+def parse_values(value: str, cast=float) -> list:
+    """Comma separated values, or start:stop:step ranges with an inclusive stop."""
+    values = []
+    for part in value.split(","):
+        if ":" in part:
+            start, stop, step = (float(x) for x in part.split(":"))
+            values.extend(
+                cast(round(x, 6)) for x in np.arange(start, stop + step / 2, step)
+            )
+        else:
+            values.append(cast(part))
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--fixtures", type=int, default=300, help="Per day")
+    parser.add_argument("--history", help="History store to replay")
+    parser.add_argument("--results", help="fixture_id,outcome_id CSV of winners")
+    parser.add_argument("--maximum-bet-odd", default="1.01:1.30:0.01")
+    parser.add_argument("--hours-between-matches", default="0:6:0.5")
+    parser.add_argument("--bets-per-day", default="1:10:1")
+    parser.add_argument("--bet-types", default=",".join(BET_TYPES))
+    parser.add_argument("--stake-fraction", type=float, default=1.0)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--check", type=int, default=0, help="Configs to verify")
+    parser.add_argument("--output", help="Save the bankroll curves as .npz")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    bet_types = args.bet_types.split(",")
+    started = time.perf_counter()
+    if args.history:
+        store = HistoryStore(args.history)
+        try:
+            start, end = datetime(1970, 1, 2), datetime.now() + timedelta(days=2)
+            days = load_recorded_days(
+                store,
+                start,
+                end,
+                TIMEZONE,
+                load_results(args.results) if args.results else None,
+            )
+            recorded_fixtures = store.count_fixtures(start, end)
+        finally:
+            store.close()
+
+        print(
+            f"{sum(map(len, days))} of {recorded_fixtures} recorded fixtures have "
+            "odds, only those are replayed. Configs reaching further than the live "
+            "selection see part of the offer."
+        )
+        recorded_bet_types = get_recorded_bet_types(days)
+        skipped = [
+            bet_type for bet_type in bet_types if bet_type not in recorded_bet_types
+        ]
+        if skipped:
+            print(f"No odds recorded for {', '.join(skipped)}, skipped.")
+        bet_types = [
+            bet_type for bet_type in bet_types if bet_type in recorded_bet_types
+        ]
+        if not bet_types:
+            recorded = ", ".join(sorted(recorded_bet_types)) or "no market"
+            raise SystemExit(f"The history holds odds for {recorded} only.")
+        if not args.results:
+            print(
+                "No --results given: the history holds no bet outcomes, so hit "
+                "rates and bankrolls are not computed, only the bets placed."
+            )
+    else:
+        first_day = TIMEZONE.localize(datetime(2024, 1, 1))
+        days = [
+            generate_day(first_day + timedelta(days=offset), args.fixtures, rnd)
+            for offset in range(args.days)
+        ]
+    print(f"{len(days)} days loaded in {time.perf_counter() - started:.2f} s")
+
+    configs = get_grid(
+        maximum_bet_odd=parse_values(args.maximum_bet_odd),
+        minimum_hours_between_matches=parse_values(args.hours_between_matches),
+        max_number_of_bets_per_day=parse_values(args.bets_per_day, int),
+        bet_type=bet_types,
+    )
+    started = time.perf_counter()
+    result = backtest(days, configs, stake_fraction=args.stake_fraction)
+    print(
+        f"{len(configs)} configs x {len(days)} days backtested in "
+        f"{time.perf_counter() - started:.2f} s"
+    )
+
+    live = load_yaml()["website"]
+    live_indexes = [
+        index
+        for index, config in enumerate(configs)
+        if all(config[key] == live[key] for key in config)
+    ]
+    for title, rows in (
+        ("live config", result.get_rows(live_indexes)),
+        (f"top {args.top}", result.get_rows()[: args.top]),
+    ):
+        print(title)
+        for row in rows:
+            print(
+                f"  odd {row['maximum_bet_odd']:.2f}, "
+                f"{row['minimum_hours_between_matches']:4.1f} h, "
+                f"{row['max_number_of_bets_per_day']:2d} bets/day, "
+                f"{row['bet_type']:<18} {row['bets']:5d} bets, "
+                f"hit rate {row['hit_rate']:.3f}, "
+                f"bankroll {row['final_bankroll']:.4g} "
+                f"(lowest {row['lowest_bankroll']:.4g}, "
+                f"solvent {row['days_solvent']} days)"
+            )
+
+    if args.output:
+        np.savez_compressed(
+            args.output,
+            bankroll=result.bankroll,
+            bets=result.bets,
+            hit_rate=result.hit_rate,
+            days_solvent=result.days_solvent,
+            configs=np.array([list(map(str, c.values())) for c in configs]),
+        )
+    if args.check:
+        check(days, configs, result, args.check, args.stake_fraction, rnd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Local stand-in for the betting website, reproducing the elements of `bot/selectors.py`.
+
+- `/` has the cookie consent banner and the login dialog. Signing in sets a
+  `session` cookie which `/api/user/info` accepts, like the balance endpoint.
+- `/pariuri-online/fotbal/<category>/<league>/<match>` is a match page with the
+  markets of `markets`. Their containers start collapsed, with the bet options
+  hidden, unless `collapsed` is false. Once an option is picked, the betslip shows
+  up, and placing the bet posts it to `/api/betslip/place`.
+- `/api/betslip/place` is also the betslip endpoint of the browserless placement.
+  It takes the stake and the selections, each with the highest odd accepted, and
+  answers with the accepted odds, or with the current ones if they went higher.
+- With `odds_change_after` set, every odd moves to `odds_change_to` that many
+  seconds after a match page was last loaded (or the server started).
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.betting_site --port 8081
+"""
+
+import json
+import time
+import uuid
+import argparse
+import threading
+
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+MATCH_PAGE_PREFIX = "/pariuri-online/fotbal/"
+
+# Market type id, name and bet options as (id, label, odds)
+DEFAULT_MARKETS = [
+    ("ufo:mrkt:1", "Final", [("option-1", "1", 1.8), ("option-2", "X", 3.4)]),
+    (
+        "ufo:mrkt:2",
+        "Victorie fara egal",
+        [("option-3", "1", 1.04), ("option-4", "2", 9.5)],
+    ),
+    ("ufo:mrkt:3", "Total goluri", [("option-5", "Sub 2.5", 1.9)]),
+]
+
+HOME_PAGE = """<html>
+<head><title>Stand-in</title>
+<style>.hidden {{ display: none; }}</style>
+</head>
+<body>
+<div id="cookie-banner">
+  Cookies <button id="cookie-consent-button-accept">Accept</button>
+</div>
+<button id="login-mounted">Login</button>
+<div id="login-dialog" class="hidden">
+  <input id="login-dialog-input-name" type="text">
+  <input id="login-dialog-input-password" type="password">
+  <button id="login-dialog-sign-in">Sign in</button>
+</div>
+<div id="account" class="hidden">Logged in</div>
+<script>
+const show = (id, visible) => document.getElementById(id).classList.toggle("hidden", !visible);
+document.getElementById("cookie-consent-button-accept").onclick = () => show("cookie-banner", false);
+document.getElementById("login-mounted").onclick = () => {{
+  // The dialog is mounted a moment after the click, like on the real site
+  setTimeout(() => show("login-dialog", true), {dialog_delay_ms});
+}};
+document.getElementById("login-dialog-sign-in").onclick = async () => {{
+  const response = await fetch("/api/login", {{
+    method: "POST",
+    headers: {{"Content-Type": "application/json"}},
+    body: JSON.stringify({{
+      username: document.getElementById("login-dialog-input-name").value,
+      password: document.getElementById("login-dialog-input-password").value,
+    }}),
+  }});
+  if (response.ok) {{
+    show("login-dialog", false);
+    show("account", true);
+  }}
+}};
+</script>
+</body>
+</html>"""
+
+MATCH_PAGE = """<html>
+<head><title>Match</title>
+<style>
+.hidden {{ display: none; }}
+.collapsed .outcomes {{ display: none; }}
+.outcome div {{ display: block; }}
+</style>
+</head>
+<body>
+<h1>{match}</h1>
+{containers}
+<div id="betslip" class="hidden">
+  <div id="betslip-selection"></div>
+  <input data-test="betslip-payin-input" type="text">
+  <button data-test="betslip-placement-button">Place bet</button>
+  <div id="betslip-placed" class="hidden">Bet placed</div>
+</div>
+<script>
+let selection = null;
+document.querySelectorAll("[data-testing-selector='MatchDetailCard'] .header").forEach(
+  (header) => header.onclick = () => header.parentElement.classList.toggle("collapsed")
+);
+document.querySelectorAll("button.outcome").forEach((button) => button.onclick = () => {{
+  selection = button;
+  document.getElementById("betslip-selection").textContent = button.dataset.id;
+  document.getElementById("betslip").classList.remove("hidden");
+}});
+document.querySelector("[data-test='betslip-placement-button']").onclick = async () => {{
+  const response = await fetch("/api/betslip/place", {{
+    method: "POST",
+    headers: {{"Content-Type": "application/json"}},
+    body: JSON.stringify({{
+      stake: parseFloat(document.querySelector("[data-test='betslip-payin-input']").value),
+      selections: [{{
+        marketTypeId: selection.closest("[market-type-id]").getAttribute("market-type-id"),
+        outcomeId: selection.dataset.id,
+        maxOdds: parseFloat(selection.querySelector(".odds").textContent),
+      }}],
+    }}),
+  }});
+  if (response.ok) document.getElementById("betslip-placed").classList.remove("hidden");
+}};
+const oddsChangeAfter = {odds_change_after_ms};
+if (oddsChangeAfter >= 0) {{
+  setTimeout(() => document.querySelectorAll(".odds").forEach(
+    (odds) => odds.textContent = "{odds_change_to}"
+  ), oddsChangeAfter);
+}}
+</script>
+</body>
+</html>"""
+
+
+class BettingSiteRequestHandler(BaseHTTPRequestHandler):
+    server: "BettingSiteServer"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def send_body(
+        self,
+        content_type: str,
+        body: bytes,
+        status: int = 200,
+        headers: Optional[dict[str, str]] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, payload: Any, status: int = 200, headers=None) -> None:
+        self.send_body(
+            "application/json", json.dumps(payload).encode(), status, headers
+        )
+
+    def read_json(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}
+
+    def is_logged_in(self) -> bool:
+        cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        return "session" in cookies and cookies["session"].value in self.server.sessions
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path
+        if path == "/":
+            self.send_body(
+                "text/html",
+                HOME_PAGE.format(
+                    dialog_delay_ms=int(self.server.dialog_delay * 1000)
+                ).encode(),
+            )
+        elif path.startswith(MATCH_PAGE_PREFIX):
+            self.server.odds_since = time.time()
+            self.send_body("text/html", self.server.get_match_page(path).encode())
+        elif path == "/api/user/info":
+            if self.is_logged_in():
+                self.send_json(
+                    {
+                        "status": "LOGGED_IN",
+                        "userInfo": {"account": {"balance": self.server.balance}},
+                    }
+                )
+            else:
+                self.send_json({"status": "ANONYMOUS"})
+        else:
+            self.send_json({"error": "Not found"}, status=404)
+
+    def do_POST(self) -> None:
+        path = urlsplit(self.path).path
+        payload = self.read_json()
+        if path == "/api/login":
+            if (payload.get("username"), payload.get("password")) != (
+                self.server.username,
+                self.server.password,
+            ):
+                self.send_json({"status": "INVALID_CREDENTIALS"}, status=401)
+                return
+            token = uuid.uuid4().hex
+            self.server.sessions.add(token)
+            self.send_json(
+                {"status": "LOGGED_IN"},
+                headers={"Set-Cookie": f"session={token}; Path=/"},
+            )
+        elif path == "/api/betslip/place":
+            if not self.is_logged_in():
+                self.send_json({"status": "ANONYMOUS"}, status=401)
+                return
+            self.send_json(self.server.place_betslip(payload))
+        else:
+            self.send_json({"error": "Not found"}, status=404)
+
+
+class BettingSiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        markets: list = DEFAULT_MARKETS,
+        collapsed: bool = True,
+        balance: float = 10.0,
+        dialog_delay: float = 0.3,
+        odds_change_after: Optional[float] = None,
+        odds_change_to: float = 1.5,
+    ):
+        super().__init__((host, port), BettingSiteRequestHandler)
+        self.username = username
+        self.password = password
+        self.markets = markets
+        self.collapsed = collapsed
+        self.balance = balance
+        self.dialog_delay = dialog_delay
+        self.odds_change_after = odds_change_after
+        self.odds_change_to = odds_change_to
+        self.odds_since = time.time()
+        self.sessions: set[str] = set()
+        self.placements: list[dict[str, Any]] = []
+        self.placed = threading.Event()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get_match_page(self, path: str) -> str:
+        match = path[len(MATCH_PAGE_PREFIX) :].strip("/")
+        containers = "".join(
+            f"<div data-testing-selector='MatchDetailCard' market-type-id='{market_id}'"
+            f" class='{'collapsed' if self.collapsed else ''}'>"
+            f"<div class='header'>{name}</div><div class='outcomes'>"
+            + "".join(
+                f"<button class='outcome' data-id='{option_id}'>"
+                f"<div>{label}</div><div class='odds'>{odds}</div></button>"
+                for option_id, label, odds in options
+            )
+            + "</div></div>"
+            for market_id, name, options in self.markets
+        )
+        return MATCH_PAGE.format(
+            match=match,
+            match_json=json.dumps(match),
+            containers=containers,
+            odds_change_after_ms=(
+                -1
+                if self.odds_change_after is None
+                else int(self.odds_change_after * 1000)
+            ),
+            odds_change_to=self.odds_change_to,
+        )
+
+    def get_current_odds(self, market_type_id: str, option_id: str) -> Optional[float]:
+        if (
+            self.odds_change_after is not None
+            and time.time() - self.odds_since >= self.odds_change_after
+        ):
+            return self.odds_change_to
+        for market_id, _, options in self.markets:
+            for current_option_id, _, odds in options:
+                if (market_id, current_option_id) == (market_type_id, option_id):
+                    return odds
+        return None
+
+    def place_betslip(self, betslip: dict[str, Any]) -> dict[str, Any]:
+        """Place the betslip unless one of its odds is unknown or went too high."""
+        accepted_odds = []
+        for selection in betslip.get("selections") or []:
+            odds = self.get_current_odds(
+                selection.get("marketTypeId"), selection.get("outcomeId")
+            )
+            if odds is None:
+                return {"status": "UNKNOWN_SELECTION"}
+            if odds > (selection.get("maxOdds") or 0):
+                return {"status": "ODDS_CHANGED", "currentOdds": odds}
+            accepted_odds.append(odds)
+        if not accepted_odds:
+            return {"status": "EMPTY_BETSLIP"}
+
+        with self.lock:
+            self.placements.append({**betslip, "acceptedOdds": accepted_odds})
+        self.placed.set()
+        return {
+            "status": "PLACED",
+            "betslipId": uuid.uuid4().hex,
+            "acceptedOdds": accepted_odds,
+        }
+
+    def start(self) -> "BettingSiteServer":
+        """Serve from a background thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "BettingSiteServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--username", default="benchmark")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--expanded", action="store_true")
+    parser.add_argument("--odds-change-after", type=float, help="Seconds")
+    parser.add_argument("--odds-change-to", type=float, default=1.5)
+    args = parser.parse_args()
+
+    server = BettingSiteServer(
+        args.username,
+        args.password,
+        host=args.host,
+        port=args.port,
+        collapsed=not args.expanded,
+        odds_change_after=args.odds_change_after,
+        odds_change_to=args.odds_change_to,
+    )
+    print(f"Serving the betting site on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
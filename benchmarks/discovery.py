@@ -0,0 +1,106 @@
+"""
+Benchmark the discovery path, `WebsiteBot.get_matches_to_bet`, against the
+stand-in offer API of `benchmarks.offer_api_server`.
+
+For each day size, reports the requests made per endpoint, the wall time and the
+peak Python memory (measured with tracemalloc in a second, separate run).
+Each run starts with an empty response cache.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.discovery --days 20x10,60x12,150x15 --latency 0.02
+"""
+
+import copy
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+from benchmarks.offer_api_server import OfferApiServer, OfferDay
+from bot.website import WebsiteBot
+from config.config import apply_offer_api_override, load_yaml
+from utils.runtime import runtime
+from utils.tracing import tracer
+
+
+def run_discovery(config: dict, server: OfferApiServer) -> tuple[int, dict, float]:
+    """Run the discovery once, returning the matches found, requests and seconds."""
+    config = copy.deepcopy(config)
+    config["website"]["offer_api_override"] = server.url
+    config["cache"]["directory"] = tempfile.mkdtemp(prefix="discovery-cache-")
+    config["session_store"]["directory"] = tempfile.mkdtemp(prefix="discovery-session-")
+    runtime.config = apply_offer_api_override(config)
+    tracer.reset()
+
+    bot = WebsiteBot(
+        app_email="benchmark",
+        app_password="benchmark",
+        proxy_user="benchmark",
+        proxy_password="benchmark",
+        proxy_host="127.0.0.1",
+        proxy_port=0,
+    )
+    # Talk to the stand-in directly
+    bot.session.proxies = {}
+    bot.session.trust_env = False
+
+    server.requests_served.clear()
+    try:
+        started = time.perf_counter()
+        matches = bot.get_matches_to_bet()
+        seconds = time.perf_counter() - started
+    finally:
+        bot.close()
+        shutil.rmtree(config["cache"]["directory"], ignore_errors=True)
+        shutil.rmtree(config["session_store"]["directory"], ignore_errors=True)
+    return len(matches), dict(server.requests_served), seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--days",
+        default="20x10,60x12,150x15",
+        help="Comma separated day sizes, as <leagues>x<fixtures per league>",
+    )
+    parser.add_argument("--markets-per-fixture", type=int, default=40)
+    parser.add_argument("--suitable-ratio", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = load_yaml()
+    for day in args.days.split(","):
+        leagues, fixtures_per_league = (int(x) for x in day.split("x"))
+        offer_day = OfferDay(
+            leagues=leagues,
+            fixtures_per_league=fixtures_per_league,
+            markets_per_fixture=args.markets_per_fixture,
+            suitable_ratio=args.suitable_ratio,
+            seed=args.seed,
+        )
+        with OfferApiServer(
+            offer_day, latency=args.latency, error_rate=args.error_rate
+        ) as server:
+            try:
+                matches, requests_made, seconds = run_discovery(config, server)
+                tracemalloc.start()
+                run_discovery(config, server)
+                peak = tracemalloc.get_traced_memory()[1]
+            except ValueError as e:
+                print(f"{day}: discovery failed ({e}), {server.requests_served}")
+                continue
+            finally:
+                tracemalloc.stop()
+
+        print(
+            f"{day}: {matches} matches, "
+            f"{sum(v for k, v in requests_made.items() if k != 'errors')} requests "
+            f"{requests_made}, {seconds:.2f} s, {peak / 1024 / 1024:.1f} MiB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()
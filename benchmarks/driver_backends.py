@@ -0,0 +1,154 @@
+"""
+Compare the browser backends of `utils.webdriver.get_new_driver`.
+
+Each run starts a fresh process which launches the backend against the local
+proxy stand-in, loads a page with a few hundred kB of scripts through it and
+reports the startup time, the page load time and the peak RSS of the whole
+process tree (Python, chromedriver, Chrome and, for selenium-wire, its MITM proxy).
+Must run where Chrome and chromedriver are installed, e.g. inside the Lambda image.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.driver_backends --runs 3
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+from utils.webdriver import DRIVER_BACKENDS, get_new_driver
+from benchmarks.proxy_server import ProxyServer
+
+PAGE_URL = "http://backend-benchmark.test/"
+
+
+def get_process_tree_rss(root_pid: int) -> int:
+    """Return the summed resident memory, in bytes, of a process and its descendants."""
+    children = {}
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                # The command name may contain spaces, the parent pid follows it
+                parent_pid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent_pid, []).append(int(pid))
+
+    rss = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return rss
+
+
+class PeakRssSampler(threading.Thread):
+    """Sample the RSS of the current process tree until stopped."""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_rss = 0
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            self.peak_rss = max(self.peak_rss, get_process_tree_rss(os.getpid()))
+            time.sleep(self.interval)
+
+    def stop(self) -> int:
+        self.stopped.set()
+        self.join()
+        return self.peak_rss
+
+
+def run_backend(backend: str, assets: int, asset_size: int) -> dict:
+    proxy = ProxyServer(
+        "benchmark", "secret", assets=assets, asset_size=asset_size
+    ).start()
+    sampler = PeakRssSampler()
+    sampler.start()
+    try:
+        start = time.perf_counter()
+        driver = get_new_driver(
+            "benchmark", "secret", "127.0.0.1", proxy.port, backend=backend
+        )
+        startup_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        driver.get(PAGE_URL)
+        page_load_time = time.perf_counter() - start
+        loaded = "Loaded" in driver.page_source
+
+        driver.quit()
+        return {
+            "backend": backend,
+            "startup_seconds": startup_time,
+            "page_load_seconds": page_load_time,
+            "peak_rss_mb": sampler.stop() / 1024 / 1024,
+            "page_loaded": loaded,
+            "proxy_requests": proxy.requests_served,
+        }
+    finally:
+        sampler.stopped.set()
+        proxy.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", nargs="+", default=list(DRIVER_BACKENDS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--assets", type=int, default=20)
+    parser.add_argument("--asset-size", type=int, default=200_000)
+    parser.add_argument("--run-backend", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_backend:
+        print(json.dumps(run_backend(args.run_backend, args.assets, args.asset_size)))
+        return
+
+    for backend in args.backends:
+        results = []
+        for _ in range(args.runs):
+            # A fresh process per run, so imports and leftovers of one backend
+            # do not count towards the memory of another
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.driver_backends",
+                    "--run-backend",
+                    backend,
+                    "--assets",
+                    str(args.assets),
+                    "--asset-size",
+                    str(args.asset_size),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+        print(
+            f"{backend:>12}: "
+            f"startup {min(r['startup_seconds'] for r in results):.2f} s, "
+            f"page load {min(r['page_load_seconds'] for r in results):.2f} s, "
+            f"peak RSS {max(r['peak_rss_mb'] for r in results):.0f} MB, "
+            f"page loaded {all(r['page_loaded'] for r in results)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark the fixture time filtering of a synthetic day.
+
+Compares the previous per-fixture loop (`utcfromtimestamp` + `astimezone` for every
+fixture, then a sort of all fixtures) against `FixtureTable`, both sorting the
+selected rows at once and merging the per-league runs.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.fixture_filter --fixtures 10000
+"""
+
+import random
+import argparse
+import timeit
+
+import pytz
+import numpy as np
+
+from datetime import datetime, timedelta
+
+from bot.fixture_table import FixtureTable, get_tomorrow_window
+from utils.types import Category, League
+
+TIMEZONE = pytz.timezone("Europe/Bucharest")
+
+
+def generate_day(
+    number_of_fixtures: int, number_of_leagues: int, seed: int = 0
+) -> list[tuple[League, list[dict]]]:
+    """Generate leagues with time-ordered raw fixtures spread around tomorrow."""
+    rnd = random.Random(seed)
+    now = datetime.now(TIMEZONE)
+    leagues = []
+    for league_index in range(number_of_leagues):
+        league = League(
+            id=f"league-{league_index}",
+            name=f"League {league_index}",
+            league_seo_name=f"league-{league_index}",
+            category_id="category",
+            category=Category(id="category", seo_name="category"),
+        )
+        leagues.append((league, []))
+
+    for fixture_index in range(number_of_fixtures):
+        start_time = now + timedelta(minutes=rnd.randrange(12 * 60, 60 * 60))
+        leagues[rnd.randrange(number_of_leagues)][1].append(
+            {
+                "id": f"fixture-{fixture_index}",
+                "name": f"Fixture {fixture_index}",
+                "seoName": f"fixture-{fixture_index}",
+                "startDatetime": int(start_time.timestamp()) * 1000,
+            }
+        )
+    for _, raw_fixtures in leagues:
+        raw_fixtures.sort(key=lambda x: x["startDatetime"])
+    return leagues
+
+
+def filter_per_fixture(leagues, minimum_start_hour: int) -> list[tuple[str, datetime]]:
+    """The per-fixture loop `get_fixtures_data_from_league` used to run."""
+    all_fixtures = []
+    for _, raw_fixtures in leagues:
+        timezone = pytz.timezone("Europe/Bucharest")
+        tomorrow = datetime.now(timezone) + timedelta(days=1)
+        for fixture in raw_fixtures:
+            timestamp = fixture["startDatetime"] / 1000
+            utc_date = datetime.utcfromtimestamp(timestamp).replace(tzinfo=pytz.utc)
+            match_local_date = utc_date.astimezone(timezone)
+            if (
+                match_local_date.hour < minimum_start_hour
+                or match_local_date.day - tomorrow.day != 0
+            ):
+                continue
+            all_fixtures.append((fixture["id"], match_local_date))
+    all_fixtures.sort(key=lambda x: x[1])
+    return all_fixtures
+
+
+def filter_columnar(leagues, minimum_start_hour: int) -> list[tuple[str, datetime]]:
+    """Select the rows of the whole day at once, then sort them by start time."""
+    fixture_table = FixtureTable()
+    for league, raw_fixtures in leagues:
+        fixture_table.add_league_fixtures(league, raw_fixtures)
+    league_indexes = np.repeat(
+        np.arange(len(leagues)), [len(raw_fixtures) for _, raw_fixtures in leagues]
+    )
+    window_start, window_end = get_tomorrow_window(TIMEZONE, minimum_start_hour)
+    start_times = fixture_table.start_times
+    (rows,) = np.nonzero((start_times >= window_start) & (start_times < window_end))
+    rows = rows[np.argsort(start_times[rows], kind="stable")]
+    fixtures = [
+        fixture_table.build_fixture(row, league_indexes[row], TIMEZONE)
+        for row in rows.tolist()
+    ]
+    return [(fixture.id, fixture.start_time) for fixture in fixtures]
+
+
+def filter_merged(leagues, minimum_start_hour: int) -> list[tuple[str, datetime]]:
+    fixture_table = FixtureTable()
+    for league, raw_fixtures in leagues:
+        fixture_table.add_league_fixtures(league, raw_fixtures)
+    window_start, window_end = get_tomorrow_window(TIMEZONE, minimum_start_hour)
+    return [
+        (fixture.id, fixture.start_time)
+        for fixture in fixture_table.iter_fixtures(window_start, window_end, TIMEZONE)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--fixtures", type=int, default=10000)
+    parser.add_argument("--leagues", type=int, default=400)
+    parser.add_argument("--minimum-start-hour", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    leagues = generate_day(args.fixtures, args.leagues)
+
+    expected = filter_per_fixture(leagues, args.minimum_start_hour)
+    for function in (filter_columnar, filter_merged):
+        assert (
+            function(leagues, args.minimum_start_hour) == expected
+        ), f"{function.__name__} does not match the per-fixture loop"
+
+    print(f"{args.fixtures} fixtures, {args.leagues} leagues, {len(expected)} kept")
+    for name, function in (
+        ("per-fixture", filter_per_fixture),
+        ("columnar", filter_columnar),
+        ("merged", filter_merged),
+    ):
+        timings = timeit.repeat(
+            lambda: function(leagues, args.minimum_start_hour),
+            number=1,
+            repeat=args.repeat,
+        )
+        print(
+            f"{name:>12}: best {min(timings) * 1000:.2f} ms, "
+            f"mean {sum(timings) / len(timings) * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
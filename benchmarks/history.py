@@ -0,0 +1,207 @@
+"""
+Benchmark the SQLite history store of `utils.history` over months of synthetic
+invocations.
+
+Every simulated day runs a discovery which records `--fixtures` fixtures and the
+odds of their bet market, schedules `--bets` of them, then `--sweeps` odds watcher
+invocations and the PLACE_BET invocations, each flushing its own buffer like a
+Lambda invocation does. The flush time of the invocations is reported, along with
+the latency of the query helpers once the whole history is written.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.history --days 180 --fixtures 800
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+from datetime import datetime, timedelta
+
+from bot.website import TIMEZONE
+from utils.history import HistoryRecorder, HistoryStore
+from utils.types import Category, Fixture, League
+
+
+def get_fixtures(day: datetime, count: int, rng: random.Random) -> list[Fixture]:
+    category = Category(id="1", seo_name="football")
+    leagues = [
+        League(
+            id=str(index),
+            name=f"League {index}",
+            league_seo_name=f"league-{index}",
+            category_id="1",
+            category=category,
+        )
+        for index in range(40)
+    ]
+    return [
+        Fixture(
+            id=f"{day:%Y%m%d}{index:05d}",
+            name=f"Home {index} - Away {index}",
+            start_time=day + timedelta(minutes=rng.randrange(10 * 60, 23 * 60, 15)),
+            match_seo_name=f"home-{index}-away-{index}",
+            league=leagues[index % len(leagues)],
+        )
+        for index in range(count)
+    ]
+
+
+def get_market(fixture: Fixture, rng: random.Random) -> dict:
+    return {
+        "name": "Final",
+        "marketTypeId": "1",
+        "marketTypeName": "Rezultat final",
+        "outcomes": [
+            {
+                "id": f"{fixture.id}-{outcome}",
+                "name": outcome,
+                "odds": round(rng.uniform(1.01, 6.0), 2),
+            }
+            for outcome in ("1", "X", "2")
+        ],
+    }
+
+
+def timed_flush(recorder: HistoryRecorder, flush_times: list[float]) -> None:
+    started = time.perf_counter()
+    recorder.flush()
+    flush_times.append(time.perf_counter() - started)
+
+
+def simulate_day(
+    recorder: HistoryRecorder,
+    day: datetime,
+    args: argparse.Namespace,
+    rng: random.Random,
+    flush_times: dict[str, list[float]],
+) -> None:
+    fixtures = get_fixtures(day, args.fixtures, rng)
+    markets = {fixture.id: get_market(fixture, rng) for fixture in fixtures}
+
+    # FIND_MATCHES
+    recorder.record_fixtures(fixtures)
+    for fixture in fixtures:
+        recorder.record_odds(fixture.id, [markets[fixture.id]], source="discovery")
+    payloads = []
+    for fixture in rng.sample(fixtures, args.bets):
+        outcome = min(markets[fixture.id]["outcomes"], key=lambda o: o["odds"])
+        payload = {
+            "schedule_name": f"match-{fixture.id}",
+            "fixture_id": fixture.id,
+            "market_type_id": "1",
+            "bet_option_id": outcome["id"],
+            "odd_value": outcome["odds"],
+        }
+        recorder.record_schedule(payload, fixture.start_time)
+        payloads.append(payload)
+    timed_flush(recorder, flush_times["discovery"])
+
+    # WATCH_ODDS
+    for _ in range(args.sweeps):
+        for payload in payloads:
+            recorder.record_outcome_odd(
+                payload["fixture_id"],
+                payload["market_type_id"],
+                payload["bet_option_id"],
+                round(payload["odd_value"] * rng.uniform(0.9, 1.1), 2),
+                source="watcher",
+            )
+        timed_flush(recorder, flush_times["watcher"])
+
+    # PLACE_BET
+    for payload in payloads:
+        odds = round(payload["odd_value"] * rng.uniform(0.9, 1.1), 2)
+        recorder.record_outcome_odd(
+            payload["fixture_id"],
+            payload["market_type_id"],
+            payload["bet_option_id"],
+            odds,
+            source="placement",
+        )
+        recorder.record_placement(
+            account=None,
+            fixture_id=payload["fixture_id"],
+            market_type_id=payload["market_type_id"],
+            bet_option_id=payload["bet_option_id"],
+            stake=10.0,
+            odds=odds,
+            mode="http",
+            status="placed",
+        )
+        timed_flush(recorder, flush_times["placement"])
+
+
+def time_query(query, repeat: int) -> tuple[float, int]:
+    """Median milliseconds of a query and the rows it returned."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = query()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--fixtures", type=int, default=800, help="Per day")
+    parser.add_argument("--bets", type=int, default=5, help="Per day")
+    parser.add_argument("--sweeps", type=int, default=20, help="Per day")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    path = os.path.join(tempfile.mkdtemp(prefix="history-"), "history.sqlite3")
+    recorder = HistoryRecorder(path, enabled=True)
+    flush_times: dict[str, list[float]] = {
+        "discovery": [],
+        "watcher": [],
+        "placement": [],
+    }
+
+    first_day = TIMEZONE.localize(datetime(2024, 1, 1))
+    started = time.perf_counter()
+    for offset in range(args.days):
+        simulate_day(
+            recorder, first_day + timedelta(days=offset), args, rng, flush_times
+        )
+    print(
+        f"{args.days} days written in {time.perf_counter() - started:.1f} s, "
+        f"{os.path.getsize(path) / 2**20:.1f} MiB"
+    )
+    for invocation, timings in flush_times.items():
+        print(
+            f"flush {invocation:<9} median {statistics.median(timings) * 1000:7.2f} ms, "
+            f"max {max(timings) * 1000:7.2f} ms over {len(timings)} invocations"
+        )
+
+    store = HistoryStore(path)
+    last_day = first_day + timedelta(days=args.days)
+    fixture_id = f"{last_day - timedelta(days=1):%Y%m%d}00000"
+    queries = {
+        "odds movements, last 30 days": lambda: store.get_odds_movements(
+            last_day - timedelta(days=30), last_day
+        ),
+        "odds movements, whole history": lambda: store.get_odds_movements(
+            first_day, last_day
+        ),
+        "odds history of a fixture": lambda: store.get_odds_history(fixture_id),
+        "placements, last 30 days": lambda: store.get_placements(
+            datetime.now() - timedelta(days=30), datetime.now() + timedelta(minutes=1)
+        ),
+    }
+    try:
+        for name, query in queries.items():
+            milliseconds, rows = time_query(query, args.repeat)
+            print(f"{name:<30} {milliseconds:8.2f} ms, {rows} rows")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Benchmark the decoding of markets and fixtures payloads.
+
+Compares decoding the whole payload with the standard library and with orjson
+against the projected decoding of `utils.json_decoding`, reporting the parse
+time, and the peak and retained memory allocated per call (measured with tracemalloc).
+Payloads are synthetic unless recorded responses are given with --payload-dir:
+a JSON list is taken as a markets payload, an object with `fixtures` as a
+fixtures payload.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.json_decoding --payloads 50
+    PYTHONPATH=app python -m benchmarks.json_decoding --payload-dir /tmp/payloads
+"""
+
+import os
+import json
+import random
+import argparse
+import timeit
+import tracemalloc
+
+from typing import Any, Callable
+
+from bot.website import FIXTURE_FIELDS, MARKET_FIELDS
+from utils.json_decoding import ProjectionError, extract_object, loads, project
+
+BET_TYPE = "Victorie fara egal"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def generate_markets(rnd: random.Random, number_of_markets: int) -> list[dict]:
+    """Markets of a fixture, the `BET_TYPE` one being present most of the time."""
+    names = [f"Market {index}" for index in range(number_of_markets)]
+    if rnd.random() < 0.8:
+        names[rnd.randrange(number_of_markets)] = BET_TYPE
+    return [
+        {
+            "id": f"market-{index}",
+            "name": name,
+            "marketTypeId": f"market-type-{index}",
+            "marketTypeName": name,
+            "status": "OPEN",
+            "tags": ["PREMATCH", "POPULAR"],
+            "outcomes": [
+                {
+                    "id": f"market-{index}-outcome-{outcome}",
+                    "name": f"Outcome {outcome}",
+                    "odds": round(rnd.uniform(1.01, 15.0), 2),
+                    "status": "OPEN",
+                    "parameters": {"handicap": rnd.randrange(-3, 4)},
+                }
+                for outcome in range(rnd.randrange(2, 12))
+            ],
+        }
+        for index, name in enumerate(names)
+    ]
+
+
+def generate_fixtures(rnd: random.Random, number_of_fixtures: int) -> dict:
+    """Fixtures of a league, with the fields the offer API sends along."""
+    return {
+        "fixtures": [
+            {
+                "id": f"fixture-{index}",
+                "name": f"Home {index} - Away {index}",
+                "seoName": f"home-{index}-away-{index}",
+                "startDatetime": 1735725600000 + rnd.randrange(0, 86400) * 1000,
+                "status": "NOT_STARTED",
+                "participants": [
+                    {"id": f"team-{index}-{side}", "name": f"Team {side}"}
+                    for side in ("home", "away")
+                ],
+                "marketsCount": rnd.randrange(10, 300),
+                "features": ["MATCHES", "LIVE_STREAM"],
+                "filters": ["tomorrow"],
+            }
+            for index in range(number_of_fixtures)
+        ]
+    }
+
+
+def decode_markets_full(decode: Callable[[bytes], Any]) -> Callable:
+    def decode_markets(content: bytes) -> list[dict]:
+        return [market for market in decode(content) if market["name"] == BET_TYPE][:1]
+
+    return decode_markets
+
+
+def decode_markets_projected(content: bytes) -> list[dict]:
+    try:
+        market = extract_object(content, "name", BET_TYPE, MARKET_FIELDS)
+        return [market] if market else []
+    except ProjectionError:
+        return decode_markets_full(loads)(content)
+
+
+def decode_fixtures_full(decode: Callable[[bytes], Any]) -> Callable:
+    def decode_fixtures(content: bytes) -> list[dict]:
+        return decode(content)["fixtures"]
+
+    return decode_fixtures
+
+
+def decode_fixtures_projected(content: bytes) -> list[dict]:
+    return project(loads(content)["fixtures"], FIXTURE_FIELDS)
+
+
+def measure(decode: Callable[[bytes], Any], payloads: list[bytes], number: int):
+    """Mean time per call, and mean peak and retained allocation per call."""
+    timer = timeit.Timer(lambda: [decode(payload) for payload in payloads])
+    seconds = min(timer.repeat(repeat=3, number=number)) / number / len(payloads)
+
+    peaks, retained = [], []
+    for payload in payloads:
+        tracemalloc.start()
+        result = decode(payload)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        peaks.append(peak)
+        retained.append(current)
+    return seconds, sum(peaks) / len(peaks), sum(retained) / len(retained)
+
+
+def load_payloads(payload_dir: str) -> tuple[list[bytes], list[bytes]]:
+    markets, fixtures = [], []
+    for file_name in sorted(os.listdir(payload_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        with open(os.path.join(payload_dir, file_name), "rb") as f:
+            content = f.read()
+        payload = json.loads(content)
+        if isinstance(payload, list):
+            markets.append(content)
+        elif isinstance(payload, dict) and "fixtures" in payload:
+            fixtures.append(content)
+    return markets, fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--payload-dir", help="Directory of recorded JSON responses")
+    parser.add_argument("--payloads", type=int, default=50)
+    parser.add_argument("--markets", type=int, default=150)
+    parser.add_argument("--fixtures", type=int, default=300)
+    parser.add_argument("--number", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.payload_dir:
+        markets_payloads, fixtures_payloads = load_payloads(args.payload_dir)
+    else:
+        rnd = random.Random(args.seed)
+        markets_payloads = [
+            json.dumps(generate_markets(rnd, args.markets)).encode()
+            for _ in range(args.payloads)
+        ]
+        fixtures_payloads = [
+            json.dumps(generate_fixtures(rnd, args.fixtures)).encode()
+            for _ in range(args.payloads)
+        ]
+
+    decoders = [("json", json.loads)] + ([("orjson", orjson.loads)] if orjson else [])
+    benchmarks = [
+        (
+            "markets",
+            markets_payloads,
+            [(name, decode_markets_full(decode)) for name, decode in decoders]
+            + [("projected", decode_markets_projected)],
+        ),
+        (
+            "fixtures",
+            fixtures_payloads,
+            [(name, decode_fixtures_full(decode)) for name, decode in decoders]
+            + [("projected", decode_fixtures_projected)],
+        ),
+    ]
+
+    for kind, payloads, methods in benchmarks:
+        if not payloads:
+            continue
+        size = sum(len(payload) for payload in payloads) / len(payloads)
+        print(f"{len(payloads)} {kind} payloads of {size / 1024:.1f} KiB on average:")
+
+        expected = [methods[0][1](payload) for payload in payloads]
+        for name, decode in methods:
+            decoded = [decode(payload) for payload in payloads]
+            if kind == "fixtures":
+                assert [project(x, FIXTURE_FIELDS) for x in decoded] == [
+                    project(x, FIXTURE_FIELDS) for x in expected
+                ], name
+            else:
+                assert decoded == expected, name
+            seconds, peak, retained = measure(decode, payloads, args.number)
+            print(
+                f"{name:>10}: {seconds * 1e6:8.1f} us per call, "
+                f"{peak / 1024:8.1f} KiB peak, {retained / 1024:8.1f} KiB retained"
+            )
+
+
+if __name__ == "__main__":
+    main()
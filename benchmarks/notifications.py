@@ -0,0 +1,102 @@
+"""
+Compare sending the emails of an invocation directly, one connection each, with
+queueing them in `NotificationOutbox`, against the SMTP stand-in of
+`benchmarks.smtp_server`.
+
+Each run sends `--info` info emails and one error email carrying a traceback and a
+screenshot of `--screenshot-size` bytes. Reports the time the handler is blocked
+sending, the time `flush` waits at the end, the connections and logins the server
+saw and the emails it received.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.notifications --info 3 --connect-latency 0.3 --latency 0.02
+"""
+
+import os
+import copy
+import time
+import argparse
+import tempfile
+
+from benchmarks.smtp_server import SmtpServer
+from config.config import load_yaml
+from utils._email import EmailSender
+from utils.outbox import NotificationOutbox
+
+TO_EMAIL = "to@example.com"
+
+
+def run_notifications(
+    server: SmtpServer, mode: str, info: int, attachments: tuple[str, str]
+) -> dict:
+    config = copy.deepcopy(load_yaml()["notifications"])
+    config.update(smtp_host=server.host, smtp_port=server.port, smtp_security="none")
+    email_sender = EmailSender.from_config("from@example.com", "secret", config)
+    sender = (
+        email_sender if mode == "direct" else NotificationOutbox(email_sender, config)
+    )
+    server.counts.clear()
+    server.messages.clear()
+
+    started = time.perf_counter()
+    for index in range(info):
+        sender.send_email(
+            to_email=TO_EMAIL,
+            subject=EmailSender.SUBJECT_INFO_TYPE,
+            body=EmailSender.BODY_PLACED_BET.format(f"Match {index}"),
+            events=[{"match_name": f"Match {index}", "odd_value": 1.2}],
+        )
+    sender.send_email(
+        to_email=TO_EMAIL,
+        subject=EmailSender.SUBJECT_ERROR_TYPE,
+        body=EmailSender.BODY_UNCAUGHT_EXCEPTION,
+        traceback_logs_path=attachments[0],
+        image_path=attachments[1],
+    )
+    blocked = time.perf_counter() - started
+    if mode == "outbox":
+        sender.flush()
+    total = time.perf_counter() - started
+
+    return {
+        "blocked_s": blocked,
+        "flush_s": total - blocked,
+        "connections": server.counts.get("connections", 0),
+        "logins": server.counts.get("logins", 0),
+        "emails": len(server.messages),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--info", type=int, default=3)
+    parser.add_argument("--screenshot-size", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds")
+    parser.add_argument("--connect-latency", type=float, default=0.3, help="Seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        traceback_path = os.path.join(directory, "traceback.txt")
+        with open(traceback_path, "w") as f:
+            f.write("Traceback (most recent call last):\n" * 1000)
+        screenshot_path = os.path.join(directory, "screenshot.png")
+        with open(screenshot_path, "wb") as f:
+            f.write(os.urandom(args.screenshot_size))
+
+        with SmtpServer(
+            latency=args.latency, connect_latency=args.connect_latency
+        ) as server:
+            for mode in ("direct", "outbox"):
+                result = run_notifications(
+                    server, mode, args.info, (traceback_path, screenshot_path)
+                )
+                print(
+                    f"{mode:<7} blocked {result['blocked_s']:.2f} s, "
+                    f"flush {result['flush_s']:.2f} s, "
+                    f"{result['connections']} connections, "
+                    f"{result['logins']} logins, {result['emails']} emails"
+                )
+
+
+if __name__ == "__main__":
+    main()
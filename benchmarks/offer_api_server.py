@@ -0,0 +1,253 @@
+"""
+Local stand-in for the offer API.
+
+Serves the categories, tournaments, fixtures and markets endpoints of `config.yaml`
+for a synthetic day, generated from a seed so that every run sees the same offer.
+Responses can be delayed by `latency` seconds and fail with a 503 at `error_rate`.
+Point the bot at it with `website.offer_api_override`.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.offer_api_server --port 8080 --leagues 60
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import pytz
+
+TIMEZONE = pytz.timezone("Europe/Bucharest")
+BET_TYPE = "Victorie fara egal"
+
+ROUTES = (
+    ("categories", re.compile(r"/offer/structure/.+/sport/[^/]+/categories")),
+    ("tournaments", re.compile(r"/offer/structure/.+/sport/[^/]+/tournaments")),
+    ("fixtures", re.compile(r"/offer/structure/.+/tournament/([^/]+)/fixtures")),
+    ("markets", re.compile(r"/offer/markets/.+/fixture/([^/]+)/markets")),
+)
+
+
+class OfferDay:
+    """
+    A synthetic day of the offer. Leagues and fixtures are generated upfront,
+    markets on request since they make up most of the payload.
+    """
+
+    def __init__(
+        self,
+        leagues: int = 60,
+        fixtures_per_league: int = 12,
+        markets_per_fixture: int = 40,
+        suitable_ratio: float = 0.3,
+        seed: int = 0,
+    ):
+        self.markets_per_fixture = markets_per_fixture
+        self.suitable_ratio = suitable_ratio
+        self.seed = seed
+        rnd = random.Random(seed)
+
+        tomorrow = (datetime.now(TIMEZONE) + timedelta(days=1)).date()
+        day_start = TIMEZONE.localize(datetime.combine(tomorrow, datetime.min.time()))
+
+        self.categories = [
+            {
+                "id": f"ufo:ctgr:{index}",
+                "name": f"Country {index}",
+                "seoName": f"c-{index}",
+            }
+            for index in range(max(leagues // 5, 1))
+        ]
+        self.tournaments = []
+        self.fixtures: dict[str, list[dict[str, Any]]] = {}
+        for league_index in range(leagues):
+            league_id = f"ufo:tour:{league_index}"
+            self.tournaments.append(
+                {
+                    "id": league_id,
+                    "name": f"League {league_index}",
+                    "seoName": f"league-{league_index}",
+                    "categoryId": rnd.choice(self.categories)["id"],
+                    "features": ["MATCHES"],
+                    "filters": ["tomorrow"],
+                }
+            )
+            # A few fixtures fall outside of tomorrow, like on the real endpoint
+            start_times = sorted(
+                day_start + timedelta(minutes=rnd.randrange(-60, 26 * 60, 5))
+                for _ in range(fixtures_per_league)
+            )
+            self.fixtures[league_id] = [
+                {
+                    "id": f"ufo:mtch:{league_index}-{index}",
+                    "name": f"Home {league_index}-{index} - Away {league_index}-{index}",
+                    "seoName": f"home-{league_index}-{index}-away-{league_index}-{index}",
+                    "startDatetime": int(start_time.timestamp() * 1000),
+                    "status": "NOT_STARTED",
+                    "marketsCount": markets_per_fixture,
+                }
+                for index, start_time in enumerate(start_times)
+            ]
+
+    def get_markets(self, fixture_id: str) -> list[dict[str, Any]]:
+        rnd = random.Random(f"{self.seed}-{fixture_id}")
+        names = [f"Market {index}" for index in range(self.markets_per_fixture)]
+        if names and rnd.random() < self.suitable_ratio:
+            names[rnd.randrange(len(names))] = BET_TYPE
+        return [
+            {
+                "id": f"{fixture_id}-{index}",
+                "name": name,
+                "marketTypeId": f"ufo:mrkt:{index}",
+                "marketTypeName": name,
+                "outcomes": [
+                    {
+                        "id": f"{fixture_id}-{index}-{outcome}",
+                        "name": f"Outcome {outcome}",
+                        "odds": round(
+                            rnd.uniform(1.01, 1.3 if name == BET_TYPE else 9), 2
+                        ),
+                    }
+                    for outcome in range(rnd.randrange(2, 6))
+                ],
+            }
+            for index, name in enumerate(names)
+        ]
+
+    def get_response(self, path: str) -> Optional[tuple[str, Any]]:
+        """Return the route and body of a request path, None if it is unknown."""
+        for route, pattern in ROUTES:
+            match = pattern.fullmatch(path)
+            if not match:
+                continue
+            if route == "categories":
+                return route, self.categories
+            if route == "tournaments":
+                return route, {"tournaments": self.tournaments}
+            if route == "fixtures":
+                return route, {"fixtures": self.fixtures.get(match.group(1), [])}
+            return route, self.get_markets(match.group(1))
+        return None
+
+
+class OfferApiRequestHandler(BaseHTTPRequestHandler):
+    server: "OfferApiServer"
+    # Keep connections alive, like the real API does
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.latency)
+        response = self.server.offer_day.get_response(urlsplit(self.path).path)
+        route = response[0] if response else "unknown"
+        self.server.count(route)
+
+        if response is None:
+            self.send_error(404)
+            return
+        if self.server.rnd.random() < self.server.error_rate:
+            self.server.count("errors")
+            self.send_error(503)
+            return
+
+        body = json.dumps(response[1]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class OfferApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        offer_day: OfferDay,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+    ):
+        super().__init__((host, port), OfferApiRequestHandler)
+        self.offer_day = offer_day
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rnd = random.Random(offer_day.seed)
+        self.lock = threading.Lock()
+        self.requests_served: dict[str, int] = {}
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, route: str) -> None:
+        with self.lock:
+            self.requests_served[route] = self.requests_served.get(route, 0) + 1
+
+    def start(self) -> "OfferApiServer":
+        """Serve from a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "OfferApiServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--leagues", type=int, default=60)
+    parser.add_argument("--fixtures-per-league", type=int, default=12)
+    parser.add_argument("--markets-per-fixture", type=int, default=40)
+    parser.add_argument("--suitable-ratio", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = OfferApiServer(
+        OfferDay(
+            leagues=args.leagues,
+            fixtures_per_league=args.fixtures_per_league,
+            markets_per_fixture=args.markets_per_fixture,
+            suitable_ratio=args.suitable_ratio,
+            seed=args.seed,
+        ),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    )
+    print(f"Serving the offer API on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Time each step of `login_to_website` and `BetPlacer.place_bet` under headless Chrome,
+against the stand-in site of `benchmarks.betting_site`. With --mode http the bet is
+placed through the betslip endpoint instead, after the browser logged in.
+
+Steps are the spans recorded by `utils.tracing` (page visits, element waits, clicks
+and typing), labelled with the name of their selector. The human-like pauses of the
+`driver` config are disabled unless --human-delays is given. Chrome talks to the
+stand-in directly, without a proxy, and must be installed along with chromedriver,
+e.g. inside the Lambda image.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.placement --runs 5
+    PYTHONPATH=app python -m benchmarks.placement --runs 5 --odds-change-after 0.5 --json out.json
+    PYTHONPATH=app python -m benchmarks.placement --runs 5 --mode http
+"""
+
+import re
+import copy
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+from selenium import webdriver
+from selenium.webdriver.support.ui import WebDriverWait
+
+from benchmarks.betting_site import DEFAULT_MARKETS, BettingSiteServer
+from bot import selectors
+from bot.bet_placer import BetPlacer
+from bot.website import WebsiteBot
+from config.config import load_yaml
+from utils.exceptions import EventOddsChangedError
+from utils.runtime import runtime
+from utils.tracing import span, tracer
+from utils.webdriver import get_chrome_options, get_chrome_service
+
+USERNAME = "benchmark"
+# Spans holding whole phases rather than single steps
+PHASES = ("login_to_website", "place_bet", "place_bet_over_http")
+PASSWORD = "secret"
+
+SELECTOR_PATTERNS = [
+    (re.compile(re.escape(str(value)).replace(r"\{\}", ".*")), name)
+    for name, value in vars(selectors).items()
+    if name.isupper() and isinstance(value, tuple)
+]
+
+
+def get_step_label(name: str, attributes: dict) -> str:
+    locator = attributes.get("locator")
+    if not locator or locator == "None":
+        return name
+    for pattern, selector_name in SELECTOR_PATTERNS:
+        if pattern.fullmatch(locator):
+            return f"{name} {selector_name}"
+    return f"{name} {locator}"
+
+
+def get_config(server: BettingSiteServer, human_delays: bool, mode: str) -> dict:
+    config = copy.deepcopy(load_yaml())
+    config["website"]["start_url"] = f"{server.url}/"
+    config["website"]["balance_endpoint"] = f"{server.url}/api/user/info"
+    config["website"]["betslip_endpoint"] = f"{server.url}/api/betslip/place"
+    config["placement"]["mode"] = mode
+    config["website"][
+        "match_base_url"
+    ] = f"{server.url}/pariuri-online/fotbal/{{}}/{{}}/{{}}"
+    config["cache"]["directory"] = tempfile.mkdtemp(prefix="placement-cache-")
+    config["session_store"]["directory"] = tempfile.mkdtemp(prefix="placement-session-")
+    if not human_delays:
+        for delay in ("click_delay", "typing_delay", "page_settle_delay"):
+            config["driver"][delay] = [0, 0]
+    return config
+
+
+def run_placement(server: BettingSiteServer, human_delays: bool, mode: str) -> dict:
+    """Log in and place a bet with a fresh browser, returning the timed steps."""
+    config = get_config(server, human_delays, mode)
+    runtime.config = config
+    tracer.reset()
+    server.placed.clear()
+
+    bot = WebsiteBot(
+        app_email=USERNAME,
+        app_password=PASSWORD,
+        proxy_user="benchmark",
+        proxy_password="benchmark",
+        proxy_host="127.0.0.1",
+        proxy_port=0,
+    )
+    bot.session.proxies = {}
+    bot.session.trust_env = False
+
+    market_type_id, market_type_name, options = DEFAULT_MARKETS[1]
+    outcome = "placed"
+    try:
+        with span("start_driver"):
+            bot._driver = webdriver.Chrome(
+                service=get_chrome_service(), options=get_chrome_options()
+            )
+            bot._wait = WebDriverWait(bot._driver, config["driver"]["wait_time"])
+
+        if not bot.login(browser=True):
+            raise ValueError("Could not log in to the stand-in site.")
+        try:
+            BetPlacer(
+                bot=bot,
+                match_url=config["website"]["match_base_url"].format(
+                    "category", "league", "match"
+                ),
+                market_type_id=market_type_id,
+                bet_option_id=options[0][0],
+                market_type_name=market_type_name,
+                bet_amount=1.0,
+            ).run()
+            with span("placement_confirmed"):
+                if not server.placed.wait(timeout=10):
+                    outcome = "not confirmed"
+        except EventOddsChangedError:
+            outcome = "odds changed"
+    finally:
+        bot.close()
+        shutil.rmtree(config["cache"]["directory"], ignore_errors=True)
+        shutil.rmtree(config["session_store"]["directory"], ignore_errors=True)
+
+    # Label repeated steps by occurrence, so runs line up step by step
+    steps, occurrences = [], {}
+    for step in tracer.get_trace()["spans"]:
+        if step["name"] in PHASES:
+            continue
+        label = get_step_label(step["name"], step["attributes"])
+        occurrences[label] = occurrences.get(label, 0) + 1
+        if occurrences[label] > 1:
+            label = f"{label} #{occurrences[label]}"
+        steps.append((label, step["duration_ms"]))
+    phases = {
+        step["name"]: step["duration_ms"]
+        for step in tracer.get_trace()["spans"]
+        if step["name"] in PHASES
+    }
+    return {"outcome": outcome, "steps": steps, "phases": phases}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--expanded", action="store_true")
+    parser.add_argument("--odds-change-after", type=float, help="Seconds")
+    parser.add_argument("--human-delays", action="store_true")
+    parser.add_argument("--mode", choices=("browser", "http"), default="browser")
+    parser.add_argument("--json", help="Write the per-step results to this file")
+    args = parser.parse_args()
+
+    with BettingSiteServer(
+        USERNAME,
+        PASSWORD,
+        collapsed=not args.expanded,
+        odds_change_after=args.odds_change_after,
+    ) as server:
+        runs = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            result = run_placement(server, args.human_delays, args.mode)
+            result["total_ms"] = (time.perf_counter() - started) * 1000
+            runs.append(result)
+
+    # Steps in the order of the first run, then the ones only other runs took
+    labels = list(dict.fromkeys(label for run in runs for label, _ in run["steps"]))
+    summary = []
+    for label in labels + list(PHASES) + ["total"]:
+        durations = []
+        for run in runs:
+            timings = {**dict(run["steps"]), **run["phases"], "total": run["total_ms"]}
+            if label in timings:
+                durations.append(timings[label])
+        if not durations:
+            continue
+        durations.sort()
+        summary.append(
+            {
+                "step": label,
+                "runs": len(durations),
+                "median_ms": statistics.median(durations),
+                "max_ms": durations[-1],
+            }
+        )
+
+    print(f"{args.runs} runs, outcomes: {[run['outcome'] for run in runs]}")
+    for row in summary:
+        print(
+            f"{row['step']:<48} {row['median_ms']:9.1f} ms median "
+            f"{row['max_ms']:9.1f} ms max ({row['runs']} runs)"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Local stand-in for the authenticated upstream proxy.
+
+Every proxied HTTP request needs `Proxy-Authorization: Basic ...` and is answered
+by the stand-in itself, whatever the requested host is: `/` returns a page which
+references `assets` scripts of `asset_size` bytes each. HTTPS (CONNECT) is not
+supported, so the benchmarks browse plain HTTP URLs.
+"""
+
+import base64
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class ProxyRequestHandler(BaseHTTPRequestHandler):
+    server: "ProxyServer"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def is_authorized(self) -> bool:
+        expected = base64.b64encode(
+            f"{self.server.username}:{self.server.password}".encode()
+        ).decode()
+        return self.headers.get("Proxy-Authorization") == f"Basic {expected}"
+
+    def send_body(self, content_type: str, body: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if not self.is_authorized():
+            self.send_response(407)
+            self.send_header("Proxy-Authenticate", 'Basic realm="proxy"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.server.requests_served += 1
+        path = urlsplit(self.path).path
+        if path.startswith("/asset/"):
+            self.send_body(
+                "application/javascript",
+                b"//" + b"x" * max(self.server.asset_size - 3, 0) + b"\n",
+            )
+            return
+
+        scripts = "".join(
+            f'<script src="/asset/{index}.js"></script>'
+            for index in range(self.server.assets)
+        )
+        self.send_body(
+            "text/html",
+            f"<html><head>{scripts}</head><body><h1 id='loaded'>Loaded</h1>"
+            "</body></html>".encode(),
+        )
+
+    def do_CONNECT(self) -> None:
+        self.send_error(405, "HTTPS is not supported by the proxy stand-in")
+
+
+class ProxyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        assets: int = 20,
+        asset_size: int = 200_000,
+    ):
+        super().__init__((host, port), ProxyRequestHandler)
+        self.username = username
+        self.password = password
+        self.assets = assets
+        self.asset_size = asset_size
+        self.requests_served = 0
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "ProxyServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,169 @@
+"""
+Local stand-in for the SMTP server of the notifications.
+
+Speaks enough plain SMTP for `smtplib`: EHLO/HELO, AUTH PLAIN and LOGIN, MAIL,
+RCPT, DATA, RSET, NOOP and QUIT. Connections can be delayed by `connect_latency`
+seconds, standing in for the TLS handshake and login round trips, and every
+command by `latency`. Received messages are kept as `email.message.Message`s.
+Point the notifications at it with `smtp_security: "none"`.
+
+Usage (from the repository root):
+    PYTHONPATH=app python -m benchmarks.smtp_server --port 8025
+"""
+
+import time
+import email
+import argparse
+import threading
+import socketserver
+
+from email.message import Message
+from typing import Optional
+
+
+class SmtpRequestHandler(socketserver.StreamRequestHandler):
+    server: "SmtpServer"
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+        self.wfile.flush()
+
+    def read_line(self) -> Optional[str]:
+        """Read a command line, None once the client hung up."""
+        line = self.rfile.readline()
+        if not line:
+            return None
+        return line.decode("utf-8", "replace").rstrip("\r\n")
+
+    def read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                break
+            # Undo the dot stuffing of the client
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        return b"".join(lines)
+
+    def handle(self) -> None:
+        self.server.count("connections")
+        time.sleep(self.server.connect_latency)
+        self.reply("220 localhost SMTP stand-in")
+
+        sender, recipients = None, []
+        while True:
+            line = self.read_line()
+            if line is None:
+                return
+            time.sleep(self.server.latency)
+            command, _, argument = line.partition(" ")
+            command = command.upper()
+
+            if command == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 8BITMIME")
+            elif command == "HELO":
+                self.reply("250 localhost")
+            elif command == "AUTH":
+                if argument.upper().startswith("LOGIN"):
+                    # Username and password, each answered to a base64 prompt
+                    self.reply("334 VXNlcm5hbWU6")
+                    self.read_line()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.read_line()
+                self.server.count("logins")
+                self.reply("235 Authentication successful")
+            elif command == "MAIL":
+                sender, recipients = argument.partition(":")[2].strip("<> "), []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                recipients.append(argument.partition(":")[2].strip("<> "))
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                message = email.message_from_bytes(self.read_data())
+                self.server.receive(sender, recipients, message)
+                self.reply("250 OK")
+            elif command in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        connect_latency: float = 0.0,
+    ):
+        super().__init__((host, port), SmtpRequestHandler)
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.lock = threading.Lock()
+        self.counts: dict[str, int] = {}
+        self.messages: list[tuple[str, list[str], Message]] = []
+        self.thread = None
+
+    @property
+    def host(self) -> str:
+        return self.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def receive(self, sender: str, recipients: list[str], message: Message) -> None:
+        with self.lock:
+            self.messages.append((sender, recipients, message))
+        self.count("messages")
+
+    def start(self) -> "SmtpServer":
+        """Serve from a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "SmtpServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="Seconds")
+    args = parser.parse_args()
+
+    server = SmtpServer(args.host, args.port, args.latency, args.connect_latency)
+    print(f"Serving SMTP on {server.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
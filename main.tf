@@ -93,15 +93,28 @@ resource "aws_iam_role_policy" "custom_lambda_policy" {
           "lambda:GetFunction",
           "scheduler:GetSchedule",
           "scheduler:CreateSchedule",
+          "scheduler:UpdateSchedule",
           "scheduler:DeleteSchedule",
+          "scheduler:GetScheduleGroup",
+          "scheduler:CreateScheduleGroup",
+          "scheduler:DeleteScheduleGroup",
           "iam:PassRole"
         ],
         Resource = [
           "arn:aws:lambda:${var.aws_region}:${var.aws_account_id}:function:${var.aws_lambda_function_name}:*",
           "arn:aws:lambda:${var.aws_region}:${var.aws_account_id}:function:${var.aws_lambda_function_name}",
           "arn:aws:scheduler:${var.aws_region}:${var.aws_account_id}:schedule/default/*",
+          "arn:aws:scheduler:${var.aws_region}:${var.aws_account_id}:schedule/${var.aws_scheduler_group_name}/*",
+          "arn:aws:scheduler:${var.aws_region}:${var.aws_account_id}:schedule-group/${var.aws_scheduler_group_name}",
           "arn:aws:iam::${var.aws_account_id}:role/${var.aws_lambda_function_name}-role"
         ]
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "scheduler:ListSchedules"
+        ],
+        Resource = "*"
       }
     ]
   })
@@ -131,6 +144,24 @@ resource "aws_scheduler_schedule" "daily_schedule" {
   state                        = "DISABLED"
 }
 
+resource "aws_scheduler_schedule" "odds_watcher_schedule" {
+  name        = "bet-builder-watch-odds"
+  description = "Check the odds of the scheduled matches and replace the ones which moved."
+  flexible_time_window {
+    mode = "OFF"
+  }
+  target {
+    arn      = aws_lambda_function.aws_lambda_function.arn
+    role_arn = aws_iam_role.aws_lambda_role.arn
+    input = jsonencode({
+      "trigger_type" = "WATCH_ODDS"
+    })
+  }
+  schedule_expression_timezone = "Europe/Bucharest"
+  schedule_expression          = var.odds_watcher_schedule_expression
+  state                        = "DISABLED"
+}
+
 resource "aws_secretsmanager_secret" "aws_secrets" {
   for_each    = var.aws_secrets
   name        = each.key
@@ -22,12 +22,24 @@ variable "aws_account_id" {
   default     = ""
 }
 
+variable "aws_scheduler_group_name" {
+  description = "The schedule group holding the match schedules, see scheduler.group_name in config.yaml"
+  type        = string
+  default     = "bet-builder-matches"
+}
+
 variable "daily_schedule_expression" {
   description = "The schedule expression for the daily schedule"
   type        = string
   default     = "0 23 * * ? *"
 }
 
+variable "odds_watcher_schedule_expression" {
+  description = "The schedule expression for the odds watcher schedule"
+  type        = string
+  default     = "rate(30 minutes)"
+}
+
 variable "aws_secrets" {
   description = "The AWS secrets for the Lambda function"
   type        = map(any)